@@ -0,0 +1,140 @@
+"""In-memory prefix indexes behind the slash command autocompletes.
+
+Per guild: the tracked summoners (by Riot ID and by list ID) and the Riot IDs
+recently looked up with /invocateur, /maitrises or /ingame. Suggestions never
+touch the disk or the Riot API, so they fit within Discord's 3 s deadline.
+"""
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from data_manager import DataManager
+
+data_manager = DataManager()
+
+MAX_CHOICES = 25  # limite de Discord
+MAX_RECENT = 50
+
+
+class PrefixIndex:
+    """Sorted array of casefolded keys, searched by prefix with bisect"""
+
+    def __init__(self):
+        self._keys = []
+        self._values = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, value):
+        key = key.casefold()
+        if key not in self._values:
+            insort(self._keys, key)
+        self._values[key] = value
+
+    def remove(self, key):
+        key = key.casefold()
+        if self._values.pop(key, None) is not None:
+            del self._keys[bisect_left(self._keys, key)]
+
+    def search(self, prefix, limit=MAX_CHOICES):
+        """Values of the keys starting with prefix, in key order"""
+        prefix = prefix.casefold()
+        found = []
+        for i in range(bisect_left(self._keys, prefix), len(self._keys)):
+            key = self._keys[i]
+            if not key.startswith(prefix) or len(found) >= limit:
+                break
+            found.append(self._values[key])
+        return found
+
+
+def riot_id(name, tag):
+    return f"{name}#{tag}"
+
+
+class GuildIndex:
+    def __init__(self, summoners=()):
+        self.riot_ids = PrefixIndex()  # 'name#tag' -> (name, tag, id)
+        self.ids = PrefixIndex()  # str(id) -> (id, name, tag)
+        self.recent = PrefixIndex()  # 'name#tag' -> (name, tag)
+        self._recent_order = OrderedDict()
+        for summoner in summoners:
+            self.add(summoner)
+
+    def add(self, summoner):
+        name, tag = summoner['name'], summoner['tag']
+        self.riot_ids.add(riot_id(name, tag), (name, tag, summoner['id']))
+        self.ids.add(str(summoner['id']), (summoner['id'], name, tag))
+
+    def remove(self, summoner):
+        self.riot_ids.remove(riot_id(summoner['name'], summoner['tag']))
+        self.ids.remove(str(summoner['id']))
+
+    def remember(self, name, tag):
+        key = riot_id(name, tag).casefold()
+        self._recent_order[key] = None
+        self._recent_order.move_to_end(key)
+        self.recent.add(key, (name, tag))
+        while len(self._recent_order) > MAX_RECENT:
+            oldest, _ = self._recent_order.popitem(last=False)
+            self.recent.remove(oldest)
+
+    def riot_id_matches(self, prefix):
+        """(name, tag) of tracked summoners first, then recent lookups"""
+        tracked = [(name, tag) for name, tag, _ in self.riot_ids.search(prefix)]
+        return list(dict.fromkeys(tracked + self.recent.search(prefix)))[:MAX_CHOICES]
+
+
+class SummonerIndex:
+    """GuildIndex per guild, built from summoners_data on first use and then kept up to date"""
+
+    def __init__(self):
+        self._guilds = {}
+
+    def guild(self, guild_id):
+        guild_id = str(guild_id)
+        if guild_id not in self._guilds:
+            self._guilds[guild_id] = GuildIndex(data_manager.get_summoners_for_guild(guild_id))
+        return self._guilds[guild_id]
+
+    def add(self, guild_id, summoner):
+        self.guild(guild_id).add(summoner)
+
+    def remove(self, guild_id, summoner):
+        self.guild(guild_id).remove(summoner)
+
+    def clear(self, guild_id):
+        """Forget the tracked summoners of a guild (recent lookups are kept)"""
+        index = self.guild(guild_id)
+        index.riot_ids, index.ids = PrefixIndex(), PrefixIndex()
+
+    def remember(self, guild_id, name, tag):
+        if guild_id is not None:
+            self.guild(guild_id).remember(name, tag)
+
+    def names(self, guild_id, current):
+        """[(label, name)] for a pseudo option"""
+        if guild_id is None:
+            return []
+        return [(riot_id(name, tag), name) for name, tag in self.guild(guild_id).riot_id_matches(current)]
+
+    def tags(self, guild_id, pseudo, current):
+        """Tags known for the pseudo already typed"""
+        if guild_id is None:
+            return []
+        prefix = riot_id(pseudo, current) if pseudo else ''
+        matches = self.guild(guild_id).riot_id_matches(prefix)
+        return list(dict.fromkeys(tag for _, tag in matches))
+
+    def identifiers(self, guild_id, current):
+        """[(label, id)] for an identifier option, matched on the ID or the Riot ID"""
+        if guild_id is None:
+            return []
+        index = self.guild(guild_id)
+        if current.isdigit():
+            matches = index.ids.search(current)
+        else:
+            matches = [(summoner_id, name, tag) for name, tag, summoner_id in index.riot_ids.search(current)]
+        return [(f"{summoner_id} · {riot_id(name, tag)}", summoner_id) for summoner_id, name, tag in matches]
+
+
+summoner_index = SummonerIndex()
@@ -0,0 +1,185 @@
+"""Low-priority download of the match history of tracked players into the match archive.
+
+A new summoner starts with an empty archive, so /stats would only cover the games
+played after it was added. This worker pages through match-v5 by-puuid ids and
+downloads the games missing from the archive, one request at a time and only with
+spare budget: it waits while a live-game sweep runs, or while the shared limiter
+has less than BACKFILL_MIN_HEADROOM of its tightest window left, so the poller and
+the slash commands keep priority.
+
+The next match-v5 offset of every player is saved after each page, so a restart
+resumes where the backfill stopped. Each player is backfilled by the process that
+polls it (ShardScope.owned_summoners), and every shard process has its own state
+file, so processes never write the same state or archive files.
+
+Transient Riot failures (429, 5xx, network) requeue the player after a growing
+delay without moving its cursor; a game that cannot be parsed is skipped alone.
+"""
+import asyncio
+import json
+import logging
+import os
+from data_manager import DataManager
+from match_archive import archive, row_from_result
+from metrics import BACKFILL_GAMES, BACKFILL_PENDING
+from poller import group_by_puuid, sweep_running
+from riot_api import RiotUnavailable, call_limited, fetchMatch, fetchMatchIds, parseGameResult, rate_limiter
+
+logger = logging.getLogger(__name__)
+data_manager = DataManager()
+
+STATE_FILE = os.getenv('BACKFILL_STATE_FILE', 'backfill_state.json')
+MAX_GAMES = int(os.getenv('BACKFILL_MAX_GAMES', 500))  # /stats ne remonte pas plus loin
+MIN_HEADROOM = float(os.getenv('BACKFILL_MIN_HEADROOM', 0.5))
+PAGE_SIZE = 20
+BUDGET_CHECK_SECONDS = 5
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 600
+
+
+def state_file_for(shard_scope):
+    """BACKFILL_STATE_FILE, suffixed with the local shards when they are split over processes"""
+    if shard_scope is None or len(shard_scope.local_shards) == shard_scope.shard_count:
+        return STATE_FILE
+    stem, extension = os.path.splitext(STATE_FILE)
+    return f"{stem}-{'-'.join(str(shard) for shard in sorted(shard_scope.local_shards))}{extension}"
+
+
+class HistoryBackfill:
+    def __init__(self, state_file=None, limiter=None):
+        self.state_file = state_file
+        self.limiter = limiter or rate_limiter
+        self.shard_scope = None
+        self.cursors = self._load() if state_file else {}  # puuid -> {'start': next match-v5 offset, 'done': bool}
+        self._pending = {}  # puuids waiting for their next page, in order
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._failures = 0  # transient failures in a row
+
+    def _load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cursors, f)
+        os.replace(tmp_path, self.state_file)
+
+    def enqueue(self, puuid):
+        """Backfill a player's history (no-op once it was fully downloaded)"""
+        if not puuid or self.cursors.get(puuid, {}).get('done'):
+            return
+        self._pending[puuid] = None
+        BACKFILL_PENDING.set(len(self._pending))
+        self._wakeup.set()
+
+    def owned_puuids(self):
+        """LoL puuids this process polls, hence backfills"""
+        summoners_data = data_manager.summoners_data
+        if self.shard_scope is not None:
+            summoners_data = self.shard_scope.owned_summoners(summoners_data)
+        return group_by_puuid(summoners_data, 'lol')
+
+    def start(self, shard_scope=None):
+        """Queue the owned LoL players not backfilled yet and start the worker"""
+        self.shard_scope = shard_scope
+        if self.state_file is None:
+            self.state_file = state_file_for(shard_scope)
+            self.cursors = self._load()
+        for puuid in self.owned_puuids():
+            self.enqueue(puuid)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def wait_for_budget(self):
+        """Wait while the live poll runs or the limiter is short on spare budget"""
+        while sweep_running() or self.limiter.headroom() < MIN_HEADROOM:
+            await asyncio.sleep(BUDGET_CHECK_SECONDS)
+
+    async def _call(self, func, *args):
+        await self.wait_for_budget()
+        return await call_limited(func, *args, limiter=self.limiter)
+
+    async def backfill_player(self, puuid):
+        """Archive the missing games of the next page of a player's history.
+
+        Returns True while more pages are left. Raises RiotUnavailable on a
+        transient failure: the games already downloaded are archived, the cursor
+        stays on the page.
+        """
+        cursor = self.cursors.setdefault(puuid, {'start': 0, 'done': False})
+        if cursor['done']:
+            return False
+        match_ids = await self._call(fetchMatchIds, puuid, cursor['start'], PAGE_SIZE)
+        if match_ids is None:
+            return False  # Requête refusée par Riot : repris au prochain démarrage
+
+        known = await asyncio.to_thread(archive.game_ids, puuid)
+        rows = []
+        try:
+            for match_id in match_ids:
+                game_id = int(match_id.split('_')[-1])
+                if game_id in known:
+                    BACKFILL_GAMES.inc(result='known')
+                    continue
+                row = self._parse(puuid, game_id, await self._call(fetchMatch, game_id))
+                BACKFILL_GAMES.inc(result='archived' if row else 'skipped')
+                if row:
+                    rows.append(row)
+        finally:
+            if rows:
+                await asyncio.to_thread(archive.add, puuid, rows)
+
+        # New games shift the offsets: a page may then repeat known games, but none is skipped
+        cursor['start'] += len(match_ids)
+        cursor['done'] = len(match_ids) < PAGE_SIZE or cursor['start'] >= MAX_GAMES
+        await asyncio.to_thread(self._save)
+        if cursor['done']:
+            logger.info("Match history of %s backfilled (%d games listed)", puuid, cursor['start'])
+        return not cursor['done']
+
+    @staticmethod
+    def _parse(puuid, game_id, match_data):
+        """Archive row of a downloaded game, or None (missing, or a payload parseGameResult rejects)"""
+        if match_data is None:
+            return None
+        try:
+            return row_from_result(game_id, parseGameResult(match_data, game_id, puuid))
+        except Exception as e:
+            logger.warning("Skipping unparsable game %s of %s: %s", game_id, puuid, e)
+            return None
+
+    async def run(self):
+        """One page per player in turn, so a long history does not hold back newer players"""
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            puuid = next(iter(self._pending))
+            del self._pending[puuid]
+            try:
+                # Joueur retiré, ou suivi désormais par un autre processus : rien à faire ici
+                more = puuid in self.owned_puuids() and await self.backfill_player(puuid)
+                self._failures = 0
+            except RiotUnavailable as e:
+                self._failures += 1
+                delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (self._failures - 1))
+                logger.info("History backfill of %s paused %ds: %s", puuid, delay, e)
+                self._pending[puuid] = None
+                BACKFILL_PENDING.set(len(self._pending))
+                await asyncio.sleep(delay)
+                continue
+            except Exception as e:
+                logger.exception("History backfill failed for %s: %s", puuid, e)
+                more = False
+            if more:
+                self._pending[puuid] = None
+            BACKFILL_PENDING.set(len(self._pending))
+
+
+backfill = HistoryBackfill()
@@ -0,0 +1,314 @@
+"""End-to-end benchmark of the live-game loops against riot_mock and a fake Discord sink.
+
+Runs the logic of check_summoners_status / check_finished_games (poller.detect_game_starts
+and poller.detect_game_ends) with the real notification pipeline, for every combination
+of tracked summoners, guild overlap and game length, and writes a JSON report:
+
+    python benchmarks/bench_e2e.py --summoners 10,100,1000,10000 --overlap 0,0.5 --game-length 20,60
+    python benchmarks/bench_e2e.py --summoners 100 --duration 20 --output /tmp/before.json
+
+The loop intervals and game lengths are scaled down so one scenario covers several
+game starts and ends within --duration seconds. Each scenario runs in its own spawned
+process: the rate limiters and poller events are module singletons bound to the event
+loop that first uses them. A scenario whose polls failed is reported with its error
+instead of its numbers.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import ROOT, git_revision, make_workdir
+sys.path.insert(0, ROOT)
+
+
+def serve_mock(port, world_options, fault_options, workdir):
+    """Mock process entry point"""
+    os.chdir(workdir)
+    from aiohttp import web
+    from riot_mock import MockWorld, FaultInjector, create_app
+    web.run_app(create_app(MockWorld(**world_options), FaultInjector(**fault_options)),
+                host='127.0.0.1', port=port, print=None)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Le mock n'a pas démarré sur le port {port}")
+
+
+def distribution(values):
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    return {'count': len(ordered), 'p50': pct(50), 'p99': pct(99), 'max': ordered[-1],
+            'mean': sum(ordered) / len(ordered)}
+
+
+def build_summoners_data(players, guilds, overlap, seed=0):
+    """Spread mock players over guilds; `overlap` is the share also tracked by a second guild"""
+    rng = random.Random(seed)
+    summoners_data = {str(1000 + g): [] for g in range(guilds)}
+    guild_ids = list(summoners_data)
+    for index, player in enumerate(players):
+        tracked_in = {guild_ids[index % guilds]}
+        if guilds > 1 and rng.random() < overlap:
+            tracked_in.add(rng.choice([g for g in guild_ids if g not in tracked_in]))
+        for guild_id in tracked_in:
+            summoners_data[guild_id].append({
+                'id': len(summoners_data[guild_id]) + 1,
+                'name': player['gameName'],
+                'tag': player['tagLine'],
+                'puuid': player['puuid'],
+                'summonerId': player['summonerId'],
+            })
+    return summoners_data
+
+
+async def run_loop(interval, cycle, durations, stop):
+    """tasks.loop semantics: run, then sleep what is left of the interval"""
+    while not stop.is_set():
+        started = time.monotonic()
+        await cycle()
+        elapsed = time.monotonic() - started
+        durations.append(elapsed)
+        try:
+            await asyncio.wait_for(stop.wait(), max(0.0, interval - elapsed))
+        except asyncio.TimeoutError:
+            pass
+
+
+async def drain(pipeline):
+    for stage in pipeline.stages:
+        await stage.queue.join()
+    while pipeline.delivery.batches:
+        await asyncio.sleep(0.1)
+    for state in list(pipeline.delivery.channels.values()):
+        await state.queue.join()
+
+
+async def run_scenario(args, port, summoners, overlap, game_length):
+    import requests
+    import pipeline as pipeline_module
+    from data_manager import DataManager
+    from fixtures import FakeClient, local_render_build_image
+    from metrics import RIOT_RESPONSES
+    from poller import detect_game_starts, detect_game_ends
+
+    data_manager = DataManager()
+    base_url = f"http://127.0.0.1:{port}"
+    players = requests.get(f"{base_url}/_mock/players", params={'limit': summoners}).json()
+    summoners_data = build_summoners_data(players, args.guilds, overlap)
+
+    data_manager.summoners_data = summoners_data
+    data_manager.notified_summoners = []
+    data_manager.save_settings({'notification_channels': {g: int(g) * 10 for g in summoners_data}})
+    requests.post(f"{base_url}/_mock/reset")
+    responses_before = dict(RIOT_RESPONSES._values)
+
+    pipeline_module.render_build_image = local_render_build_image
+    client = FakeClient(args.send_latency)
+    pipeline = pipeline_module.NotificationPipeline(client)
+    latencies = {'start': [], 'end': []}
+    record_latency = pipeline.delivery.on_delivered
+
+    def on_delivered(item, latency):
+        latencies[item['kind']].append(latency)
+        record_latency(item, latency)
+
+    pipeline.delivery.on_delivered = on_delivered
+    pipeline.start()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    start_cycles, end_cycles, sweeps = [], [], []
+    stop = asyncio.Event()
+
+    async def start_cycle():
+        sweeps.append(await detect_game_starts(summoners_data, pipeline))
+
+    async def end_cycle():
+        await detect_game_ends(summoners_data, pipeline)
+
+    loops = [
+        asyncio.create_task(run_loop(args.poll_interval, start_cycle, start_cycles, stop)),
+        asyncio.create_task(run_loop(args.poll_interval * 2, end_cycle, end_cycles, stop)),
+    ]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*loops)
+
+    # Let queued notifications reach the sink before reading the numbers
+    try:
+        await asyncio.wait_for(drain(pipeline), args.drain_timeout)
+    except asyncio.TimeoutError:
+        print("  pipeline not drained, remaining notifications are not counted", flush=True)
+    await pipeline.stop()
+
+    poll_errors = sum(sweep['errors'] + sweep['tft']['errors'] for sweep in sweeps)
+    scenario = {'summoners': summoners, 'guilds': args.guilds, 'overlap': overlap, 'game_length': game_length}
+    if poll_errors:
+        if args.tracemalloc:
+            tracemalloc.stop()
+        return {**scenario, 'error': f"{poll_errors} spectator polls failed"}
+
+    heap_peak = None
+    if args.tracemalloc:
+        heap_peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    requests_by_endpoint = {}
+    for (endpoint, status), count in RIOT_RESPONSES._values.items():
+        delta = count - responses_before.get((endpoint, status), 0)
+        if delta:
+            requests_by_endpoint[f"{endpoint} {status}"] = delta
+    spectator_requests = sum(count for key, count in requests_by_endpoint.items() if key.startswith('spectator-v5'))
+    match_requests = sum(count for key, count in requests_by_endpoint.items() if key.startswith('match-v5'))
+
+    return {
+        **scenario,
+        'tracked_pairs': sum(len(s) for s in summoners_data.values()),
+        'duration': args.duration,
+        'start_cycle_seconds': distribution(start_cycles),
+        'end_cycle_seconds': distribution(end_cycles),
+        'requests': requests_by_endpoint,
+        'requests_per_start_cycle': spectator_requests / len(start_cycles) if start_cycles else 0,
+        'requests_per_end_cycle': match_requests / len(end_cycles) if end_cycles else 0,
+        'peak_sweep_concurrency': max((s['peak_concurrency'] for s in sweeps), default=0),
+        'notifications': {kind: len(values) for kind, values in latencies.items()},
+        'messages': client.messages,
+        'detection_to_notification_seconds': {kind: distribution(values) for kind, values in latencies.items()},
+        'failed_items': sum(stage.metrics['failed'] for stage in pipeline.stages),
+        'delivery': dict(pipeline.delivery.metrics),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'peak_heap_mb': heap_peak,
+        'mock_stats': requests.get(f"{base_url}/_mock/stats").json(),
+    }
+
+
+def scenario_process(args, port, summoners, overlap, game_length):
+    """Scenario process entry point: a fresh interpreter, hence fresh limiters and events"""
+    from log_config import setup_logging
+    setup_logging()
+    return asyncio.run(run_scenario(args, port, summoners, overlap, game_length))
+
+
+def parse_list(spec, cast):
+    return [cast(part) for part in spec.split(',') if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--summoners', default='10,100,1000', help='liste de tailles, ex. 10,100,1000,10000')
+    parser.add_argument('--guilds', type=int, default=20)
+    parser.add_argument('--overlap', default='0,0.5', help='part des invocateurs suivis par un 2e serveur')
+    parser.add_argument('--game-length', default='20', help='durée des parties du mock (s), pilote le churn')
+    parser.add_argument('--idle-length', type=float, default=10)
+    parser.add_argument('--lobby-size', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=45, help='durée de chaque scénario (s)')
+    parser.add_argument('--poll-interval', type=float, default=3, help='équivalent des 30s de check_summoners_status')
+    parser.add_argument('--latency', type=float, default=0.02, help='latence du mock (s)')
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--send-latency', type=float, default=0.05, help='latence de channel.send (s)')
+    parser.add_argument('--rate-limits', default='100000:1', help='RIOT_RATE_LIMITS du bot pendant le bench')
+    parser.add_argument('--concurrency', type=int, default=32, help='RIOT_MAX_CONCURRENCY')
+    parser.add_argument('--drain-timeout', type=float, default=60)
+    parser.add_argument('--tracemalloc', action='store_true', help='mesure aussi le pic du tas Python (plus lent)')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"e2e_{datetime.now():%Y%m%d_%H%M%S}.json"))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    # The bot reads and writes its JSON files in the working directory: keep them out of the repo
+    workdir = make_workdir('bench_e2e_')
+    os.chdir(workdir)
+
+    port = free_port()
+    os.environ.update({
+        'API_RIOT_KEY': os.getenv('API_RIOT_KEY', 'bench-key'),
+        'API_RIOT_TFT_KEY': os.getenv('API_RIOT_TFT_KEY', 'bench-tft-key'),
+        'RIOT_REGIONAL_URL': f"http://127.0.0.1:{port}",
+        'RIOT_PLATFORM_URL': f"http://127.0.0.1:{port}",
+        'RIOT_RATE_LIMITS': args.rate_limits,
+        'RIOT_MAX_CONCURRENCY': str(args.concurrency),
+        'DELIVERY_BATCH_WINDOW': os.getenv('DELIVERY_BATCH_WINDOW', '0.5'),
+        'LOG_LEVEL': os.getenv('LOG_LEVEL', 'WARNING'),
+    })
+
+    scenarios = list(itertools.product(
+        parse_list(args.summoners, int), parse_list(args.overlap, float), parse_list(args.game_length, float)))
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for summoners, overlap, game_length in scenarios:
+        world_options = {'players': summoners, 'lobby_size': args.lobby_size, 'game_length': game_length,
+                         'idle_length': args.idle_length, 'tft_share': 0.0}
+        fault_options = {'latency': args.latency, 'jitter': args.jitter}
+        mock = context.Process(target=serve_mock, args=(port, world_options, fault_options, workdir), daemon=True)
+        mock.start()
+        try:
+            wait_for_port(port)
+            print(f"summoners={summoners} overlap={overlap} game_length={game_length} ...", flush=True)
+            with context.Pool(1) as pool:
+                result = pool.apply(scenario_process, (args, port, summoners, overlap, game_length))
+            results.append(result)
+            if 'error' in result:
+                print(f"  FAILED: {result['error']}", flush=True)
+                continue
+            print(f"  start cycle p50 {result['start_cycle_seconds'].get('p50', 0):.3f}s, "
+                  f"{result['requests_per_start_cycle']:.0f} req/cycle, "
+                  f"notifications {result['notifications']}, "
+                  f"latency p99 start {result['detection_to_notification_seconds']['start'].get('p99', 0):.2f}s "
+                  f"end {result['detection_to_notification_seconds']['end'].get('p99', 0):.2f}s, "
+                  f"rss {result['peak_rss_mb']:.0f} MB", flush=True)
+        finally:
+            mock.terminate()
+            mock.join()
+
+    report = {
+        'benchmark': 'e2e',
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': vars(args),
+        'scenarios': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f"Résultats écrits dans {output}")
+    failed = sum('error' in result for result in results)
+    if failed:
+        sys.exit(f"{failed} scénario(s) en échec")
+
+
+if __name__ == '__main__':
+    main()
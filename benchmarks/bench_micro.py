@@ -0,0 +1,277 @@
+"""Micro-benchmarks of the CPU-bound hot paths: timing and allocations per call.
+
+    python benchmarks/bench_micro.py                          # every benchmark
+    python benchmarks/bench_micro.py -k ranks --output /tmp/after.json
+    python benchmarks/bench_micro.py --compare /tmp/before.json --fail-above 1.2
+
+Each benchmark is calibrated to run for about --min-time seconds per round; the
+median over --rounds rounds is reported, with the peak memory and the blocks
+still allocated after one call (tracemalloc, measured in a separate pass).
+With --compare the exit status is 1 when a benchmark got slower than --fail-above.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import ROOT, git_revision, make_workdir
+sys.path.insert(0, ROOT)
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a setup function returning the zero-argument callable to measure"""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def measure(func, rounds, min_time):
+    # Calibrate the inner loop so a round is long enough for the timer
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call.append((time.perf_counter() - started) / loops)
+
+    # Allocations: one traced call, outside the timed rounds
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    func()
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # Ignore the snapshots' own bookkeeping
+    own = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    retained = sum(stat.count_diff for stat in after.filter_traces(own).compare_to(before.filter_traces(own), 'lineno')
+                   if stat.count_diff > 0)
+
+    return {
+        'loops': loops,
+        'rounds': rounds,
+        'median_us': statistics.median(per_call) * 1e6,
+        'min_us': min(per_call) * 1e6,
+        'stdev_us': statistics.pstdev(per_call) * 1e6,
+        'peak_kib': peak / 1024,
+        'retained_blocks': retained,
+    }
+
+
+# Parsing
+@benchmark('parse_game_result')
+def setup_parse_game_result():
+    from riot_api import parseGameResult
+    with open('exemplegamedata', 'r', encoding='utf-8') as f:
+        match_data = json.load(f)
+    # Last participant: worst case for the lookup
+    puuid = match_data['info']['participants'][-1]['puuid']
+    game_id = match_data['info']['gameId']
+    return lambda: parseGameResult(match_data, game_id, puuid)
+
+
+@benchmark('parse_match_tft')
+def setup_parse_match_tft():
+    from riot_api import parseMatchTFT
+    with open('tftgamedataexemple', 'r', encoding='utf-8') as f:
+        match_data = json.load(f)
+    # Whole lobby: one parse serves every tracked player
+    return lambda: parseMatchTFT(match_data)
+
+
+@benchmark('parse_ranks')
+def setup_parse_ranks():
+    from riot_api import parseRanks
+    with open('ranksexemple', 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    return lambda: parseRanks(entries)
+
+
+@benchmark('parse_ranks_tft')
+def setup_parse_ranks_tft():
+    from riot_api import parseRanksTFT
+    with open('ranksexemple', 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    entries = [dict(entry, queueType=queue, ratedTier='NONE', ratedRating=0)
+               for entry, queue in zip(entries * 2, ('RANKED_TFT', 'RANKED_TFT_TURBO', 'RANKED_TFT_DOUBLE_UP'))]
+    return lambda: parseRanksTFT(entries)
+
+
+# LP diffing, over 1000 tracked summoners
+def _rank(index, shift=0):
+    tiers = ('SILVER', 'GOLD', 'PLATINUM', 'EMERALD')
+    total = index * 37 % 1600 + shift
+    return {'tier': tiers[min(total // 400, 3)], 'rank': ('IV', 'III', 'II', 'I')[total % 400 // 100],
+            'lp': total % 100, 'display': ''}
+
+
+@benchmark('get_lp_difference')
+def setup_lp_difference():
+    from data_manager import DataManager
+    data_manager = DataManager()
+    summoners = [f"summoner-{i:040d}" for i in range(1000)]
+    for i, summoner_id in enumerate(summoners):
+        rank = _rank(i)
+        data_manager.store_temp_lp(summoner_id, 'RANKED_SOLO_5x5', rank['lp'], rank['tier'], rank['rank'])
+    current = [_rank(i, shift=i % 40 - 20) for i in range(1000)]
+
+    def run():
+        for summoner_id, rank in zip(summoners, current):
+            data_manager.get_lp_difference(summoner_id, 'RANKED_SOLO_5x5', rank['lp'], rank['tier'], rank['rank'])
+    return run
+
+
+@benchmark('get_daily_rank_changes')
+def setup_daily_rank_changes():
+    from data_manager import DataManager
+    data_manager = DataManager()
+    today = datetime.now().strftime('%Y-%m-%d')
+    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    summoners = [f"summoner-{i:040d}" for i in range(1000)]
+    data_manager.daily_ranks = {
+        yesterday: {s: {'RANKED_SOLO_5x5': _rank(i), 'RANKED_FLEX_SR': _rank(i + 7)} for i, s in enumerate(summoners)},
+        today: {s: {'RANKED_SOLO_5x5': _rank(i, i % 60 - 30), 'RANKED_FLEX_SR': _rank(i + 7)}
+                for i, s in enumerate(summoners)},
+    }
+
+    def run():
+        for summoner_id in summoners:
+            data_manager.get_daily_rank_changes(summoner_id)
+    return run
+
+
+# Image composition, with fixture icons
+@benchmark('compose_build_image')
+def setup_compose_build_image():
+    from fixtures import fixture_icon
+    from notifications import compose_build_image
+    items = [fixture_icon(f"item{i}") for i in range(6)]
+    trinket = fixture_icon('trinket')
+    runes = [fixture_icon('rune1'), fixture_icon('rune2')]
+    return lambda: compose_build_image(items, trinket, runes)
+
+
+@benchmark('compose_mastery_banner')
+def setup_compose_mastery_banner():
+    from fixtures import fixture_icon
+    from notifications import compose_mastery_banner
+    tiles = [fixture_icon(f"champion{i}", size=120) for i in range(5)]
+    return lambda: compose_mastery_banner(tiles)
+
+
+@benchmark('compose_tft_board')
+def setup_compose_tft_board():
+    from fixtures import fixture_icon
+    from notifications import compose_tft_board
+    from riot_api import parseMatchTFT
+    with open('tftgamedataexemple', 'r', encoding='utf-8') as f:
+        match = parseMatchTFT(json.load(f))
+    # Biggest board of the lobby, icons already in the atlas
+    player = max(match['players'].values(), key=lambda p: len(p['units']) + len(p['traits']))
+    icons = {}
+
+    def icon(kind, name):
+        if (kind, name) not in icons:
+            icons[(kind, name)] = fixture_icon(f"{kind}:{name}")
+        return icons[(kind, name)]
+    return lambda: compose_tft_board(player['units'], player['traits'], icon)
+
+
+@benchmark('player_stats')
+def setup_player_stats():
+    from match_archive import PlayerTable, player_stats, row_from_result
+    from riot_api import parseGameResult
+    with open('exemplegamedata', 'r', encoding='utf-8') as f:
+        match_data = json.load(f)
+    game_id = match_data['info']['gameId']
+    participants = match_data['info']['participants']
+    # 500 archived games over 10 champions, the largest /stats request
+    results = [parseGameResult(match_data, game_id, p['puuid']) for p in participants]
+    table = PlayerTable()
+    table.extend([dict(row_from_result(game_id + i, results[i % len(results)]), game_end=i) for i in range(500)])
+    return lambda: player_stats(table, 500, 'all')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='filter', default='', help='ne lance que les benchmarks contenant ce texte')
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.2, help='durée minimale d\'un round (s)')
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compare', default=None, help='résultats précédents (JSON) à comparer')
+    parser.add_argument('--fail-above', type=float, default=None, help='ratio de ralentissement toléré, ex. 1.2')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"micro_{datetime.now():%Y%m%d_%H%M%S}.json"))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = {entry['name']: entry for entry in json.load(f)['results']}
+
+    # DataManager and riot_api read their files from the working directory
+    workdir = make_workdir('bench_micro_')
+    os.chdir(workdir)
+    os.environ.setdefault('API_RIOT_KEY', 'bench-key')
+    os.environ.setdefault('API_RIOT_TFT_KEY', 'bench-tft-key')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    from log_config import setup_logging
+    setup_logging()
+
+    results, regressions = [], []
+    print(f"{'benchmark':<26}{'median':>12}{'min':>12}{'peak':>11}{'retained':>10}")
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        result = {'name': name, **measure(setup(), args.rounds, args.min_time)}
+        results.append(result)
+        line = (f"{name:<26}{result['median_us']:>10.1f}us{result['min_us']:>10.1f}us"
+                f"{result['peak_kib']:>8.1f}KiB{result['retained_blocks']:>10}")
+        previous = baseline.get(name) if baseline else None
+        if previous:
+            ratio = result['median_us'] / previous['median_us']
+            result['ratio'] = ratio
+            line += f"   x{ratio:.2f}"
+            if args.fail_above and ratio > args.fail_above:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line, flush=True)
+
+    report = {
+        'benchmark': 'micro',
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'results': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f"Résultats écrits dans {output}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Local fixtures shared by the benchmarks: working directory, icons and a Discord channel sink, no network"""
+import asyncio
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from PIL import Image, ImageDraw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Fichiers lus via des chemins relatifs par le bot et le mock
+RESOURCES = ('items.json', 'champion.json', 'tactician.json', 'exemplegamedata', 'tftgamedataexemple', 'ranksexemple')
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def make_workdir(prefix):
+    """Temporary working directory holding RESOURCES, so the JSON files the bot writes stay out of the repo"""
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    for name in RESOURCES:
+        shutil.copy(os.path.join(ROOT, name), workdir)
+    return workdir
+
+
+def fixture_icon(key, size=64):
+    """Deterministic RGBA icon standing in for a ddragon / communitydragon image"""
+    digest = hashlib.blake2b(str(key).encode(), digest_size=6).digest()
+    image = Image.new('RGBA', (size, size), tuple(digest[:3]) + (255,))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((size // 4, size // 4, 3 * size // 4, 3 * size // 4), fill=tuple(digest[3:6]) + (255,))
+    return image
+
+
+async def local_render_build_image(items, runes):
+    """render_build_image with fixture icons instead of downloads"""
+    from notifications import compose_build_image
+    main_items = items[:6]
+    trinket = fixture_icon(items[6]) if len(items) > 6 else None
+    return await asyncio.to_thread(
+        compose_build_image,
+        [fixture_icon(url) for url in main_items], trinket, [fixture_icon(rune) for rune in runes])
+
+
+class FakeChannel:
+    def __init__(self, sink, channel_id):
+        self.sink = sink
+        self.id = channel_id
+
+    async def send(self, **kwargs):
+        await asyncio.sleep(self.sink.send_latency)
+        embeds = kwargs.get('embeds') or [kwargs.get('embed')]
+        self.sink.messages += 1
+        self.sink.embeds += len(embeds)
+        self.sink.sent_at.append(time.monotonic())
+
+
+class FakeClient:
+    """Just enough of discord.Client for DeliveryManager: every channel is a FakeChannel"""
+
+    def __init__(self, send_latency=0.05):
+        self.send_latency = send_latency
+        self.messages = 0
+        self.embeds = 0
+        self.sent_at = []
+        self._channels = {}
+
+    def get_channel(self, channel_id):
+        if channel_id not in self._channels:
+            self._channels[channel_id] = FakeChannel(self, channel_id)
+        return self._channels[channel_id]
+
+    get_partial_messageable = get_channel
@@ -0,0 +1,186 @@
+"""Drive the bot's live-game loops and notification pipeline from a recorded Riot trace.
+
+Record production traffic first (RIOT_RECORD=trace.jsonl.gz python main.py), then:
+
+    python benchmarks/replay.py trace.jsonl.gz --speed 20
+    python benchmarks/replay.py trace.jsonl.gz trace-*.jsonl.gz --speed 60 --output /tmp/replay.json
+
+The trace is served by riot_trace's replay app in its own process with a clock
+running --speed times faster than the recording. The poll loops run with their
+production intervals divided by the same factor, against the tracked summoners
+saved in the trace, and notifications go to a fake Discord sink. The report has
+the same shape as the bench_e2e scenarios.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+from datetime import datetime
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import ROOT, git_revision, make_workdir
+from bench_e2e import distribution, drain, free_port, run_loop, wait_for_port
+
+
+def serve_replay(port, paths, speed, latency_scale, workdir):
+    """Replay process entry point"""
+    os.chdir(workdir)
+    from aiohttp import web
+    from riot_trace import create_replay_app
+    web.run_app(create_replay_app(paths, speed, latency_scale), host='127.0.0.1', port=port, print=None)
+
+
+def summoners_from_trace(meta, by_url):
+    """Tracked summoners saved at recording time, or one guild with every polled puuid"""
+    if meta.get('summoners_data'):
+        return meta['summoners_data']
+    prefix = '/lol/spectator/v5/active-games/by-summoner/'
+    puuids = sorted(unquote(url[len(prefix):]) for url in by_url if url.startswith(prefix))
+    return {'1': [{'id': i + 1, 'name': f"Joueur{i + 1}", 'tag': 'EUW', 'puuid': puuid}
+                  for i, puuid in enumerate(puuids)]}
+
+
+async def replay(args, port, summoners_data, trace_seconds):
+    import requests
+    import pipeline as pipeline_module
+    from data_manager import DataManager
+    from fixtures import FakeClient, local_render_build_image
+    from metrics import RIOT_RESPONSES
+    from poller import detect_game_starts, detect_game_ends
+
+    data_manager = DataManager()
+    data_manager.summoners_data = summoners_data
+    data_manager.notified_summoners = []
+    data_manager.save_settings({'notification_channels': {g: 10 + i for i, g in enumerate(summoners_data)}})
+
+    pipeline_module.render_build_image = local_render_build_image
+    client = FakeClient(args.send_latency)
+    pipeline = pipeline_module.NotificationPipeline(client)
+    latencies = {'start': [], 'end': []}
+    record_latency = pipeline.delivery.on_delivered
+
+    def on_delivered(item, latency):
+        latencies[item['kind']].append(latency)
+        record_latency(item, latency)
+
+    pipeline.delivery.on_delivered = on_delivered
+    pipeline.start()
+
+    start_cycles, end_cycles = [], []
+    stop = asyncio.Event()
+
+    async def start_cycle():
+        await detect_game_starts(summoners_data, pipeline)
+
+    async def end_cycle():
+        await detect_game_ends(summoners_data, pipeline)
+
+    # Production intervals (30s / 60s), accelerated like the trace clock
+    loops = [
+        asyncio.create_task(run_loop(30 / args.speed, start_cycle, start_cycles, stop)),
+        asyncio.create_task(run_loop(60 / args.speed, end_cycle, end_cycles, stop)),
+    ]
+    wall_duration = args.duration or trace_seconds / args.speed
+    await asyncio.sleep(wall_duration)
+    stop.set()
+    await asyncio.gather(*loops)
+    try:
+        await asyncio.wait_for(drain(pipeline), args.drain_timeout)
+    except asyncio.TimeoutError:
+        print("pipeline not drained, remaining notifications are not counted", flush=True)
+    await pipeline.stop()
+
+    return {
+        'trace_seconds': trace_seconds,
+        'speed': args.speed,
+        'wall_seconds': wall_duration,
+        'summoners': len({s['puuid'] for summoners in summoners_data.values() for s in summoners}),
+        'guilds': len(summoners_data),
+        'start_cycle_seconds': distribution(start_cycles),
+        'end_cycle_seconds': distribution(end_cycles),
+        'requests': {f"{endpoint} {status}": count for (endpoint, status), count in RIOT_RESPONSES._values.items()},
+        'notifications': {kind: len(values) for kind, values in latencies.items()},
+        'messages': client.messages,
+        'detection_to_notification_seconds': {kind: distribution(values) for kind, values in latencies.items()},
+        'failed_items': sum(stage.metrics['failed'] for stage in pipeline.stages),
+        'delivery': dict(pipeline.delivery.metrics),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'replay_stats': requests.get(f"http://127.0.0.1:{port}/_replay/stats").json(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('traces', nargs='+', help='fichiers enregistrés avec RIOT_RECORD')
+    parser.add_argument('--speed', type=float, default=10, help='accélération par rapport au temps réel')
+    parser.add_argument('--duration', type=float, default=None, help='durée réelle du replay (s), toute la trace par défaut')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='facteur appliqué aux latences enregistrées')
+    parser.add_argument('--send-latency', type=float, default=0.05)
+    parser.add_argument('--rate-limits', default=None, help='RIOT_RATE_LIMITS du bot (production par défaut)')
+    parser.add_argument('--drain-timeout', type=float, default=60)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    traces = [os.path.abspath(path) for path in args.traces]
+    output = os.path.abspath(args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"replay_{datetime.now():%Y%m%d_%H%M%S}.json"))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    from riot_trace import load_trace
+    meta, by_url, trace_seconds = load_trace(traces)
+    summoners_data = summoners_from_trace(meta, by_url)
+    print(f"Trace: {sum(len(times) for times, _ in by_url.values())} réponses, {len(by_url)} URLs, "
+          f"{trace_seconds:.0f}s enregistrées, rejouées en {trace_seconds / args.speed:.0f}s", flush=True)
+
+    workdir = make_workdir('replay_')
+    os.chdir(workdir)
+
+    port = free_port()
+    os.environ.update({
+        'API_RIOT_KEY': os.getenv('API_RIOT_KEY', 'replay-key'),
+        'API_RIOT_TFT_KEY': os.getenv('API_RIOT_TFT_KEY', 'replay-tft-key'),
+        'RIOT_REGIONAL_URL': f"http://127.0.0.1:{port}",
+        'RIOT_PLATFORM_URL': f"http://127.0.0.1:{port}",
+        'DELIVERY_BATCH_WINDOW': str(float(os.getenv('DELIVERY_BATCH_WINDOW', 3)) / args.speed),
+        'LOG_LEVEL': os.getenv('LOG_LEVEL', 'WARNING'),
+    })
+    os.environ.pop('RIOT_RECORD', None)
+    if args.rate_limits:
+        os.environ['RIOT_RATE_LIMITS'] = args.rate_limits
+    from log_config import setup_logging
+    setup_logging()
+
+    context = multiprocessing.get_context('spawn')
+    server = context.Process(target=serve_replay, daemon=True,
+                             args=(port, traces, args.speed, args.latency_scale, workdir))
+    server.start()
+    try:
+        wait_for_port(port)
+        result = asyncio.run(replay(args, port, summoners_data, trace_seconds))
+    finally:
+        server.terminate()
+        server.join()
+
+    report = {
+        'benchmark': 'replay',
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'traces': traces,
+        'result': result,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f"notifications {result['notifications']}, cycle p50 "
+          f"{result['start_cycle_seconds'].get('p50', 0):.3f}s, résultats écrits dans {output}")
+
+
+if __name__ == '__main__':
+    main()
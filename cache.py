@@ -0,0 +1,51 @@
+import time
+from collections import OrderedDict
+from metrics import record_cache
+
+
+class TTLCache:
+    """Small in-memory cache whose entries expire `ttl` seconds after being set.
+
+    Least recently used entries are evicted beyond `maxsize`. Lookups are
+    counted in cache_requests_total under the cache's name.
+    """
+
+    def __init__(self, name, ttl, maxsize=1000):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            record_cache(self.name, False)
+            return default
+        self._entries.move_to_end(key)
+        record_cache(self.name, True)
+        return entry[1]
+
+    def peek(self, key, default=None):
+        """Like get, without counting the lookup or refreshing the entry's recency"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def set(self, key, value, ttl=None):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._entries.clear()
@@ -1,8 +1,24 @@
 import discord
+import logging
 from discord.ext import tasks  # Apparemment inutilisé, donc à supprimer si non nécessaire.
 from discord import app_commands
-from riot_api import fetchGameOngoing, fetchGameResult, requestSummoner, fetchRanks, fetchMasteries, requestSummonerTFT, fetchRanksTFT
+from riot_api import (fetchGameOngoing, requestSummoner, fetchMasteries, requestSummonerTFT,
+                      fetchAccount, fetchSummoner, fetchRanksByPuuid, fetchRanksTFTByPuuid,
+                      profileIconUrl, call_limited, tft_rate_limiter, RiotUnavailable)
+from cache import TTLCache
+from autocomplete import summoner_index
+from pagination import PaginatedView, chunk
+from summoner_list import list_cache, render_page
+from leaderboard import leaderboards
+from match_archive import archive, player_stats
+from backfill import backfill
+import re
 from data_manager import DataManager  # Assurez-vous qu'il n'y a plus d'import inutile.
+from notifications import compose_mastery_banner, short_rank
+from live_state import live_state
+from poller import PUUID_FIELDS, plays
+from tracing import tracer
+from profiler import profiler
 import urllib.parse
 import os
 from PIL import Image
@@ -10,42 +26,291 @@ import io
 import aiohttp
 import asyncio
 
+logger = logging.getLogger(__name__)
+
 # Initialiser DataManager
 data_manager = DataManager()
 
 key = os.getenv("API_RIOT_KEY")
 
+MAX_BULK_ENTRIES = 200
+MAX_BULK_FILE_SIZE = 100_000
+LINES_PER_PAGE = 20
+
+# Profils /invocateur déjà assemblés, et puuids des Riot IDs par clé d'API
+profile_cache = TTLCache('profile', int(os.getenv('PROFILE_CACHE_TTL', 120)), maxsize=500)
+account_cache = TTLCache('account', 3600, maxsize=2000)
+
+GAMES_CHOICES = [
+    app_commands.Choice(name='LoL', value='lol'),
+    app_commands.Choice(name='TFT', value='tft'),
+    app_commands.Choice(name='LoL et TFT', value='lol+tft'),
+]
+
+
+GAME_NAMES = {'lol': 'LoL', 'tft': 'TFT'}
+
+QUEUE_CHOICES = [
+    app_commands.Choice(name='Solo/Duo', value='RANKED_SOLO_5x5'),
+    app_commands.Choice(name='Flex', value='RANKED_FLEX_SR'),
+]
+
+STATS_MODE_CHOICES = [
+    app_commands.Choice(name='Toutes les parties', value='all'),
+    app_commands.Choice(name='Classées', value='ranked'),
+    app_commands.Choice(name='Solo/Duo', value='solo'),
+    app_commands.Choice(name='Flex', value='flex'),
+    app_commands.Choice(name='Normales', value='normal'),
+    app_commands.Choice(name='ARAM', value='aram'),
+]
+MAX_STATS_CHAMPIONS = 5
+
+
+def games_label(summoner):
+    return " et ".join(GAME_NAMES[game] for game in summoner.get('games', ['lol']))
+
+
+async def resolve_tft_puuid(pseudo, tag):
+    """puuid for API_RIOT_TFT_KEY (each Riot key sees different puuids)"""
+    summoner_tft = await requestSummonerTFT(pseudo, tag)
+    return summoner_tft[5]
+
+
+def find_tracked_summoner(pseudo, tag):
+    """A tracked summoner with this Riot ID, in any guild"""
+    wanted = (pseudo.casefold(), tag.casefold())
+    for summoners in data_manager.summoners_data.values():
+        for summoner in summoners:
+            if (summoner.get('name', '').casefold(), summoner.get('tag', '').casefold()) == wanted:
+                return summoner
+    return None
+
+
+async def resolve_puuid(pseudo, tag, game):
+    """(puuid, gameName, tagLine) of a Riot ID for the API key of `game`.
+
+    Tracked summoners already store both puuids; others are cached for an hour.
+    """
+    tracked = find_tracked_summoner(pseudo, tag)
+    if tracked and tracked.get(PUUID_FIELDS[game]):
+        return tracked[PUUID_FIELDS[game]], tracked['name'], tracked['tag']
+    cache_key = (game, pseudo.casefold(), tag.casefold())
+    account = account_cache.get(cache_key)
+    if account is None:
+        limiter = tft_rate_limiter if game == 'tft' else None
+        account_data = await call_limited(fetchAccount, pseudo, tag, game, limiter=limiter, name=game)
+        account = (account_data['puuid'], account_data.get('gameName', pseudo), account_data.get('tagLine', tag))
+        account_cache.set(cache_key, account)
+    return account
+
+
+async def fetch_profile(pseudo, tag):
+    """{'name', 'tag', 'level', 'icon', 'ranks', 'ranks_tft'} of a Riot ID.
+
+    The LoL and TFT accounts are resolved concurrently (one per API key), then the
+    summoner and both leagues are fetched concurrently. A TFT failure only leaves
+    'ranks_tft' empty.
+    """
+    cache_key = (pseudo.casefold(), tag.casefold())
+    profile = profile_cache.get(cache_key)
+    if profile is not None:
+        return profile
+
+    async def lol():
+        puuid, name, tagline = await resolve_puuid(pseudo, tag, 'lol')
+        summoner, ranks = await asyncio.gather(
+            call_limited(fetchSummoner, puuid), call_limited(fetchRanksByPuuid, puuid))
+        return name, tagline, summoner, ranks
+
+    async def tft():
+        puuid, _, _ = await resolve_puuid(pseudo, tag, 'tft')
+        return await call_limited(fetchRanksTFTByPuuid, puuid, limiter=tft_rate_limiter, name='tft')
+
+    lol_result, ranks_tft = await asyncio.gather(lol(), tft(), return_exceptions=True)
+    if isinstance(lol_result, Exception):
+        raise lol_result
+    if isinstance(ranks_tft, Exception):
+        logger.info("Rangs TFT indisponibles pour %s#%s: %s", pseudo, tag, ranks_tft)
+        ranks_tft = None
+    name, tagline, summoner, ranks = lol_result
+    profile = {
+        'name': name,
+        'tag': tagline,
+        'level': "Lvl." + str(summoner['summonerLevel']),
+        'icon': profileIconUrl(summoner['profileIconId']),
+        'ranks': ranks or {},
+        'ranks_tft': ranks_tft or {},
+    }
+    # Un profil incomplet n'est pas gardé : la prochaine demande réessaie
+    if ranks is not None and ranks_tft is not None:
+        profile_cache.set(cache_key, profile)
+    return profile
+
+
+def next_summoner_id(guild_summoners):
+    """Next free list ID (len + 1 would reuse the ID of the last one after a removal)"""
+    return max((s['id'] for s in guild_summoners), default=0) + 1
+
+
+def parse_riot_ids(text):
+    """([(pseudo, tag)], [invalid entries]) from 'pseudo#tag' entries or 'pseudo,tag' CSV lines"""
+    riot_ids, invalid = [], []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if '#' in line:
+            entries = [entry.strip() for entry in re.split(r'[,;\t]', line) if entry.strip()]
+            for entry in entries:
+                pseudo, _, tag = entry.partition('#')
+                if pseudo.strip() and tag.strip() and '#' not in tag:
+                    riot_ids.append((pseudo.strip(), tag.strip()))
+                else:
+                    invalid.append(entry)
+        else:
+            columns = [column.strip() for column in re.split(r'[,;\t]', line)]
+            if len(columns) == 2 and all(columns):
+                riot_ids.append((columns[0], columns[1]))
+            else:
+                invalid.append(line)
+    return riot_ids, invalid
+
+
+async def resolve_new_summoner(pseudo, tag, games):
+    """Summoner entry for /addsummoners, without its list ID"""
+    puuid, name, tagline = await resolve_puuid(pseudo, tag, 'lol')
+    tracked = find_tracked_summoner(name, tagline)
+
+    async def summoner_id():
+        if tracked and tracked.get('puuid') == puuid and tracked.get('summonerId'):
+            return tracked['summonerId']
+        return (await call_limited(fetchSummoner, puuid)).get('id')
+
+    async def tft_puuid():
+        if 'tft' in games:
+            return (await resolve_puuid(pseudo, tag, 'tft'))[0]
+        return None
+
+    riot_summoner_id, tft = await asyncio.gather(summoner_id(), tft_puuid())
+    summoner = {'name': name, 'tag': tagline, 'puuid': puuid, 'summonerId': riot_summoner_id, 'games': games}
+    if tft:
+        summoner['tft_puuid'] = tft
+    return summoner
+
+
+def live_game_of(summoner):
+    """The ongoing game of a tracked summoner according to the poller.
+
+    Returns (entry, True) when in game, (None, True) when every followed game
+    was polled recently and none is ongoing, (None, False) when the state is
+    missing or stale and the API must be asked.
+    """
+    entries = [live_state.get(summoner.get(PUUID_FIELDS[game]))
+               for game in ('lol', 'tft') if plays(summoner, game)]
+    ongoing = next((entry for entry in entries if entry and entry['game_id']), None)
+    if ongoing:
+        return ongoing, True
+    return None, bool(entries) and all(entries)
+
+
+def build_ingame_embed(name, tag, game, game_mode, champion_name, champion_icon, started_at=None):
+    encoded_name = urllib.parse.quote(name)
+    encoded_tag = urllib.parse.quote(tag)
+    if game == 'tft':
+        url = f"https://lolchess.gg/profile/euw/{encoded_name}-{encoded_tag}"
+        plays_with = "joue avec"
+    else:
+        url = f"https://porofessor.gg/fr/live/euw/{encoded_name}%20-{encoded_tag}"
+        plays_with = "joue"
+    description = f"**[En jeu]({url})**\n\n{name} est en **{game_mode}**. Il {plays_with} **{champion_name}**"
+    if started_at:
+        description += f"\nPartie repérée <t:{int(started_at)}:R>"
+    embed = discord.Embed(description=description, color=discord.Colour.blue())
+    embed.set_thumbnail(url=champion_icon)
+    return embed
+
+
+def build_stats_embed(summoner, stats, mode_name):
+    kda_p25, _, kda_p75 = stats['kda_percentiles']
+    dpm_p25, _, dpm_p75 = stats['dpm_percentiles']
+    embed = discord.Embed(
+        title=f"Statistiques de {summoner['name']}#{summoner['tag']}",
+        description=f"{stats['games']} dernières parties · {mode_name}",
+        color=discord.Colour.blue())
+    embed.add_field(name="Victoires", value=f"{stats['wins']}/{stats['games']} ({stats['win_rate']:.0f}%)")
+    embed.add_field(name="KDA", value=f"{stats['kills']:.1f}/{stats['deaths']:.1f}/{stats['assists']:.1f} "
+                                      f"({stats['kda']:.2f})\np25–p75 : {kda_p25:.2f}–{kda_p75:.2f}")
+    embed.add_field(name="Dégâts/min", value=f"{stats['dpm']:.0f}\np25–p75 : {dpm_p25:.0f}–{dpm_p75:.0f}")
+    embed.add_field(name="CS/min", value=f"{stats['cs_per_minute']:.1f}")
+    embed.add_field(name="Vision/min", value=f"{stats['vision_per_minute']:.2f}")
+    embed.add_field(name="Participation", value=f"{stats['kill_participation']:.0f}% des kills\n"
+                                                f"{stats['damage_share']:.0f}% des dégâts")
+    multikills = stats['multikills']
+    embed.add_field(name="Multikills", value=f"{multikills['double']} double · {multikills['triple']} triple · "
+                                             f"{multikills['quadra']} quadra · {multikills['penta']} penta")
+    embed.add_field(name="First blood", value=f"{stats['first_blood_rate']:.0f}%")
+    champions = [f"**{c['champion']}** · {c['games']} parties · {c['win_rate']:.0f}% · "
+                 f"KDA {c['kda']:.2f} · {c['dpm']:.0f} DPM"
+                 for c in stats['champions'][:MAX_STATS_CHAMPIONS]]
+    embed.add_field(name="Champions", value="\n".join(champions), inline=False)
+    return embed
+
+
+async def pseudo_autocomplete(interaction: discord.Interaction, current: str):
+    return [app_commands.Choice(name=label, value=name)
+            for label, name in summoner_index.names(interaction.guild_id, current)]
+
+
+async def tag_autocomplete(interaction: discord.Interaction, current: str):
+    pseudo = getattr(interaction.namespace, 'pseudo', None) or ''
+    return [app_commands.Choice(name=tag, value=tag)
+            for tag in summoner_index.tags(interaction.guild_id, pseudo, current)]
+
+
+async def identifier_autocomplete(interaction: discord.Interaction, current: str):
+    return [app_commands.Choice(name=label, value=summoner_id)
+            for label, summoner_id in summoner_index.identifiers(interaction.guild_id, current)]
+
+
+async def remove_identifier_autocomplete(interaction: discord.Interaction, current: str):
+    # removesummoner prend un texte : l'ID ou 'all'
+    choices = [app_commands.Choice(name=label, value=str(summoner_id))
+               for label, summoner_id in summoner_index.identifiers(interaction.guild_id, current)]
+    if 'all'.startswith(current.lower()):
+        choices = [app_commands.Choice(name="all · tous les invocateurs", value='all')] + choices[:24]
+    return choices
+
+
 def setup_commands(client, tree):
     # Remove any existing command definitions first
     tree.clear_commands(guild=None)
 
     @tree.command(name='invocateur', description='Profil d\'Invocateur')
     @app_commands.describe(pseudo='Nom invocateur', tag='EUW')
+    @app_commands.autocomplete(pseudo=pseudo_autocomplete, tag=tag_autocomplete)
     async def invocateur(interaction: discord.Interaction, pseudo: str, tag: str):
         await interaction.response.defer()
         try:
-            print('Invocateur trouvé')
-            summoner = await requestSummoner(pseudo, tag, key)
-            summonerTFT = await requestSummonerTFT(pseudo, tag, key)
-            summoner_id, puuid = summoner[4], summoner[6]
-            summonerRanks = fetchRanks(summonerId=summoner_id)
-            summonerRanksTFT = fetchRanksTFT(summonerTFTId=summonerTFT[4])  
+            logger.debug("Profil demandé: %s#%s", pseudo, tag)
+            with tracer.span('fetch-profile'):
+                profile = await fetch_profile(pseudo, tag)
             embed = discord.Embed(
-                title=f"{summoner[1]} #{tag}",
-                description=f"Niveau: {summoner[2]}",
+                title=f"{profile['name']} #{profile['tag']}",
+                description=f"Niveau: {profile['level']}",
                 color=discord.Colour.gold()
             )
-            embed.set_thumbnail(url=summoner[3])
+            embed.set_thumbnail(url=profile['icon'])
+            summoner_index.remember(interaction.guild_id, profile['name'], profile['tag'])
 
-            for queue_type, rank_info in summonerRanks.items():
+            for queue_type, rank_info in profile['ranks'].items():
                 if queue_type == 'RANKED_SOLO_5x5':
-                    embed.add_field(name='Solo/Duo', value=rank_info, inline=False)
+                    embed.add_field(name='Solo/Duo', value=rank_info['display'], inline=False)
                 elif queue_type == 'RANKED_FLEX_SR':
-                    embed.add_field(name='Flex', value=rank_info, inline=False)
+                    embed.add_field(name='Flex', value=rank_info['display'], inline=False)
                 elif queue_type == 'CHERRY':
-                    embed.add_field(name='Arena', value=rank_info, inline=False)
+                    embed.add_field(name='Arena', value=rank_info['display'], inline=False)
 
-            for queue_type, rank_info in summonerRanksTFT.items():
+            for queue_type, rank_info in profile['ranks_tft'].items():
                 if queue_type == 'RANKED_TFT':
                     embed.add_field(name='Classé', value=rank_info, inline=False)
                 elif queue_type == 'RANKED_TFT_DOUBLE_UP':
@@ -58,10 +323,11 @@ def setup_commands(client, tree):
             await interaction.followup.send(f"Erreur : {str(e)}")
         except Exception as e:
             await interaction.followup.send("Une erreur inattendue est survenue.")
-            print(f"Erreur inattendue : {e}")
+            logger.exception("Erreur inattendue : %s", e)
 
     @tree.command(name='maitrises', description='Meilleures Maitrises d\'un Invocateur')
     @app_commands.describe(pseudo='Nom invocateur', tag='EUW', count='Nombre de champions à afficher (1-5)')
+    @app_commands.autocomplete(pseudo=pseudo_autocomplete, tag=tag_autocomplete)
     async def maitrises(interaction: discord.Interaction, pseudo: str, tag: str, count: int):
         await interaction.response.defer()
         try:
@@ -70,6 +336,7 @@ def setup_commands(client, tree):
                 return
 
             summoner = await requestSummoner(pseudo, tag, key = key)
+            summoner_index.remember(interaction.guild_id, summoner[1], summoner[0])
             summonerMasteries = fetchMasteries(puuid=summoner[6], count=count)
             
             async def get_image(url):
@@ -83,20 +350,8 @@ def setup_commands(client, tree):
             images = await asyncio.gather(*[get_image(icon) for icon, _, _, _ in summonerMasteries])
             images = [img for img in images if img is not None]
             
-            # Create a combined image
-            total_width = sum(img.width for img in images)
-            max_height = max(img.height for img in images)
-            
-            combined_image = Image.new('RGBA', (total_width, max_height))
-            x_offset = 0
-            for img in images:
-                combined_image.paste(img, (x_offset, 0))
-                x_offset += img.width
-
-            # Save the combined image to bytes
-            combined_bytes = io.BytesIO()
-            combined_image.save(combined_bytes, format='PNG')
-            combined_bytes.seek(0)
+            # Create a combined image, off the event loop
+            combined_bytes = io.BytesIO(await asyncio.to_thread(compose_mastery_banner, images))
             
             # Create the embed
             embed = discord.Embed(
@@ -128,17 +383,18 @@ def setup_commands(client, tree):
             await interaction.followup.send(f"Erreur : {str(e)}")
         except Exception as e:
             await interaction.followup.send("Une erreur inattendue est survenue.")
-            print(f"Erreur inattendue : {e}")
+            logger.exception("Erreur inattendue : %s", e)
     
 
     @tree.command(name='addsummoner', description='Ajouter un invocateur à la liste pour être notifié quand celui-ci est en game')
-    @app_commands.describe(pseudo='Nom invocateur', tag='EUW')
-    async def addsummoner(interaction: discord.Interaction, pseudo: str, tag: str):
+    @app_commands.describe(pseudo='Nom invocateur', tag='EUW', jeux='Jeux à suivre (LoL par défaut)')
+    @app_commands.choices(jeux=GAMES_CHOICES)
+    async def addsummoner(interaction: discord.Interaction, pseudo: str, tag: str, jeux: str = 'lol'):
         try:
             guild_id = str(interaction.guild_id)  # Convert to string for consistency
-            print(f"Requesting summoner with pseudo: {pseudo}, tag: {tag}")
+            logger.debug("Requesting summoner with pseudo: %s, tag: %s", pseudo, tag)
             summoner = await requestSummoner(pseudo, tag, key)
-            print(f"Summoner information: {summoner}")
+            logger.debug("Summoner information: %s", summoner)
                 
             if summoner:
                 # Load existing summoners for this guild
@@ -150,32 +406,140 @@ def setup_commands(client, tree):
                     return
                     
                 # Generate new ID based on guild's current summoner list
-                summoner_id = len(guild_summoners) + 1
+                summoner_id = next_summoner_id(guild_summoners)
                 new_summoner = {
                     'id': summoner_id,
                     'name': summoner[1],
                     'tag': tag,
                     'puuid': summoner[6],
-                    'summonerId': summoner[4]  # Added the Riot summonerId
+                    'summonerId': summoner[4],  # Added the Riot summonerId
+                    'games': jeux.split('+')
                 }
+                if 'tft' in new_summoner['games']:
+                    new_summoner['tft_puuid'] = await resolve_tft_puuid(pseudo, tag)
                     
                 # Add to guild's summoner list and save
                 guild_summoners.append(new_summoner)
                 data_manager.save_summoners_to_watch(guild_summoners, guild_id)
+                summoner_index.add(guild_id, new_summoner)
+                # Historique téléchargé en tâche de fond, sur le budget d'API libre
+                if plays(new_summoner, 'lol'):
+                    backfill.enqueue(new_summoner['puuid'])
                     
                 await interaction.response.send_message(
-                    f"Summoner {summoner[1]}#{tag} a été ajouté à la liste avec l'ID {summoner_id}."
+                    f"Summoner {summoner[1]}#{tag} a été ajouté à la liste avec l'ID {summoner_id} ({games_label(new_summoner)})."
                 )
             else:
                 await interaction.response.send_message("Erreur : L'invocateur n'a pas pu être trouvé.")
         except ValueError as e:
-            print(f"Erreur de valeur : {e}")
+            logger.info("Erreur de valeur : %s", e)
             await interaction.response.send_message(f"Erreur : {str(e)}")
         except Exception as e:
-            print(f"Erreur inattendue : {e}")
+            logger.exception("Erreur inattendue : %s", e)
+            await interaction.response.send_message("Une erreur inattendue est survenue.")
+
+    @tree.command(name='addsummoners', description='Ajouter plusieurs invocateurs à la fois (pseudo#tag, ou fichier texte/CSV)')
+    @app_commands.describe(joueurs='Liste de pseudo#tag séparés par des virgules', fichier='Fichier texte ou CSV, un joueur par ligne',
+                           jeux='Jeux à suivre (LoL par défaut)')
+    @app_commands.choices(jeux=GAMES_CHOICES)
+    async def addsummoners(interaction: discord.Interaction, joueurs: str = None, fichier: discord.Attachment = None,
+                           jeux: str = 'lol'):
+        await interaction.response.defer()
+        try:
+            guild_id = str(interaction.guild_id)
+            text = joueurs or ''
+            if fichier:
+                if fichier.size > MAX_BULK_FILE_SIZE:
+                    await interaction.followup.send("Le fichier est trop volumineux (100 Ko maximum).")
+                    return
+                text += '\n' + (await fichier.read()).decode('utf-8-sig', errors='replace')
+
+            riot_ids, invalid = parse_riot_ids(text)
+            # Riot IDs are case-insensitive: one lookup per player
+            unique = {}
+            for pseudo, tag in riot_ids:
+                unique.setdefault((pseudo.casefold(), tag.casefold()), (pseudo, tag))
+            riot_ids = list(unique.values())
+            if not riot_ids:
+                await interaction.followup.send("Aucun pseudo#tag valide trouvé.")
+                return
+            if len(riot_ids) > MAX_BULK_ENTRIES:
+                await interaction.followup.send(f"Trop d'invocateurs ({len(riot_ids)}), {MAX_BULK_ENTRIES} maximum par import.")
+                return
+
+            games = jeux.split('+')
+            with tracer.span('resolve-summoners'):
+                results = await asyncio.gather(
+                    *(resolve_new_summoner(pseudo, tag, games) for pseudo, tag in riot_ids), return_exceptions=True)
+
+            guild_summoners = data_manager.load_summoners_to_watch(guild_id)
+            by_puuid = {s['puuid']: s for s in guild_summoners}
+            added, lines = [], []
+            for (pseudo, tag), result in zip(riot_ids, results):
+                if isinstance(result, ValueError):
+                    lines.append(f"❌ {pseudo}#{tag} : {result}")
+                elif isinstance(result, Exception):
+                    logger.warning("Erreur lors de l'import de %s#%s: %s", pseudo, tag, result)
+                    lines.append(f"❌ {pseudo}#{tag} : erreur inattendue")
+                elif result['puuid'] in by_puuid:
+                    existing = by_puuid[result['puuid']]
+                    lines.append(f"↩️ {existing['name']}#{existing['tag']} déjà suivi (ID {existing['id']})")
+                else:
+                    result = {'id': next_summoner_id(guild_summoners), **result}
+                    guild_summoners.append(result)
+                    by_puuid[result['puuid']] = result
+                    added.append(result)
+                    lines.append(f"✅ **{result['name']}#{result['tag']}** ajouté (ID {result['id']})")
+            lines += [f"❌ `{entry[:50]}` : format invalide (attendu pseudo#tag)" for entry in invalid]
+
+            # Une seule écriture du fichier pour tout l'import
+            if added:
+                data_manager.save_summoners_to_watch(guild_summoners, guild_id)
+                for summoner in added:
+                    summoner_index.add(guild_id, summoner)
+                    if plays(summoner, 'lol'):
+                        backfill.enqueue(summoner['puuid'])
+
+            summary = (f"{len(added)} ajouté(s) en {games_label({'games': games})}, "
+                       f"{len(riot_ids) + len(invalid) - len(added)} ignoré(s)")
+            pages = chunk(lines, LINES_PER_PAGE)
+
+            def render(index):
+                return discord.Embed(title="Import d'invocateurs", description=summary + "\n\n" + "\n".join(pages[index]),
+                                     color=discord.Colour.green() if added else discord.Colour.orange())
+
+            await PaginatedView(len(pages), render, interaction.user.id).send(interaction, followup=True)
+        except Exception as e:
+            logger.exception("Erreur inattendue : %s", e)
+            await interaction.followup.send("Une erreur inattendue est survenue.")
+
+    @tree.command(name='setgames', description='Choisir les jeux suivis pour un invocateur')
+    @app_commands.describe(identifier='ID de l\'invocateur (voir /listsummoners)', jeux='Jeux à suivre')
+    @app_commands.choices(jeux=GAMES_CHOICES)
+    @app_commands.autocomplete(identifier=identifier_autocomplete)
+    async def setgames(interaction: discord.Interaction, identifier: int, jeux: str):
+        try:
+            guild_id = str(interaction.guild_id)
+            guild_summoners = data_manager.load_summoners_to_watch(guild_id)
+            summoner = next((s for s in guild_summoners if s['id'] == identifier), None)
+            if not summoner:
+                await interaction.response.send_message(f"Aucun invocateur trouvé avec l'ID {identifier}.", ephemeral=True)
+                return
+
+            games = jeux.split('+')
+            if 'tft' in games and not summoner.get('tft_puuid'):
+                summoner['tft_puuid'] = await resolve_tft_puuid(summoner['name'], summoner['tag'])
+            summoner['games'] = games
+            data_manager.save_summoners_to_watch(guild_summoners, guild_id)
+            await interaction.response.send_message(f"{summoner['name']} est maintenant suivi en {games_label(summoner)}.")
+        except ValueError as e:
+            await interaction.response.send_message(f"Erreur : {str(e)}", ephemeral=True)
+        except Exception as e:
             await interaction.response.send_message("Une erreur inattendue est survenue.")
+            logger.exception("Unexpected error: %s", e)
 
     @tree.command(name="removesummoner", description="Supprimer un invocateur de la liste de suivi")
+    @app_commands.autocomplete(identifier=remove_identifier_autocomplete)
     async def removesummoner(interaction: discord.Interaction, identifier: str):
         try:
             guild_id = str(interaction.guild_id)
@@ -183,6 +547,7 @@ def setup_commands(client, tree):
 
             if identifier.lower() == 'all':
                 data_manager.save_summoners_to_watch([], guild_id)
+                summoner_index.clear(guild_id)
                 await interaction.response.send_message("Tous les invocateurs ont été supprimés de la liste de suivi.")
                 return
 
@@ -201,58 +566,128 @@ def setup_commands(client, tree):
             if summoner_to_remove:
                 guild_summoners.remove(summoner_to_remove)
                 data_manager.save_summoners_to_watch(guild_summoners, guild_id)
+                summoner_index.remove(guild_id, summoner_to_remove)
                 await interaction.response.send_message(f"L'invocateur {summoner_to_remove['name']} a été supprimé de la liste.")
             else:
                 await interaction.response.send_message(f"Aucun invocateur trouvé avec l'ID {summoner_id}.", ephemeral=True)
 
         except Exception as e:
             await interaction.response.send_message("Une erreur inattendue est survenue.")
-            print(f"Unexpected error: {e}")
+            logger.exception("Unexpected error: %s", e)
 
 
     @tree.command(name='listsummoners', description='Afficher la liste des invocateurs suivis')
     async def listsummoners(interaction: discord.Interaction):
         try:
             guild_id = str(interaction.guild_id)
-            guild_summoners = data_manager.load_summoners_to_watch(guild_id)
-            
-            if not guild_summoners:
+            if not list_cache.rows(guild_id):
                 await interaction.response.send_message("Aucun invocateur n'est suivi pour le moment.")
-            else:
-                summoner_list = "\n".join([f"ID: **{summoner['id']}** - {summoner['name']}#{summoner['tag']}" 
-                                        for summoner in guild_summoners])
-                embed = discord.Embed(description=f"Liste des invocateurs suivis :\n{summoner_list}")
-                await interaction.response.send_message(embed=embed)
+                return
+            view = PaginatedView(list_cache.page_count(guild_id), lambda index: render_page(guild_id, index),
+                                 interaction.user.id)
+            await view.send(interaction)
         except Exception as e:
             await interaction.response.send_message("Une erreur inattendue est survenue.")
-            print(f"Erreur inattendue : {e}")
-            
+            logger.exception("Erreur inattendue : %s", e)
+
+    @tree.command(name='leaderboard', description='Classement des invocateurs suivis')
+    @app_commands.describe(file='File classée (Solo/Duo par défaut)')
+    @app_commands.choices(file=QUEUE_CHOICES)
+    async def leaderboard(interaction: discord.Interaction, file: str = 'RANKED_SOLO_5x5'):
+        try:
+            guild_id = str(interaction.guild_id)
+            # Aucun appel à l'API : le classement suit les rangs relevés en début/fin de partie et chaque jour
+            puuids = leaderboards.board(guild_id, file).puuids()
+            if not puuids:
+                await interaction.response.send_message("Aucun rang connu pour les invocateurs suivis dans cette file.")
+                return
+
+            names = {s['puuid']: f"{s['name']}#{s['tag']}" for s in data_manager.get_summoners_for_guild(guild_id)}
+            queue_name = next(choice.name for choice in QUEUE_CHOICES if choice.value == file)
+            medals = {1: '🥇', 2: '🥈', 3: '🥉'}
+            lines = [f"{medals.get(position, f'**{position}.**')} {names.get(puuid, '?')} · "
+                     f"{short_rank(leaderboards.latest.get(puuid), file)}"
+                     for position, puuid in enumerate(puuids, 1)]
+            pages = chunk(lines, LINES_PER_PAGE)
+
+            def render(index):
+                return discord.Embed(title=f"Classement {queue_name}", description="\n".join(pages[index]),
+                                     color=discord.Colour.gold())
+
+            await PaginatedView(len(pages), render, interaction.user.id).send(interaction)
+        except Exception as e:
+            await interaction.response.send_message("Une erreur inattendue est survenue.")
+            logger.exception("Erreur inattendue : %s", e)
+
+    @tree.command(name='stats', description="Statistiques des dernières parties d'un invocateur suivi")
+    @app_commands.describe(pseudo='Nom invocateur', tag='EUW', parties='Nombre de parties (100 par défaut)',
+                           mode='Type de parties')
+    @app_commands.autocomplete(pseudo=pseudo_autocomplete, tag=tag_autocomplete)
+    @app_commands.choices(mode=STATS_MODE_CHOICES)
+    async def stats(interaction: discord.Interaction, pseudo: str, tag: str,
+                    parties: app_commands.Range[int, 1, 500] = 100, mode: str = 'all'):
+        try:
+            summoner = find_tracked_summoner(pseudo, tag)
+            if not summoner or not summoner.get('puuid'):
+                await interaction.response.send_message(
+                    f"{pseudo}#{tag} n'est pas suivi : les statistiques ne portent que sur les invocateurs suivis.",
+                    ephemeral=True)
+                return
+            # Aucun appel à l'API : tout vient de l'archive des parties, chargée hors de la boucle
+            table = await asyncio.to_thread(archive.table, summoner['puuid'])
+            result = player_stats(table, parties, mode)
+            mode_name = next(choice.name for choice in STATS_MODE_CHOICES if choice.value == mode)
+            if result is None:
+                await interaction.response.send_message(
+                    f"Aucune partie archivée pour {summoner['name']}#{summoner['tag']} ({mode_name}).", ephemeral=True)
+                return
+            await interaction.response.send_message(embed=build_stats_embed(summoner, result, mode_name))
+        except Exception as e:
+            await interaction.response.send_message("Une erreur inattendue est survenue.")
+            logger.exception("Erreur inattendue : %s", e)
+
     @tree.command(name='ingame', description='Savoir si un joueur est en jeu')
     @app_commands.describe(pseudo='Nom invocateur', tag='EUW')
+    @app_commands.autocomplete(pseudo=pseudo_autocomplete, tag=tag_autocomplete)
     async def ingame(interaction: discord.Interaction, pseudo: str, tag: str):
         try:
-            summoner = await requestSummoner(pseudo, tag, key)
-            riot_id, champion_name, game_mode, game_id, champion_icon = fetchGameOngoing(puuid=summoner[6])
+            # Joueurs suivis : réponse depuis l'état du poller, sans appel à l'API
+            tracked = find_tracked_summoner(pseudo, tag)
+            if tracked:
+                entry, known = live_game_of(tracked)
+                if entry:
+                    embed = build_ingame_embed(
+                        tracked['name'], tracked['tag'], entry['game'], entry['game_mode'],
+                        entry['champion_name'], entry['champion_icon'], entry['started_at'])
+                    await interaction.response.send_message(embed=embed)
+                    return
+                if known:
+                    await interaction.response.send_message(f"{tracked['name']} n'est actuellement pas en jeu.", ephemeral=True)
+                    return
 
+            # Autres joueurs : appels à l'API, après defer pour ne pas dépasser les 3 s de Discord
+            await interaction.response.defer()
+            puuid, name, tagline = await resolve_puuid(pseudo, tag, 'lol')
+            riot_id, champion_name, game_mode, game_id, champion_icon = (
+                await call_limited(fetchGameOngoing, puuid))[:5]
+
+            summoner_index.remember(interaction.guild_id, name, tagline)
             if riot_id and game_mode:
-                encoded_name = urllib.parse.quote(summoner[1])
-                encoded_tag = urllib.parse.quote(summoner[0])
-                url = f"https://porofessor.gg/fr/live/euw/{encoded_name}%20-{encoded_tag}"
-                link_text = f"**[En jeu]({url})**"
-
-                embed = discord.Embed(
-                    description=f"{link_text}\n\n{summoner[1]} est en **{game_mode}**. Il joue **{champion_name}**",
-                    color=discord.Colour.blue()
-                )
-                embed.set_thumbnail(url=champion_icon)
-                await interaction.response.send_message(embed=embed)
+                embed = build_ingame_embed(name, tagline, 'lol', game_mode, champion_name, champion_icon)
+                await interaction.followup.send(embed=embed)
             else:
-                await interaction.response.send_message(f"{summoner[1]} n'est actuellement pas en jeu.", ephemeral=True)
+                await interaction.followup.send(f"{name} n'est actuellement pas en jeu.")
+        except RiotUnavailable as e:
+            logger.info("Partie en cours de %s#%s indisponible: %s", pseudo, tag, e)
+            await interaction.followup.send("L'API Riot ne répond pas pour le moment, réessayez dans quelques instants.",
+                                            ephemeral=True)
         except ValueError as e:
-            await interaction.response.send_message(f"Erreur : {str(e)}", ephemeral=True)
+            send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+            await send(f"Erreur : {str(e)}", ephemeral=True)
         except Exception as e:
-            await interaction.response.send_message("Une erreur inattendue est survenue.", ephemeral=True)
-            print(f"Erreur inattendue : {e}")
+            send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+            await send("Une erreur inattendue est survenue.", ephemeral=True)
+            logger.exception("Erreur inattendue : %s", e)
 
     @tree.command(name='sync', description='Owner Only')
     async def sync(interaction: discord.Interaction):
@@ -266,14 +701,74 @@ def setup_commands(client, tree):
             try:
                 await tree.sync()
                 await interaction.followup.send('Arbre de commandes synchronisé.')
-                print('Arbre de commandes synchronisé')
+                logger.info('Arbre de commandes synchronisé')
             except Exception as e:
                 await interaction.followup.send(f'Échec de la synchronisation des commandes : {e}')
-                print(f'Échec de la synchronisation des commandes : {e}')
+                logger.error('Échec de la synchronisation des commandes : %s', e)
         else:
             id = interaction.user.id
             await interaction.response.send_message(f'Seul le développeur peut utiliser cette commande -> {id} / {owner_id}')
 
+    @tree.command(name='botstats', description='Owner Only')
+    async def botstats(interaction: discord.Interaction):
+        idumi = os.getenv('ID_IDUMI')
+        if idumi is None or interaction.user.id != int(idumi):
+            await interaction.response.send_message('Seul le développeur peut utiliser cette commande.', ephemeral=True)
+            return
+
+        embed = discord.Embed(title="Bot stats", color=discord.Color.dark_grey())
+
+        cycles = tracer.cycle_stats()
+        cycle_lines = [
+            f"`{name}` ×{s['count']}: p50 {s['p50']:.2f}s, p95 {s['p95']:.2f}s, max {s['max']:.2f}s, dernier {s['last']:.2f}s"
+            for name, s in sorted(cycles.items())
+        ]
+        embed.add_field(name="Cycles", value="\n".join(cycle_lines)[:1024] or "Aucun cycle enregistré", inline=False)
+
+        # Where the time goes: spans ranked by cumulated duration
+        spans = sorted(tracer.span_stats().items(), key=lambda entry: entry[1]['total'], reverse=True)[:10]
+        span_lines = [
+            f"`{trace_name} › {span_name}` ×{s['count']}: total {s['total']:.1f}s, "
+            f"moy {s['total'] / s['count']:.3f}s, max {s['max']:.2f}s"
+            for (trace_name, span_name), s in spans
+        ]
+        embed.add_field(name="Étapes", value="\n".join(span_lines)[:1024] or "-", inline=False)
+
+        slowest_lines = [
+            f"`{trace_name} › {span_name}` {duration:.2f}s <t:{int(started_at)}:R>"
+            for duration, trace_name, span_name, started_at in tracer.slowest_spans(5)
+        ]
+        embed.add_field(name="Spans les plus lents", value="\n".join(slowest_lines)[:1024] or "-", inline=False)
+        embed.set_footer(text=f"{len(tracer.traces)} traces en mémoire")
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @tree.command(name='profile', description='Owner Only')
+    @app_commands.describe(duree='Durée du profilage en secondes', mode='sample (échantillonnage) ou cprofile (déterministe)')
+    @app_commands.choices(mode=[
+        app_commands.Choice(name='sample', value='sample'),
+        app_commands.Choice(name='cprofile', value='cprofile'),
+    ])
+    async def profile(interaction: discord.Interaction, duree: app_commands.Range[int, 5, 300] = 30, mode: str = 'sample'):
+        idumi = os.getenv('ID_IDUMI')
+        if idumi is None or interaction.user.id != int(idumi):
+            await interaction.response.send_message('Seul le développeur peut utiliser cette commande.', ephemeral=True)
+            return
+        if profiler.running:
+            await interaction.response.send_message('Un profilage est déjà en cours.', ephemeral=True)
+            return
+
+        await interaction.response.send_message(f'Profilage ({mode}) pendant {duree}s...', ephemeral=True)
+        try:
+            summary, files = await profiler.run(duree, mode)
+            await interaction.followup.send(
+                f"```\n{summary[:1900]}\n```",
+                files=[discord.File(path) for path in files],
+                ephemeral=True)
+        except Exception as e:
+            logger.exception("Profiling failed: %s", e)
+            await interaction.followup.send(f'Échec du profilage : {e}', ephemeral=True)
+
     @tree.command(name='setchannel', description="Définir le salon d'annonce des parties")
     async def set_notification_channel(interaction: discord.Interaction, channel: discord.TextChannel = None):
         """Set the channel for game notifications"""
@@ -368,7 +863,7 @@ def setup_commands(client, tree):
                 primary_keystone_url = f'https://raw.communitydragon.org/latest/plugins/rcp-be-lol-game-data/global/default/v1/perk-images/styles/{runes["primaryStyle"]["id"]}/{runes["primaryStyle"]["keystone"]["id"]}.png'
                 async with aiohttp.ClientSession() as session:
                     async with session.get(primary_keystone_url) as resp:
-                        print(f"Primary keystone status: {resp.status}")
+                        logger.debug("Primary keystone status: %s", resp.status)
                         if resp.status == 200:
                             image_data = await resp.read()
                             rune_image = Image.open(io.BytesIO(image_data))
@@ -380,7 +875,7 @@ def setup_commands(client, tree):
                 secondary_style_url = f'https://raw.communitydragon.org/latest/plugins/rcp-be-lol-game-data/global/default/v1/perk-images/styles/{runes["secondaryStyle"]["id"]}.png'
                 async with aiohttp.ClientSession() as session:
                     async with session.get(secondary_style_url) as resp:
-                        print(f"Secondary style status: {resp.status}")
+                        logger.debug("Secondary style status: %s", resp.status)
                         if resp.status == 200:
                             image_data = await resp.read()
                             rune_image = Image.open(io.BytesIO(image_data))
@@ -398,12 +893,12 @@ def setup_commands(client, tree):
                 await interaction.followup.send(files=[file], embed=embed)
                 
             except Exception as e:
-                print(f"Error creating combined image: {e}")
+                logger.warning("Error creating combined image: %s", e)
                 await interaction.followup.send(f"Error creating image: {str(e)}")
                 
         except Exception as e:
-            print(f"Error in testgame command: {str(e)}")
+            logger.exception("Error in testgame command: %s", e)
             try:
                 await interaction.followup.send(f"An error occurred: {str(e)}")
             except Exception as follow_up_error:
-                print(f"Error sending follow-up message: {str(follow_up_error)}")
\ No newline at end of file
+                logger.error("Error sending follow-up message: %s", follow_up_error)
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""pytest setup of the unit tests (python -m pytest -q from the repository root).
+
+The bot's singletons (DataManager, archives) read and write their JSON files in
+the working directory: the tests run in a temporary copy of the data files.
+"""
+import os
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_FILES = ('champion.json', 'tactician.json', 'items.json')
+
+# Script manuel contre la vraie API Riot, pas un test unitaire
+collect_ignore = ['test_tft.py']
+
+os.environ.setdefault('API_RIOT_KEY', 'test-key')
+os.environ.setdefault('API_RIOT_TFT_KEY', 'test-tft-key')
+
+
+def pytest_configure(config):
+    config.workdir = tempfile.mkdtemp(prefix='bot_tests_')
+    for name in DATA_FILES:
+        shutil.copy(os.path.join(ROOT, name), config.workdir)
+    os.chdir(config.workdir)
+
+
+def pytest_unconfigure(config):
+    os.chdir(ROOT)
+    shutil.rmtree(config.workdir, ignore_errors=True)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from data_manager import DataManager
+from leaderboard import leaderboards
+from poller import group_by_puuid
+from riot_api import fetchRanks, call_limited, resolve_summoner_id
+
+logger = logging.getLogger(__name__)
+data_manager = DataManager()
+
+# Taille max d'une description d'embed Discord
+EMBED_DESCRIPTION_LIMIT = 4096
+
+
+def format_rank_changes(summoner_name, rank_changes):
+    """Format the daily digest entry of one summoner"""
+    fields_content = []
+    for change in rank_changes:
+        if change['change_type'] == 'division':
+            value = f"**{change['old']}** → **{change['new']}**"
+            if change['lp_change'] != 0:
+                value += f"\nLP: {'+' if change['lp_change'] > 0 else ''}{change['lp_change']}"
+        else:
+            value = f"**{change['tier']} {change['rank']}**\nLP: {'+' if change['lp_change'] > 0 else ''}{change['lp_change']}"
+        fields_content.append(f"Queue {change['queue']}: {value}")
+
+    return f"**{summoner_name}**:\n" + "\n".join(fields_content)
+
+
+def chunk_messages(messages, limit=EMBED_DESCRIPTION_LIMIT):
+    """Group digest entries into descriptions that fit in one embed each"""
+    chunks, current = [], ""
+    for message in messages:
+        candidate = f"{current}\n\n{message}" if current else message
+        if len(candidate) > limit and current:
+            chunks.append(current)
+            current = message
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def collect_daily_ranks(summoners_data):
+    """Fetch today's ranks once per unique puuid and group the changes by guild.
+
+    Returns ({guild_id: [digest entries]}, stats).
+    """
+    started = time.monotonic()
+    tracking = group_by_puuid(summoners_data)
+
+    async def fetch(puuid, trackers):
+        summoner = trackers[0][1]
+        try:
+            summoner_id = await resolve_summoner_id(summoner)
+            if not summoner_id:
+                logger.debug("No data returned for summoner: %s", summoner['name'])
+                return puuid, None, None
+            return puuid, summoner_id, await call_limited(fetchRanks, summoner_id)
+        except Exception as e:
+            logger.warning("Error processing daily ranks for %s: %s", summoner['name'], e)
+            return puuid, None, None
+
+    results = await asyncio.gather(*(fetch(puuid, trackers) for puuid, trackers in tracking.items()))
+
+    # One write for every snapshot of the day
+    snapshots = {summoner_id: ranks for _, summoner_id, ranks in results if summoner_id and ranks is not None}
+    data_manager.store_daily_ranks(snapshots)
+
+    changes_by_guild = defaultdict(list)
+    for puuid, summoner_id, ranks in results:
+        if summoner_id not in snapshots:
+            continue
+        leaderboards.record(puuid, ranks, [guild_id for guild_id, _ in tracking[puuid]])
+        rank_changes = data_manager.get_daily_rank_changes(summoner_id)
+        if not rank_changes:
+            continue
+        for guild_id, summoner in tracking[puuid]:
+            changes_by_guild[guild_id].append(format_rank_changes(summoner['name'], rank_changes))
+
+    stats = {
+        'duration': time.monotonic() - started,
+        'unique_summoners': len(tracking),
+        'snapshots': len(snapshots),
+        'guilds_with_changes': len(changes_by_guild),
+    }
+    return changes_by_guild, stats
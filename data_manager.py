@@ -1,7 +1,12 @@
 import json
+import logging
 import os
 from datetime import datetime, timedelta  # Add this import if not already present
 
+logger = logging.getLogger(__name__)
+
+TFT_DEFAULT_ICON = 'https://raw.communitydragon.org/latest/game/assets/ux/tft/tft_logo.png'
+
 class DataManager:
     _instance = None
 
@@ -14,8 +19,10 @@ class DataManager:
         if not hasattr(self, "initialized"):
             self.summoners_file_path = summoners_file_path
             self.summoners_data = {}
+            self.summoners_version = {}  # guild_id -> bumped on every save, for the list caches
             self.notified_summoners = []
             self.champion_name_dict = self.load_champion_data()
+            self.tactician_data = self.load_tactician_data()
             self.client = client
             self.lp_tracker = {}  # Add this to track LP for each summoner
             self.temp_lp_data = {}  # Inisialisation de la variable temporaire
@@ -38,7 +45,7 @@ class DataManager:
             'tier': tier,
             'rank': rank
         }
-        print(f"Stored LP data for summoner ID {summoner_id} in {queue_type}")
+        logger.debug("Stored LP data for summoner ID %s in %s", summoner_id, queue_type)
 
     def get_lp_difference(self, summoner_id, queue_type, current_lp, current_tier, current_rank):
         """Calculate LP difference between stored and current LP"""
@@ -76,7 +83,7 @@ class DataManager:
         """Clear temporary LP data for a summoner"""
         if summoner_id in self.lp_tracker:
             del self.lp_tracker[summoner_id]
-            print(f"Cleared LP data for summoner ID {summoner_id}")
+            logger.debug("Cleared LP data for summoner ID %s", summoner_id)
 
 
 
@@ -91,7 +98,17 @@ class DataManager:
         
         self.daily_ranks[today][summoner_id] = ranks_data
         self.save_daily_ranks()
-        print(f"Debug - Stored daily rank for {summoner_id}")
+        logger.debug("Stored daily rank for %s", summoner_id)
+
+    def store_daily_ranks(self, ranks_by_summoner):
+        """Store the daily rank data of many summoners with a single write"""
+        # Reload first: other shard processes may have written their own snapshots
+        self.load_daily_ranks()
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        self.daily_ranks.setdefault(today, {}).update(ranks_by_summoner)
+        self.save_daily_ranks()
+        logger.info("Stored daily ranks for %d summoners", len(ranks_by_summoner))
 
     def load_daily_ranks(self):
         """Load daily ranks from file"""
@@ -154,6 +171,16 @@ class DataManager:
         
         return changes if changes else None
 
+    def get_latest_daily_ranks(self, summoner_id):
+        """Most recent daily rank snapshot of a summoner, or None"""
+        if not hasattr(self, 'daily_ranks'):
+            self.load_daily_ranks()
+        for day in sorted(self.daily_ranks, reverse=True):
+            ranks = self.daily_ranks[day].get(summoner_id)
+            if ranks is not None:
+                return ranks
+        return None
+
 
     
     def load_all_summoners(self):
@@ -161,7 +188,7 @@ class DataManager:
         try:
             # Create file if it doesn't exist
             if not os.path.exists(self.summoners_file_path):
-                print("Summoners file not found. Creating new file.")
+                logger.info("Summoners file not found. Creating new file.")
                 self.summoners_data = {}
                 self.save_summoners_to_watch([], None)
                 return self.summoners_data
@@ -170,17 +197,17 @@ class DataManager:
             with open(self.summoners_file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
                 if not content.strip():
-                    print("Empty summoners file. Initializing with empty structure")
+                    logger.info("Empty summoners file. Initializing with empty structure")
                     self.summoners_data = {}
                 else:
                     try:
                         self.summoners_data = json.loads(content)
                         if not isinstance(self.summoners_data, dict):
-                            print("Invalid data format found. Converting to proper structure.")
+                            logger.warning("Invalid data format found. Converting to proper structure.")
                             self.summoners_data = {}
-                        print("Summoners data loaded successfully")
+                        logger.info("Summoners data loaded successfully")
                     except json.JSONDecodeError as e:
-                        print(f"JSON decode error: {e}")
+                        logger.error("JSON decode error: %s", e)
                         self._create_backup()
                         self.summoners_data = {}
 
@@ -193,7 +220,7 @@ class DataManager:
             
             return self.summoners_data
         except Exception as e:
-            print(f"Error loading summoners: {e}")
+            logger.exception("Error loading summoners: %s", e)
             return {}
 
     def load_summoners_to_watch(self, guild_id):
@@ -212,14 +239,17 @@ class DataManager:
                     self.load_all_summoners()
                 self.summoners_data[guild_id] = summoners
 
+            for changed in ([guild_id] if guild_id is not None else list(self.summoners_data)):
+                self.summoners_version[changed] = self.summoners_version.get(changed, 0) + 1
+
             self._create_backup()
             
             with open(self.summoners_file_path, 'w', encoding='utf-8') as f:
                 json.dump(self.summoners_data, f, ensure_ascii=False, indent=4)
             
-            print(f"Summoners {'for guild ' + guild_id if guild_id else ''} saved successfully")
+            logger.info("Summoners %s saved successfully", f"for guild {guild_id}" if guild_id else '')
         except Exception as e:
-            print(f"Error saving summoners: {e}")
+            logger.exception("Error saving summoners: %s", e)
 
     def _create_backup(self):
         """Create backup of the summoners file"""
@@ -229,7 +259,10 @@ class DataManager:
                 import shutil
                 shutil.copy2(self.summoners_file_path, backup_path)
             except Exception as e:
-                print(f"Backup creation failed: {e}")
+                logger.warning("Backup creation failed: %s", e)
+
+    def get_summoners_version(self, guild_id):
+        return self.summoners_version.get(str(guild_id), 0)
 
     def get_summoners_for_guild(self, guild_id):
         """Get summoners for a specific guild"""
@@ -237,7 +270,7 @@ class DataManager:
         return self.summoners_data.get(guild_id, [])            
 
     def print_summoners_to_watch(self, prefix=''):
-        print(f"{prefix} Summoners to watch: {self.summoners}")
+        logger.info("%s Summoners to watch: %s", prefix, self.summoners_data)
 
     def load_champion_data(self):
         try:
@@ -245,32 +278,52 @@ class DataManager:
                 champion_data = json.load(f)
             return {int(info['key']): info['name'] for info in champion_data['data'].values()}
         except Exception as e:
-            print(f"Failed to load champion data: {e}")
+            logger.error("Failed to load champion data: %s", e)
             return {}
 
     def get_champion_name(self, champion_id):
         return self.champion_name_dict.get(champion_id, "Unknown Champion")
 
-    def add_notified_summoner(self, puuid, game_id, summoner_id):
+    def load_tactician_data(self):
+        """{companion item_ID: (name, ddragon icon url)} from tactician.json"""
+        try:
+            with open('tactician.json', 'r', encoding='utf-8') as f:
+                tactician_data = json.load(f)
+            icon_url = f"https://ddragon.leagueoflegends.com/cdn/{tactician_data['version']}/img/tft-tactician/{{}}"
+            return {int(item_id): (info['name'], icon_url.format(info['image']['full']))
+                    for item_id, info in tactician_data['data'].items()}
+        except Exception as e:
+            logger.error("Failed to load tactician data: %s", e)
+            return {}
+
+    def get_tactician(self, item_id):
+        """(name, icon url) of a TFT companion, with a generic icon for unknown ones"""
+        try:
+            return self.tactician_data[int(item_id)]
+        except (KeyError, TypeError, ValueError):
+            return "Tacticien", TFT_DEFAULT_ICON
+
+    def add_notified_summoner(self, puuid, game_id, summoner_id, game='lol'):
         """Add a summoner to the notified list with their summoner_id"""
         if not any(entry['puuid'] == puuid and entry['game_id'] == game_id for entry in self.notified_summoners):
             self.notified_summoners.append({
                 "puuid": puuid,
                 "game_id": game_id,
-                "summoner_id": summoner_id  # Using summoner_id instead of riot_id
+                "summoner_id": summoner_id,  # Using summoner_id instead of riot_id
+                "game": game  # 'lol' or 'tft' (puuid of the matching API key)
             })
-        print(f"Added summoner to notified_summoners with gameId: {game_id}")
+        logger.debug("Added %s to notified_summoners with gameId: %s", puuid, game_id)
         return self
 
     def remove_notified_summoner(self, puuid):
         self.notified_summoners = [
             entry for entry in self.notified_summoners if entry['puuid'] != puuid]
-        print(f"Removed {puuid} from notified_summoners")
+        logger.debug("Removed %s from notified_summoners", puuid)
 
     def remove_specific_notified_summoner(self, puuid, game_id):
         self.notified_summoners = [entry for entry in self.notified_summoners if not (
             entry['puuid'] == puuid and entry['game_id'] == game_id)]
-        print(f"Removed {puuid} with gameId {game_id} from notified_summoners")
+        logger.debug("Removed %s with gameId %s from notified_summoners", puuid, game_id)
 
     def get_notified_summoners(self):
         return self.notified_summoners
@@ -328,7 +381,7 @@ class DataManager:
                 
                 # Check if it's in the old format (list instead of dict)
                 if isinstance(old_data, list):
-                    print("Detected old data format, performing migration...")
+                    logger.info("Detected old data format, performing migration...")
                     
                     # Get all guilds the bot is currently in
                     from discord.ext.commands import Bot
@@ -346,14 +399,14 @@ class DataManager:
                         first_guild = next(iter(self.client.guilds), None)
                         if first_guild:
                             self.summoners[str(first_guild.id)] = temp_data
-                            print(f"Migrated {len(temp_data)} summoners to guild {first_guild.id}")
+                            logger.info("Migrated %d summoners to guild %s", len(temp_data), first_guild.id)
                     
                     # Save the new structure
                     self.save_summoners_to_watch([], None)
-                    print("Migration completed successfully")
+                    logger.info("Migration completed successfully")
                 
         except Exception as e:
-            print(f"Migration failed: {e}")
+            logger.exception("Migration failed: %s", e)
 
 
 
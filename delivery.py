@@ -0,0 +1,161 @@
+import asyncio
+import io
+import logging
+import os
+import time
+import aiohttp
+import discord
+from data_manager import DataManager
+from metrics import DISCORD_SEND_SECONDS
+from notifications import build_game_start_embed
+from rate_limiter import RateLimiter
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+data_manager = DataManager()
+
+# Discord accepte au plus 10 embeds par message
+MAX_EMBEDS_PER_MESSAGE = 10
+
+
+class ChannelState:
+    """Send queue and rate-limit bucket of a single channel"""
+
+    def __init__(self, channel_id, limits):
+        self.channel_id = channel_id
+        self.queue = asyncio.Queue()
+        self.bucket = RateLimiter(limits=limits, concurrency=1)
+        self.task = None
+
+
+class DeliveryManager:
+    """Per-channel Discord delivery with batching of same-game notifications.
+
+    Notifications sharing a (kind, game_id, guild_id) key that arrive within
+    ``batch_window`` seconds are merged into one message. Each channel drains
+    its own queue under a bucket matching Discord's per-channel limit, and
+    transient failures are retried with exponential backoff.
+    """
+
+    def __init__(self, client, on_delivered=None):
+        self.client = client
+        self.on_delivered = on_delivered
+        self.batch_window = float(os.getenv('DELIVERY_BATCH_WINDOW', 3))
+        self.max_retries = int(os.getenv('DELIVERY_MAX_RETRIES', 3))
+        self.channel_limits = ((5, 5),)  # 5 messages / 5s par salon
+        self.channels = {}
+        self.batches = {}  # (kind, game_id, guild_id) -> [items]
+        self._flush_tasks = set()
+        self.metrics = {
+            'notifications': 0,
+            'messages': 0,
+            'retries': 0,
+            'failures': 0,
+        }
+
+    def _channel(self, channel_id):
+        state = self.channels.get(channel_id)
+        if state is None:
+            state = ChannelState(channel_id, self.channel_limits)
+            self.channels[channel_id] = state
+        if state.task is None or state.task.done():
+            state.task = asyncio.create_task(self._channel_worker(state))
+        return state
+
+    async def submit(self, item):
+        """Queue a notification for its guild's channel, merging it with pending ones of the same game"""
+        key = (item['kind'], item['game_id'], item['guild_id'])
+        if key in self.batches:
+            self.batches[key].append(item)
+            return
+        self.batches[key] = [item]
+        # Référence gardée : une tâche sans référence peut être collectée avant la fin de la fenêtre
+        task = asyncio.create_task(self._flush_later(key))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task):
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Error flushing a notification batch", exc_info=task.exception())
+
+    async def _flush_later(self, key):
+        await asyncio.sleep(self.batch_window)
+        items = self.batches.pop(key, [])
+        # Salon lu une seule fois par lot (settings.json est relu à chaque appel)
+        channel_id = data_manager.get_notification_channel(key[2])
+        if not items or not channel_id:
+            return
+        state = self._channel(channel_id)
+        self.metrics['notifications'] += len(items)
+        for i in range(0, len(items), MAX_EMBEDS_PER_MESSAGE):
+            await state.queue.put(items[i:i + MAX_EMBEDS_PER_MESSAGE])
+
+    async def _channel_worker(self, state):
+        while True:
+            items = await state.queue.get()
+            try:
+                # Channels of guilds on another shard process are not cached, send through REST
+                channel = (self.client.get_channel(state.channel_id) or
+                           self.client.get_partial_messageable(state.channel_id))
+                with tracer.trace('delivery'):
+                    queued = time.perf_counter()
+                    async with state.bucket:
+                        tracer.record('channel-bucket-wait', time.perf_counter() - queued)
+                        await self._send_with_retry(channel, items)
+            except Exception as e:
+                self.metrics['failures'] += 1
+                logger.exception("Error delivering to channel %s: %s", state.channel_id, e)
+            finally:
+                state.queue.task_done()
+
+    async def _send_with_retry(self, channel, items):
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Les fichiers sont consommés à l'envoi, on les recrée à chaque tentative
+                started = time.perf_counter()
+                await channel.send(**build_message(items))
+                elapsed = time.perf_counter() - started
+                DISCORD_SEND_SECONDS.observe(elapsed)
+                tracer.record('channel.send', elapsed)
+                break
+            except discord.HTTPException as e:
+                if (e.status < 500 and e.status != 429) or attempt == self.max_retries:
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+            self.metrics['retries'] += 1
+            await asyncio.sleep(2 ** attempt)
+
+        self.metrics['messages'] += 1
+        now = time.monotonic()
+        for item in items:
+            if self.on_delivered:
+                self.on_delivered(item, now - item['detected_at'])
+            logger.info("Notification envoyée pour: %s dans le serveur: %s", item['label'], item['guild_id'])
+
+    def summary(self):
+        m = self.metrics
+        ratio = m['notifications'] / m['messages'] if m['messages'] else 0
+        return (f"delivery: {m['notifications']} notifications in {m['messages']} messages "
+                f"({ratio:.2f}/message), {m['retries']} retries, {m['failures']} failures, "
+                f"{len(self.channels)} channels")
+
+
+def build_message(items):
+    """Build channel.send kwargs for a batch of notifications of the same kind and game"""
+    if items[0]['kind'] == 'start':
+        return {'embed': build_game_start_embed([item['player'] for item in items], items[0]['game_mode'],
+                                                items[0].get('lineup'))}
+
+    embeds = [item['embed'] for item in items]
+    files = [discord.File(io.BytesIO(item['image']), filename=item['filename'])
+             for item in items if item.get('image')]
+    if len(embeds) == 1:
+        kwargs = {'embed': embeds[0]}
+    else:
+        kwargs = {'embeds': embeds}
+    if files:
+        kwargs['files'] = files
+    return kwargs
@@ -0,0 +1,115 @@
+"""Per-guild ranked leaderboards, kept up to date from the rank snapshots the bot
+already takes (game start, game end, daily job) instead of fetching every member.
+
+Each (guild, queue) board is a list sorted with bisect: a rank change costs two
+O(log n) searches, plus the memmove of the list tail on insert and delete.
+"""
+import logging
+from bisect import bisect_left, insort
+from data_manager import DataManager
+
+logger = logging.getLogger(__name__)
+data_manager = DataManager()
+
+LEADERBOARD_QUEUES = ('RANKED_SOLO_5x5', 'RANKED_FLEX_SR')
+TIERS = ('IRON', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'EMERALD', 'DIAMOND')
+APEX_TIERS = ('MASTER', 'GRANDMASTER', 'CHALLENGER')
+DIVISIONS = {'IV': 0, 'III': 1, 'II': 2, 'I': 3}
+
+
+def rank_score(rank):
+    """Comparable score of a parseRanks entry (Master+ LP are one continuous ladder)"""
+    tier = rank.get('tier')
+    if tier in APEX_TIERS:
+        return len(TIERS) * 400 + rank.get('lp', 0)
+    if tier not in TIERS:
+        return None
+    return TIERS.index(tier) * 400 + DIVISIONS.get(rank.get('rank'), 0) * 100 + rank.get('lp', 0)
+
+
+class Board:
+    """Players of one guild and queue, best first"""
+
+    def __init__(self):
+        self._entries = []  # sorted (-score, puuid)
+        self._keys = {}  # puuid -> its entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, puuid):
+        return puuid in self._keys
+
+    def update(self, puuid, score):
+        """Move a player to its new score, or drop it when score is None"""
+        old = self._keys.pop(puuid, None)
+        if old is not None:
+            del self._entries[bisect_left(self._entries, old)]
+        if score is not None:
+            entry = (-score, puuid)
+            insort(self._entries, entry)
+            self._keys[puuid] = entry
+
+    def remove(self, puuid):
+        self.update(puuid, None)
+
+    def position(self, puuid):
+        """1-based rank of a player, or None"""
+        entry = self._keys.get(puuid)
+        return bisect_left(self._entries, entry) + 1 if entry else None
+
+    def puuids(self):
+        return [puuid for _, puuid in self._entries]
+
+
+class Leaderboards:
+    def __init__(self):
+        self.latest = {}  # puuid -> last known parseRanks dict
+        self._boards = {}  # (guild_id, queue) -> Board
+        self._versions = {}  # guild_id -> summoners version the boards were synced with
+
+    def record(self, puuid, ranks, guild_ids):
+        """New snapshot of a tracked player, for the guilds tracking it.
+
+        Empty snapshots are ignored: fetchRanks also returns {} when the call fails.
+        """
+        if not puuid or not ranks:
+            return
+        self.latest[puuid] = ranks
+        for guild_id in guild_ids:
+            guild_id = str(guild_id)
+            if guild_id not in self._versions:
+                continue  # Board built from self.latest the first time it is shown
+            for queue in LEADERBOARD_QUEUES:
+                rank = ranks.get(queue)
+                self._boards[(guild_id, queue)].update(puuid, rank_score(rank) if rank else None)
+
+    def _sync(self, guild_id):
+        """Follow the guild's summoner list: add new members, drop removed ones"""
+        version = data_manager.get_summoners_version(guild_id)
+        if self._versions.get(guild_id) == version:
+            return
+        summoners = {s['puuid']: s for s in data_manager.get_summoners_for_guild(guild_id) if s.get('puuid')}
+        for queue in LEADERBOARD_QUEUES:
+            board = self._boards.setdefault((guild_id, queue), Board())
+            for puuid in [p for p in board.puuids() if p not in summoners]:
+                board.remove(puuid)
+            for puuid, summoner in summoners.items():
+                if puuid in board:
+                    continue
+                ranks = self.latest.get(puuid)
+                if ranks is None and summoner.get('summonerId'):
+                    # Au démarrage, le dernier relevé quotidien sert de point de départ
+                    ranks = self.latest[puuid] = data_manager.get_latest_daily_ranks(summoner['summonerId']) or {}
+                rank = (ranks or {}).get(queue)
+                if rank:
+                    board.update(puuid, rank_score(rank))
+        self._versions[guild_id] = version
+
+    def board(self, guild_id, queue):
+        guild_id = str(guild_id)
+        self._sync(guild_id)
+        return self._boards[(guild_id, queue)]
+
+
+leaderboards = Leaderboards()
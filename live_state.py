@@ -0,0 +1,63 @@
+"""What the live-game poller last saw for every tracked puuid.
+
+Fed after each spectator sweep (in this process, or from the poller workers'
+'live' events), so slash commands can answer without calling the API.
+"""
+import os
+import time
+
+# Au-delà, l'état est considéré périmé et /ingame interroge l'API
+LIVE_STATE_MAX_AGE = int(os.getenv('LIVE_STATE_MAX_AGE', 90))
+# Entrées plus vues depuis (joueur retiré, shard perdu) supprimées
+FORGET_AFTER = 600
+
+
+class LiveGameState:
+    """puuid -> {'game', 'game_id', 'champion_name', 'champion_icon', 'game_mode', 'started_at', 'seen_at'}
+
+    game_id is None when the player was seen out of game. started_at is the
+    time the poller first saw the game, wall clock so it can be displayed.
+    """
+
+    def __init__(self, max_age=LIVE_STATE_MAX_AGE):
+        self.max_age = max_age
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, game, puuid, game_info, now=None):
+        now = now or time.time()
+        previous = self._entries.get(puuid)
+        if game_info:
+            _, champion_name, game_mode, game_id, champion_icon = game_info[:5]
+            same_game = previous and previous['game_id'] == game_id
+            self._entries[puuid] = {
+                'game': game,
+                'game_id': game_id,
+                'champion_name': champion_name,
+                'champion_icon': champion_icon,
+                'game_mode': game_mode,
+                'started_at': previous['started_at'] if same_game else now,
+                'seen_at': now,
+            }
+        else:
+            self._entries[puuid] = {'game': game, 'game_id': None, 'started_at': None, 'seen_at': now}
+
+    def record_sweep(self, game, results, now=None):
+        """Store one sweep: {puuid: game_info, or None when out of game}"""
+        now = now or time.time()
+        for puuid, game_info in results.items():
+            self.update(game, puuid, game_info, now)
+        for puuid in [p for p, entry in self._entries.items() if now - entry['seen_at'] > FORGET_AFTER]:
+            del self._entries[puuid]
+
+    def get(self, puuid, now=None):
+        """Fresh entry of a puuid, or None when unknown or too old to be trusted"""
+        entry = self._entries.get(puuid)
+        if entry is None or (now or time.time()) - entry['seen_at'] > self.max_age:
+            return None
+        return entry
+
+
+live_state = LiveGameState()
@@ -0,0 +1,96 @@
+"""Ranks of the whole lobby at game start, shown as a lineup in the start notification.
+
+Ranks come from a short-TTL league cache: players met again in the next lobby
+(premades, re-queues, tracked players notified in several guilds) are not refetched.
+"""
+import asyncio
+import logging
+import os
+from cache import TTLCache
+from data_manager import DataManager
+from riot_api import fetchRanksByPuuid, call_limited
+
+logger = logging.getLogger(__name__)
+data_manager = DataManager()
+
+# LOBBY_RANKS=0 désactive la composition des équipes (10 appels league-v4 par partie)
+LOBBY_RANKS = os.getenv('LOBBY_RANKS', '1') != '0'
+LEAGUE_CACHE_TTL = int(os.getenv('LEAGUE_CACHE_TTL', 300))
+
+# puuid -> parseRanks dict ({} when unranked)
+league_cache = TTLCache('league', LEAGUE_CACHE_TTL, maxsize=5000)
+# game_id -> task building the lineup, shared by the tracked players of the same game
+_lineups = TTLCache('lineup', 900, maxsize=200)
+
+
+async def fetch_lobby_ranks(puuids):
+    """{puuid: ranks} from the cache, fetching the missing ones concurrently.
+
+    Players whose lookup failed are left out and retried next time.
+    """
+    ranks = {}
+    missing = []
+    for puuid in dict.fromkeys(puuids):
+        cached = league_cache.get(puuid)
+        if cached is None:
+            missing.append(puuid)
+        else:
+            ranks[puuid] = cached
+
+    if missing:
+        results = await asyncio.gather(
+            *(call_limited(fetchRanksByPuuid, puuid) for puuid in missing), return_exceptions=True)
+        for puuid, result in zip(missing, results):
+            if isinstance(result, Exception) or result is None:
+                logger.debug("No ranks for lobby player %s: %s", puuid, result)
+                continue
+            league_cache.set(puuid, result)
+            ranks[puuid] = result
+    return ranks
+
+
+def lobby_queue(game_mode):
+    return "RANKED_FLEX_SR" if game_mode == "Flex" else "RANKED_SOLO_5x5"
+
+
+async def build_lineup(game_mode, participants):
+    """{'queue', 'teams': [[(puuid, riot_id, champion, ranks or None), ...], ...]}, or None.
+
+    Only two-team games get a lineup (not Arena, not TFT).
+    """
+    teams = {}
+    for puuid, riot_id, champion_id, team_id in participants:
+        teams.setdefault(team_id, []).append((puuid, riot_id, champion_id))
+    if set(teams) != {100, 200} or any(len(team) > 5 for team in teams.values()):
+        return None
+
+    ranks = await fetch_lobby_ranks(puuid for puuid, _, _, _ in participants if puuid)
+    return {
+        'queue': lobby_queue(game_mode),
+        'teams': [
+            [(puuid, riot_id, data_manager.get_champion_name(champion_id), ranks.get(puuid))
+             for puuid, riot_id, champion_id in teams[team_id]]
+            for team_id in (100, 200)
+        ],
+    }
+
+
+async def get_lineup(game_id, game_mode, participants):
+    """Lineup of a game, built once however many tracked players are in it"""
+    if not LOBBY_RANKS or not participants:
+        return None
+    task = _lineups.get(game_id)
+    if task is None:
+        task = asyncio.ensure_future(build_lineup(game_mode, participants))
+        _lineups.set(game_id, task)
+    # Shielded: one cancelled enrichment worker must not cancel the lookup for the others
+    return await asyncio.shield(task)
+
+
+def remember_ranks(puuid, ranks):
+    """Seed the cache with ranks fetched elsewhere (tracked players at game start or end).
+
+    Empty results are skipped: fetchRanks also returns {} when the call fails.
+    """
+    if puuid and ranks:
+        league_cache.set(puuid, ranks)
@@ -0,0 +1,117 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+_listener = None
+
+
+class KeyValueFormatter(logging.Formatter):
+    """`2024-11-30 21:04:11 INFO poller | message key=value ...`"""
+
+    def format(self, record):
+        line = f"{self.formatTime(record, '%Y-%m-%d %H:%M:%S')} {record.levelname} {record.name} | {record.getMessage()}"
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record):
+        payload = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        payload.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class HotLoopFilter(logging.Filter):
+    """Let at most `burst` DEBUG records per call site through every `interval` seconds.
+
+    Suppressed records are counted and the count is appended to the next
+    record that gets through, so hot loops stay visible without flooding.
+    """
+
+    def __init__(self, burst=5, interval=60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        site = (record.name, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._sites.get(site, (now, 0, 0))
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+            if count >= self.burst:
+                self._sites[site] = (window_start, count, suppressed + 1)
+                return False
+            self._sites[site] = (window_start, count + 1, 0)
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+def parse_levels(spec):
+    """Parse LOG_LEVELS such as "riot_api=DEBUG,poller=WARNING" """
+    levels = {}
+    for part in (spec or '').split(','):
+        if '=' in part:
+            name, level = part.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Configure root logging once: leveled, per-module, written by a background thread.
+
+    LOG_LEVEL (default INFO) sets the global level, LOG_LEVELS per-module
+    overrides, LOG_FORMAT=json switches to JSON lines and LOG_DEBUG_BURST /
+    LOG_DEBUG_INTERVAL tune how much DEBUG output a single call site may emit.
+    """
+    global _listener
+    if _listener:
+        return
+
+    formatter = JsonFormatter() if os.getenv('LOG_FORMAT') == 'json' else KeyValueFormatter()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    # Records are only enqueued on the event loop; the listener thread does the console I/O
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(HotLoopFilter(
+        burst=int(os.getenv('LOG_DEBUG_BURST', 5)),
+        interval=float(os.getenv('LOG_DEBUG_INTERVAL', 60))))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    for name, level in parse_levels(os.getenv('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+    # discord.py est très bavard en DEBUG
+    logging.getLogger('discord').setLevel(os.getenv('DISCORD_LOG_LEVEL', 'WARNING').upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
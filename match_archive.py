@@ -0,0 +1,222 @@
+"""Columnar archive of the LoL games of tracked players, for /stats.
+
+One file per player (MATCH_ARCHIVE_DIR/<puuid>.npz) holds one numpy array per
+stat, a row per game, so aggregates over hundreds of games are a handful of
+vectorized reductions instead of match-v5 re-downloads.
+
+Rows come from parseGameResult tuples: at game end, and from the history backfill.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv('MATCH_ARCHIVE_DIR', 'match_archive')
+MAX_LOADED = 64  # tables kept in memory
+
+COLUMNS = {
+    'game_id': np.int64,
+    'game_end': np.int64,
+    'queue_id': np.int32,
+    'duration': np.int32,
+    'win': np.int8,
+    'kills': np.int16,
+    'deaths': np.int16,
+    'assists': np.int16,
+    'cs': np.int32,
+    'vision': np.int32,
+    'damage': np.int32,
+    'damage_share': np.float32,
+    'kill_participation': np.float32,
+    'double_kills': np.int16,
+    'triple_kills': np.int16,
+    'quadra_kills': np.int16,
+    'penta_kills': np.int16,
+    'first_blood': np.int8,
+    'dragons': np.int8,
+    'barons': np.int8,
+    'voidgrubs': np.int8,
+    'champion': np.int16,  # index into the table's champion names
+}
+
+# /stats mode -> queue ids (None: every queue)
+MODES = {
+    'all': None,
+    'ranked': (420, 440),
+    'solo': (420,),
+    'flex': (440,),
+    'normal': (400, 430, 480, 490),
+    'aram': (450,),
+}
+
+
+def row_from_result(game_id, game_result):
+    """Archive row of one parseGameResult tuple, or None for an unusable result"""
+    if not game_result or game_result[0] is None or len(game_result) < 33:
+        return None
+    kills, deaths, assists = (int(value) for value in game_result[1].split('/'))
+    return {
+        'game_id': int(game_id),
+        'game_end': game_result[31] or 0,
+        'queue_id': game_result[30] or 0,
+        'duration': game_result[32] or 0,
+        'win': game_result[0] == 'Victoire',
+        'kills': kills,
+        'deaths': deaths,
+        'assists': assists,
+        'cs': game_result[2],
+        'vision': game_result[5],
+        'damage': game_result[7],
+        'damage_share': game_result[21] or 0,
+        'kill_participation': game_result[17] or 0,
+        'double_kills': game_result[12],
+        'triple_kills': game_result[11],
+        'quadra_kills': game_result[10],
+        'penta_kills': game_result[9],
+        'first_blood': bool(game_result[13]),
+        'dragons': game_result[23] or 0,
+        'barons': game_result[25] or 0,
+        'voidgrubs': game_result[26] or 0,
+        'champion': game_result[3],
+    }
+
+
+class PlayerTable:
+    """Columns of one player's games, ordered by game end"""
+
+    def __init__(self, columns=None, champions=()):
+        self.columns = columns or {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.champions = list(champions)
+
+    def __len__(self):
+        return len(self.columns['game_id'])
+
+    def game_ids(self):
+        return set(self.columns['game_id'].tolist())
+
+    def extend(self, rows):
+        """Append rows (dicts from row_from_result) not archived yet; returns how many were added"""
+        known = self.game_ids()
+        rows = [row for row in rows if row['game_id'] not in known]
+        rows = list({row['game_id']: row for row in rows}.values())
+        if not rows:
+            return 0
+        for row in rows:
+            if row['champion'] not in self.champions:
+                self.champions.append(row['champion'])
+        new = {
+            name: np.array([self.champions.index(row[name]) if name == 'champion' else row[name] for row in rows],
+                           dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        }
+        columns = {name: np.concatenate([self.columns[name], new[name]]) for name in COLUMNS}
+        order = np.argsort(columns['game_end'], kind='stable')
+        # One assignment: /stats reading concurrently never sees columns of different lengths
+        self.columns = {name: values[order] for name, values in columns.items()}
+        return len(rows)
+
+
+class MatchArchive:
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, puuid):
+        return os.path.join(self.directory, f"{puuid}.npz")
+
+    def _load(self, puuid):
+        table = self._tables.get(puuid)
+        if table is None:
+            try:
+                with np.load(self.path(puuid), allow_pickle=False) as data:
+                    columns = {name: data[name].astype(dtype) for name, dtype in COLUMNS.items() if name in data}
+                    champions = data['champion_names'].tolist() if 'champion_names' in data else []
+                table = PlayerTable(columns if len(columns) == len(COLUMNS) else None, champions)
+            except FileNotFoundError:
+                table = PlayerTable()
+            except Exception as e:
+                logger.warning("Unreadable match archive for %s, starting over: %s", puuid, e)
+                table = PlayerTable()
+            self._tables[puuid] = table
+        self._tables.move_to_end(puuid)
+        while len(self._tables) > MAX_LOADED:
+            self._tables.popitem(last=False)
+        return table
+
+    def table(self, puuid):
+        """PlayerTable of a puuid (blocking: loads the file on first use)"""
+        with self._lock:
+            return self._load(puuid)
+
+    def game_ids(self, puuid):
+        return self.table(puuid).game_ids()
+
+    def add(self, puuid, rows):
+        """Archive rows for a player, written to disk in one save (blocking: run in a thread)"""
+        with self._lock:
+            table = self._load(puuid)
+            added = table.extend(rows)
+            if added:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = self.path(puuid) + '.tmp.npz'
+                np.savez(tmp_path, champion_names=np.array(table.champions, dtype=str), **table.columns)
+                os.replace(tmp_path, self.path(puuid))
+        return added
+
+
+def player_stats(table, games=100, mode='all'):
+    """Aggregates over the last `games` games of a PlayerTable in the given mode, or None"""
+    columns = table.columns
+    mask = np.ones(len(table), dtype=bool)
+    if MODES.get(mode):
+        mask = np.isin(columns['queue_id'], MODES[mode])
+    selected = np.flatnonzero(mask)[-games:]
+    if not len(selected):
+        return None
+    c = {name: values[selected] for name, values in columns.items()}
+
+    minutes = np.maximum(c['duration'], 60) / 60
+    kills, deaths, assists = c['kills'].astype(np.float64), c['deaths'].astype(np.float64), c['assists'].astype(np.float64)
+    kda = (kills + assists) / np.maximum(deaths, 1)
+    dpm = c['damage'] / minutes
+    wins = c['win'].astype(np.float64)
+
+    # Per champion: one pass of bincount per stat
+    champion_ids, inverse, counts = np.unique(c['champion'], return_inverse=True, return_counts=True)
+    champion_wins = np.bincount(inverse, weights=wins)
+    champion_kda = ((np.bincount(inverse, weights=kills) + np.bincount(inverse, weights=assists))
+                    / np.maximum(np.bincount(inverse, weights=deaths), 1))
+    champion_dpm = np.bincount(inverse, weights=dpm) / counts
+    champions = sorted(
+        ({'champion': table.champions[champion_id], 'games': int(count),
+          'win_rate': float(champion_wins[i] / count * 100), 'kda': float(champion_kda[i]),
+          'dpm': float(champion_dpm[i])}
+         for i, (champion_id, count) in enumerate(zip(champion_ids, counts))),
+        key=lambda champion: (-champion['games'], -champion['win_rate']))
+
+    return {
+        'games': int(len(selected)),
+        'wins': int(wins.sum()),
+        'win_rate': float(wins.mean() * 100),
+        'kills': float(kills.mean()),
+        'deaths': float(deaths.mean()),
+        'assists': float(assists.mean()),
+        'kda': float((kills.sum() + assists.sum()) / max(deaths.sum(), 1)),
+        'kda_percentiles': [float(v) for v in np.percentile(kda, (25, 50, 75))],
+        'dpm': float(dpm.mean()),
+        'dpm_percentiles': [float(v) for v in np.percentile(dpm, (25, 50, 75))],
+        'cs_per_minute': float((c['cs'] / minutes).mean()),
+        'vision_per_minute': float((c['vision'] / minutes).mean()),
+        'kill_participation': float(c['kill_participation'].mean()),
+        'damage_share': float(c['damage_share'].mean()),
+        'multikills': {name: int(c[f'{name}_kills'].sum()) for name in ('double', 'triple', 'quadra', 'penta')},
+        'first_blood_rate': float(c['first_blood'].mean() * 100),
+        'champions': champions,
+    }
+
+
+archive = MatchArchive()
@@ -0,0 +1,165 @@
+import bisect
+import logging
+import threading
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values)) + (extra or [])
+    if not pairs:
+        return ''
+    inner = ','.join(f'{name}="{str(value)}"' for name, value in pairs)
+    return '{' + inner + '}'
+
+
+class Metric:
+    """Base class: values are kept per tuple of label values"""
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._render_values())
+        return lines
+
+    def _render_values(self):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}"
+                for key, value in sorted(self._values.items())]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            state['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def _render_values(self):
+        lines = []
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state['counts']):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {state['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+RIOT_REQUEST_SECONDS = registry.histogram(
+    'riot_api_request_seconds', 'Riot API request latency', ['endpoint'])
+RIOT_RESPONSES = registry.counter(
+    'riot_api_responses_total', 'Riot API responses by status code', ['endpoint', 'status'])
+RATE_LIMIT_HEADROOM = registry.gauge(
+    'riot_rate_limit_headroom_ratio', 'Share of the tightest rate-limit window still available', ['limiter'])
+POLL_CYCLE_SECONDS = registry.histogram(
+    'poll_cycle_seconds', 'Duration of a live-game sweep', ['game'])
+POLL_UNIQUE_PUUIDS = registry.gauge(
+    'poll_unique_puuids', 'Unique puuids polled in the last sweep', ['game'])
+POLL_TOTAL_TRACKED = registry.gauge(
+    'poll_tracked_summoners', 'Tracked (guild, summoner) pairs in the last sweep', ['game'])
+NOTIFICATION_LATENCY_SECONDS = registry.histogram(
+    'notification_latency_seconds', 'Time from detection to Discord delivery', ['kind'])
+IMAGE_RENDER_SECONDS = registry.histogram(
+    'image_render_seconds', 'Image download and composition time', ['kind'])
+CACHE_REQUESTS = registry.counter(
+    'cache_requests_total', 'Cache lookups by result', ['cache', 'result'])
+DISCORD_SEND_SECONDS = registry.histogram(
+    'discord_send_seconds', 'Latency of channel.send calls')
+BACKFILL_GAMES = registry.counter(
+    'backfill_games_total', 'Past games handled by the history backfill', ['result'])
+BACKFILL_PENDING = registry.gauge(
+    'backfill_pending_players', 'Players whose history backfill is not finished')
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+async def start_metrics_server(port, host='127.0.0.1'):
+    """Serve the registry in Prometheus text format on http://host:port/metrics"""
+    async def handle_metrics(request):
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info("Metrics server listening on http://%s:%s/metrics", host, port)
+    return runner
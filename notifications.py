@@ -0,0 +1,423 @@
+import asyncio
+import io
+import logging
+import time
+import urllib.parse
+from collections import OrderedDict
+import aiohttp
+import discord
+from PIL import Image, ImageDraw
+from data_manager import DataManager
+from metrics import IMAGE_RENDER_SECONDS, record_cache
+from tft_atlas import get_atlas, icon_key
+
+logger = logging.getLogger(__name__)
+data_manager = DataManager()
+
+RANKED_QUEUES = ("RANKED_SOLO_5x5", "RANKED_FLEX_SR")
+RUNE_URL = 'https://raw.communitydragon.org/latest/plugins/rcp-be-lol-game-data/global/default/v1/perk-images/styles/{}.png'
+
+
+def is_ranked_mode(game_mode):
+    return "RANKED" in game_mode.upper() or game_mode in ["Solo/Duo", "Flex"]
+
+
+TIER_SHORT = {
+    'IRON': 'I', 'BRONZE': 'B', 'SILVER': 'S', 'GOLD': 'G', 'PLATINUM': 'P', 'EMERALD': 'E',
+    'DIAMOND': 'D', 'MASTER': 'M', 'GRANDMASTER': 'GM', 'CHALLENGER': 'C',
+}
+DIVISIONS = {'I': 1, 'II': 2, 'III': 3, 'IV': 4}
+
+
+def short_rank(ranks, queue_type):
+    """'D2 45 LP', 'M 312 LP', 'Unranked', or '?' when the ranks are unknown"""
+    if ranks is None:
+        return "?"
+    rank = ranks.get(queue_type)
+    if not rank or rank['tier'] not in TIER_SHORT:
+        return "Unranked"
+    tier = TIER_SHORT[rank['tier']]
+    if rank['tier'] in ('MASTER', 'GRANDMASTER', 'CHALLENGER'):
+        return f"{tier} {rank['lp']} LP"
+    return f"{tier}{DIVISIONS.get(rank['rank'], '')} {rank['lp']} LP"
+
+
+def add_lineup_fields(embed, lineup, tracked_puuids):
+    """One inline field per team: champion, Riot ID and rank of each player"""
+    for team_name, team in zip(("Équipe bleue", "Équipe rouge"), lineup['teams']):
+        lines = []
+        for puuid, riot_id, champion, ranks in team:
+            name = riot_id.split('#')[0]
+            line = f"{champion} · {name} · {short_rank(ranks, lineup['queue'])}"
+            lines.append(f"**{line}**" if puuid in tracked_puuids else line)
+        embed.add_field(name=team_name, value="\n".join(lines)[:1024], inline=True)
+
+
+def build_game_start_embed(players, game_mode, lineup=None):
+    """Embed sent when one or more tracked players enter the same game"""
+    player = players[0]
+    encoded_name = urllib.parse.quote(player['name'])
+    encoded_tag = urllib.parse.quote(player['tag'])
+    if player.get('game') == 'tft':
+        # champion_name est le tacticien en TFT
+        live_url = f"https://lolchess.gg/profile/euw/{encoded_name}-{encoded_tag}"
+        plays_with = "joue avec"
+    else:
+        live_url = f"https://porofessor.gg/fr/live/euw/{encoded_name}-{encoded_tag}"
+        plays_with = "joue"
+
+    if len(players) == 1:
+        description = f"**{player['name']}** est en **{game_mode}**. Il {plays_with} **{player['champion_name']}**"
+    else:
+        lines = [f"**{p['name']}** {plays_with} **{p['champion_name']}**" for p in players]
+        description = f"{len(players)} joueurs suivis sont en **{game_mode}**\n" + "\n".join(lines)
+
+    embed = discord.Embed(
+        title="En jeu",
+        url=live_url,
+        description=description,
+        color=discord.Colour.yellow()
+    )
+    embed.set_thumbnail(url=player['champion_icon'])
+    if lineup:
+        add_lineup_fields(embed, lineup, {p.get('puuid') for p in players})
+    return embed
+
+
+def compute_lp_changes(summoner_id, ranks):
+    """Compare current ranks with the LP stored at game start"""
+    lp_changes = []
+    for queue_type, rank_data in ranks.items():
+        if queue_type not in RANKED_QUEUES:
+            continue
+        stored_lp = data_manager.get_stored_lp(summoner_id, queue_type)
+        if not stored_lp:
+            logger.debug("No stored LP data found for %s in %s", summoner_id, queue_type)
+            continue
+
+        queue_name = "**Solo/duo**" if queue_type == "RANKED_SOLO_5x5" else "**Flex**"
+        current_lp = rank_data['lp']
+        current_tier = rank_data['tier']
+        current_rank = rank_data['rank']
+
+        if stored_lp['tier'] != current_tier or stored_lp['rank'] != current_rank:
+            lp_changes.append(
+                f"{queue_name}: {stored_lp['tier']} {stored_lp['rank']} → {current_tier} {current_rank}")
+        else:
+            lp_diff = current_lp - stored_lp['lp']
+            if lp_diff != 0:
+                lp_change_str = f"({'+' if lp_diff > 0 else ''}{lp_diff})"
+                lp_changes.append(
+                    f"{queue_name}: **{current_tier}** {current_rank} {stored_lp['lp']} -> {current_lp} LP {lp_change_str}")
+    return lp_changes
+
+
+def build_game_end_embed(summoner_name, game_result, lp_changes):
+    """Embed sent when a tracked player's game is over"""
+    (gameResult, score, cs, champion, poste, visionScore, side,
+     totalDamages, totalDamagesMinutes, pentakills, quadrakills,
+     tripleKills, doubleKills, firstBloodKill, firstTowerKill,
+     formattedGameDuration, gameMode, killParticipationPercent, arenaTeam,
+     placement, damageSelfMitigated, damageContributionPercent,
+     damageContributionPercentArena, team_dragons, team_heralds,
+     team_barons, team_voidgrubs, team_atakanhs, items, runes) = game_result[:30]
+
+    color = discord.Color.green() if gameResult == 'Victoire' else discord.Color.red()
+
+    if gameMode == "CLASSIC" or gameMode == "URF" or gameMode == "SWIFTPLAY":
+        embed = discord.Embed(
+            title=f"{summoner_name} - {gameResult} en {gameMode} - {formattedGameDuration}",
+            color=color
+        )
+
+        # Basic game info
+        embed.add_field(
+            name="Informations de la partie",
+            value=f"Mode: {gameMode}\nSide: {side}\n Poste: {poste}",
+            inline=False
+        )
+
+        # Add LP changes if available
+        if lp_changes:
+            embed.add_field(name="LP Changes", value="\n".join(lp_changes), inline=False)
+
+        # First achievements
+        firsts = []
+        if firstBloodKill: firsts.append("First Blood")
+        if firstTowerKill: firsts.append("First Tower")
+        if firsts:
+            embed.add_field(name="Faits de jeu", value="\n".join(firsts), inline=False)
+
+        # Performance
+        embed.add_field(
+            name="Performance",
+            value=f"Score: {score}\nCS: {cs}\nVision: {visionScore}",
+            inline=False
+        )
+
+        # Damage
+        embed.add_field(
+            name="Dégats",
+            value=f"Total: {totalDamages:,} - {totalDamagesMinutes:,}/min - {damageContributionPercent}% des dégats de l'équipe",
+            inline=False
+        )
+
+        # Objectives
+        objectives_text = (
+            f"🐲 Dragons: {team_dragons}\n"
+            f"🏰 Herald: {team_heralds}\n"
+            f"👑 Baron: {team_barons}\n"
+            f"🪲 Voidgrubs: {team_voidgrubs}\n"
+            f"⚔️ Atakhan: {team_atakanhs}"
+        )
+        embed.add_field(name="Team Objectives", value=objectives_text, inline=False)
+
+    elif gameMode == "CHERRY":
+        embed = discord.Embed(
+            title=f"{gameResult} en Arena pour {summoner_name} - {formattedGameDuration}",
+            color=color
+        )
+        embed.add_field(name='', value=
+            f"**Top {placement}**\n"
+            f"**Equipe {arenaTeam}**\n"
+            f"**Champion:** {champion}\n"
+            f"**Score:** {score}\n"
+            f"**Dégâts:** {totalDamages} - {totalDamagesMinutes}/min | **Contribution aux dégâts de l'équipe:** {damageContributionPercentArena}%\n"
+            f"**Dégâts Subis:** {damageSelfMitigated}\n"
+        )
+
+    else:
+        mode_name = "ARAM" if gameMode == "ARAM" else gameMode
+        embed = discord.Embed(
+            title=f"{gameResult} en {mode_name} pour {summoner_name} - {formattedGameDuration}",
+            color=color
+        )
+        embed.add_field(name='', value=
+            f"**Champion:** {champion}\n"
+            f"**Side:** {side}\n"
+            f"**Score:** {score}\n"
+            f"**KP:** {killParticipationPercent}%\n"
+            f"**CS:** {cs}\n"
+            f"**Dégâts:** {totalDamages} - {totalDamagesMinutes}/min | **Contribution aux dégâts de l'équipe:** {damageContributionPercent}%\n",
+            inline=False
+        )
+
+    # Multikills
+    if any([pentakills, quadrakills, tripleKills, doubleKills]):
+        multikills = []
+        if pentakills: multikills.append(f"Pentakills: {pentakills}")
+        if quadrakills: multikills.append(f"{quadrakills} EXPLOIT DU QUADRUPLE!")
+        if tripleKills: multikills.append(f"Triple kills: {tripleKills}")
+        if doubleKills: multikills.append(f"Double kills: {doubleKills}")
+        embed.add_field(name="Multikills", value="\n".join(multikills), inline=True)
+
+    embed.set_thumbnail(
+        url=f'https://cdn.communitydragon.org/latest/champion/{champion}/tile')
+    return embed
+
+
+def format_tft_round(last_round):
+    """Riot's round counter as the in-game stage: stage 1 has 4 rounds, the others 7"""
+    if last_round <= 4:
+        return f"1-{last_round}"
+    return f"{(last_round - 5) // 7 + 2}-{(last_round - 5) % 7 + 1}"
+
+
+def build_tft_game_end_embed(summoner_name, match, player):
+    """Embed sent when a tracked player's TFT game is over"""
+    placement = player['placement']
+    color = discord.Color.green() if placement <= 4 else discord.Color.red()
+    embed = discord.Embed(
+        title=f"{summoner_name} - Top {placement} en {match['game_mode']} - {match['duration']}",
+        color=color
+    )
+    embed.add_field(
+        name="Partie",
+        value=(f"Niveau {player['level']} - Éliminé au round {format_tft_round(player['last_round'])}\n"
+               f"Dégâts aux joueurs: {player['damage']}\n"
+               f"Joueurs éliminés: {player['players_eliminated']}"),
+        inline=False
+    )
+    if player['traits']:
+        traits = ", ".join(f"{name.split('_', 1)[-1]} ({num_units})" for name, _, num_units in player['traits'])
+        embed.add_field(name="Synergies", value=traits[:1024], inline=False)
+
+    _, tactician_icon = data_manager.get_tactician(player['companion'])
+    embed.set_thumbnail(url=tactician_icon)
+    return embed
+
+
+def compose_build_image(item_images, trinket_image, rune_images, item_size=32, rune_size=32, padding=4, separator_width=8):
+    """Paste item, trinket and rune icons into a single PNG and return its bytes"""
+    items_width = (item_size * len(item_images)) + (padding * (len(item_images) - 1)) if item_images else 0
+    if trinket_image:
+        items_width += separator_width + item_size
+    runes_width = (rune_size * len(rune_images)) + (padding * (len(rune_images) - 1)) if rune_images else 0
+
+    total_width = max(items_width, runes_width, 1)
+    total_height = item_size * 2 + padding if rune_images else item_size  # Extra height for runes
+
+    combined_image = Image.new('RGBA', (total_width, total_height), (0, 0, 0, 0))
+
+    x_offset = 0
+    for item_image in item_images:
+        combined_image.paste(item_image.resize((item_size, item_size)), (x_offset, 0))
+        x_offset += item_size + padding
+
+    if trinket_image:
+        x_offset += separator_width - padding
+        combined_image.paste(trinket_image.resize((item_size, item_size)), (x_offset, 0))
+
+    # Place runes below items
+    x_offset = 0
+    y_offset = item_size + padding
+    for rune_image in rune_images:
+        combined_image.paste(rune_image.resize((rune_size, rune_size)), (x_offset, y_offset))
+        x_offset += rune_size + padding
+
+    combined_bytes = io.BytesIO()
+    combined_image.save(combined_bytes, format='PNG')
+    return combined_bytes.getvalue()
+
+
+def compose_mastery_banner(champion_images):
+    """Paste champion tiles side by side into a single PNG and return its bytes"""
+    total_width = sum(img.width for img in champion_images)
+    max_height = max(img.height for img in champion_images)
+
+    combined_image = Image.new('RGBA', (total_width, max_height))
+    x_offset = 0
+    for img in champion_images:
+        combined_image.paste(img, (x_offset, 0))
+        x_offset += img.width
+
+    combined_bytes = io.BytesIO()
+    combined_image.save(combined_bytes, format='PNG')
+    return combined_bytes.getvalue()
+
+
+# Couleurs par coût d'unité (rarity Riot) et par palier de synergie (style)
+RARITY_COLORS = {0: (128, 128, 128), 1: (17, 178, 136), 2: (32, 122, 199), 4: (196, 64, 218), 6: (255, 185, 59)}
+TRAIT_COLORS = {1: (160, 106, 66), 2: (152, 166, 179), 3: (226, 183, 70), 4: (96, 231, 235)}
+
+
+def _placeholder_icon(label, size):
+    """Gray tile with the icon's initials, for icons missing from the atlas"""
+    image = Image.new('RGBA', (size, size), (60, 60, 60, 255))
+    if size >= 32:
+        ImageDraw.Draw(image).text((4, size // 2 - 6), label[:4].upper(), fill=(230, 230, 230, 255))
+    return image
+
+
+def compose_tft_board(units, traits, icon, unit_size=64, item_size=20, trait_size=32, padding=4, per_row=10):
+    """Draw active traits, then units with their stars and items, into a single PNG.
+
+    ``icon(kind, name)`` returns a square RGBA icon or None; it is called from
+    this thread, so it must not do any I/O.
+    """
+    trait_rows = (len(traits) + per_row - 1) // per_row
+    unit_rows = (len(units) + per_row - 1) // per_row
+    star_height = 10
+    unit_block = star_height + unit_size + item_size + padding
+    width = per_row * (unit_size + padding) - padding
+    height = max(1, trait_rows * (trait_size + padding) + unit_rows * unit_block)
+    board = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(board)
+
+    for index, (name, style, _) in enumerate(traits):
+        x = index % per_row * (unit_size + padding)
+        y = index // per_row * (trait_size + padding)
+        draw.rounded_rectangle((x, y, x + trait_size - 1, y + trait_size - 1), radius=6,
+                               fill=TRAIT_COLORS.get(style, TRAIT_COLORS[1]) + (255,))
+        image = icon('trait', name) or _placeholder_icon(name.split('_', 1)[-1], trait_size)
+        inner = trait_size - 8
+        board.alpha_composite(image.resize((inner, inner)), (x + 4, y + 4))
+
+    top = trait_rows * (trait_size + padding)
+    ordered = sorted(units, key=lambda unit: (-unit[2], -unit[1]))
+    for index, (character_id, stars, rarity, items) in enumerate(ordered):
+        x = index % per_row * (unit_size + padding)
+        y = top + index // per_row * unit_block
+
+        for star in range(stars):
+            cx = x + unit_size // 2 + (star - (stars - 1) / 2) * 10
+            draw.ellipse((cx - 4, y + 1, cx + 4, y + 9), fill=(255, 215, 0, 255))
+
+        image = icon('unit', character_id) or _placeholder_icon(character_id.split('_', 1)[-1], unit_size)
+        board.alpha_composite(image.convert('RGBA').resize((unit_size, unit_size)), (x, y + star_height))
+        draw.rectangle((x, y + star_height, x + unit_size - 1, y + star_height + unit_size - 1),
+                       outline=RARITY_COLORS.get(rarity, RARITY_COLORS[0]) + (255,), width=3)
+
+        items_x = x + (unit_size - min(len(items), 3) * item_size) // 2
+        for slot, item in enumerate(items[:3]):
+            item_image = icon('item', item) or _placeholder_icon(item.split('_')[-1], item_size)
+            board.alpha_composite(item_image.convert('RGBA').resize((item_size, item_size)),
+                                  (items_x + slot * item_size, y + star_height + unit_size))
+
+    combined_bytes = io.BytesIO()
+    board.save(combined_bytes, format='PNG')
+    return combined_bytes.getvalue()
+
+
+# Boards déjà rendus, partagés par les notifications d'une même partie
+_tft_boards = OrderedDict()
+TFT_BOARD_CACHE_SIZE = 64
+
+
+async def render_tft_board(match, puuid):
+    """Final board of a TFT player, from the set's icon atlas, composed off the event loop"""
+    cache_key = (match['game_id'], puuid)
+    if cache_key in _tft_boards:
+        _tft_boards.move_to_end(cache_key)
+        record_cache('tft_board', True)
+        return _tft_boards[cache_key]
+    record_cache('tft_board', False)
+
+    started = time.perf_counter()
+    player = match['players'][puuid]
+    atlas = get_atlas(match['set_number'])
+    # Only the first notification of a new set/patch downloads icons
+    await atlas.ensure(
+        [icon_key('unit', unit[0]) for unit in player['units']] +
+        [icon_key('item', item) for unit in player['units'] for item in unit[3]] +
+        [icon_key('trait', trait[0]) for trait in player['traits']])
+
+    image = await asyncio.to_thread(
+        compose_tft_board, player['units'], player['traits'],
+        lambda kind, name: atlas.icon(icon_key(kind, name)))
+    IMAGE_RENDER_SECONDS.observe(time.perf_counter() - started, kind='tft_board')
+
+    _tft_boards[cache_key] = image
+    if len(_tft_boards) > TFT_BOARD_CACHE_SIZE:
+        _tft_boards.popitem(last=False)
+    return image
+
+
+async def download_image(session, url):
+    async with session.get(url) as resp:
+        if resp.status == 200:
+            return Image.open(io.BytesIO(await resp.read()))
+    return None
+
+
+async def render_build_image(items, runes):
+    """Download item/rune icons concurrently and compose the build image off the event loop"""
+    started = time.perf_counter()
+    main_items = items[:6]
+    trinket = items[6] if len(items) > 6 else None
+    rune_urls = [RUNE_URL.format(rune_id) for rune_id in runes]
+
+    async with aiohttp.ClientSession() as session:
+        images = await asyncio.gather(
+            *(download_image(session, url) for url in main_items + ([trinket] if trinket else []) + rune_urls),
+            return_exceptions=True
+        )
+    images = [img if isinstance(img, Image.Image) else None for img in images]
+
+    item_images = [img for img in images[:len(main_items)] if img]
+    trinket_image = images[len(main_items)] if trinket else None
+    rune_images = [img for img in images[len(main_items) + (1 if trinket else 0):] if img]
+
+    image = await asyncio.to_thread(compose_build_image, item_images, trinket_image, rune_images)
+    IMAGE_RENDER_SECONDS.observe(time.perf_counter() - started, kind='build')
+    return image
@@ -0,0 +1,76 @@
+import logging
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+def chunk(lines, per_page):
+    """Split lines into pages of at most per_page lines"""
+    return [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[]]
+
+
+class PaginatedView(discord.ui.View):
+    """Previous / next buttons over pages rendered on demand.
+
+    render_page(index) returns the embed of a page; each page is rendered once
+    per view. Only the user who ran the command can turn the pages.
+    """
+
+    def __init__(self, page_count, render_page, author_id=None, timeout=300):
+        super().__init__(timeout=timeout)
+        self.page_count = page_count
+        self.render_page = render_page
+        self.author_id = author_id
+        self.index = 0
+        self.message = None
+        self._pages = {}
+        self._update_buttons()
+
+    def page(self, index):
+        if index not in self._pages:
+            embed = self.render_page(index)
+            if self.page_count > 1:
+                embed.set_footer(text=f"Page {index + 1}/{self.page_count}")
+            self._pages[index] = embed
+        return self._pages[index]
+
+    def _update_buttons(self):
+        self.previous.disabled = self.index == 0
+        self.next.disabled = self.index >= self.page_count - 1
+
+    async def send(self, interaction, followup=False):
+        """Send the first page, as the response or as a followup of a deferred interaction"""
+        kwargs = {'embed': self.page(0)}
+        if self.page_count > 1:
+            kwargs['view'] = self
+        if followup:
+            self.message = await interaction.followup.send(**kwargs, wait=True)
+        else:
+            await interaction.response.send_message(**kwargs)
+            self.message = await interaction.original_response()
+
+    async def interaction_check(self, interaction):
+        if self.author_id is not None and interaction.user.id != self.author_id:
+            await interaction.response.send_message("Seul l'auteur de la commande peut changer de page.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction, index):
+        self.index = max(0, min(index, self.page_count - 1))
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.page(self.index), view=self)
+
+    @discord.ui.button(label='◀', style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction, button):
+        await self._show(interaction, self.index - 1)
+
+    @discord.ui.button(label='▶', style=discord.ButtonStyle.secondary)
+    async def next(self, interaction, button):
+        await self._show(interaction, self.index + 1)
+
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException as e:
+                logger.debug("Could not remove pagination buttons: %s", e)
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import os
+import time
+from data_manager import DataManager
+from leaderboard import leaderboards
+from lobby import get_lineup, remember_ranks
+from match_archive import archive, row_from_result
+from delivery import DeliveryManager
+from metrics import NOTIFICATION_LATENCY_SECONDS
+from notifications import (build_game_end_embed, build_tft_game_end_embed, compute_lp_changes,
+                           render_build_image, render_tft_board, is_ranked_mode, RANKED_QUEUES)
+from riot_api import fetchRanks, call_limited, resolve_summoner_id
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+data_manager = DataManager()
+
+
+class Stage:
+    """A bounded queue drained by its own pool of workers.
+
+    The handler receives one item and may return None, an item or a list of
+    items, which are forwarded to the ``output`` stage.
+    """
+
+    def __init__(self, name, handler, workers=1, maxsize=100, output=None):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.output = output
+        self._tasks = []
+        self.metrics = {
+            'enqueued': 0,
+            'processed': 0,
+            'failed': 0,
+            'busy_seconds': 0.0,
+            'max_latency': 0.0,
+            'max_depth': 0,
+        }
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def put(self, item):
+        await self.queue.put(item)
+        self.metrics['enqueued'] += 1
+        self.metrics['max_depth'] = max(self.metrics['max_depth'], self.queue.qsize())
+
+    async def _worker(self, index):
+        while True:
+            item = await self.queue.get()
+            started = time.monotonic()
+            try:
+                with tracer.trace(f"stage:{self.name}"):
+                    result = await self.handler(item)
+                self.metrics['processed'] += 1
+                if self.output and result is not None:
+                    for out in (result if isinstance(result, list) else [result]):
+                        await self.output.put(out)
+            except Exception as e:
+                self.metrics['failed'] += 1
+                logger.exception("Error in stage %s (worker %s): %s", self.name, index, e)
+            finally:
+                elapsed = time.monotonic() - started
+                self.metrics['busy_seconds'] += elapsed
+                self.metrics['max_latency'] = max(self.metrics['max_latency'], elapsed)
+                self.queue.task_done()
+
+    def summary(self):
+        m = self.metrics
+        return (f"{self.name}: depth {self.queue.qsize()}/{self.queue.maxsize} (max {m['max_depth']}), "
+                f"{m['processed']} ok, {m['failed']} failed, workers {self.workers}, "
+                f"busy {m['busy_seconds']:.1f}s, slowest {m['max_latency']:.2f}s")
+
+
+class NotificationPipeline:
+    """Staged pipeline: detection -> enrichment -> delivery, for game starts and game ends"""
+
+    def __init__(self, client):
+        self.client = client
+        self.delivery = DeliveryManager(client, on_delivered=self.record_latency)
+        queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', 200))
+        enrich_workers = int(os.getenv('PIPELINE_ENRICH_WORKERS', 4))
+        delivery_workers = int(os.getenv('PIPELINE_DELIVERY_WORKERS', 2))
+
+        self.start_delivery = Stage('start-delivery', self.deliver, delivery_workers, queue_size)
+        self.start_enrich = Stage('start-enrich', self.enrich_game_start, enrich_workers, queue_size,
+                                  output=self.start_delivery)
+        self.end_delivery = Stage('end-delivery', self.deliver, delivery_workers, queue_size)
+        self.end_enrich = Stage('end-enrich', self.enrich_game_end, enrich_workers, queue_size,
+                                output=self.end_delivery)
+        self.stages = [self.start_enrich, self.start_delivery, self.end_enrich, self.end_delivery]
+        self.notification_latency = {'count': 0, 'total': 0.0, 'max': 0.0}
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    async def stop(self):
+        for stage in self.stages:
+            await stage.stop()
+
+    def summary(self):
+        lat = self.notification_latency
+        avg = lat['total'] / lat['count'] if lat['count'] else 0
+        return "\n".join(
+            [stage.summary() for stage in self.stages] +
+            [self.delivery.summary(),
+             f"detection->notification: {lat['count']} sent, avg {avg:.2f}s, max {lat['max']:.2f}s"])
+
+    def record_latency(self, item, latency):
+        NOTIFICATION_LATENCY_SECONDS.observe(latency, kind=item['kind'])
+        self.notification_latency['count'] += 1
+        self.notification_latency['total'] += latency
+        self.notification_latency['max'] = max(self.notification_latency['max'], latency)
+
+    # Producers
+    async def publish_game_start(self, game_id, game_mode, player, participants=()):
+        await self.start_enrich.put({
+            'game_id': game_id,
+            'game_mode': game_mode,
+            'player': player,
+            'participants': participants,
+            'detected_at': time.monotonic(),
+        })
+
+    async def publish_game_end(self, game, game_result, trackers):
+        await self.end_enrich.put({
+            'game': game,
+            'game_result': game_result,
+            'trackers': trackers,
+            'detected_at': time.monotonic(),
+        })
+
+    # Enrichment
+    def delivery_items(self, guild_ids, event, **payload):
+        return [
+            {
+                'guild_id': guild_id,
+                'detected_at': event['detected_at'],
+                **payload,
+            }
+            for guild_id in guild_ids
+        ]
+
+    async def enrich_game_start(self, event):
+        player = event['player']
+        game_mode = event['game_mode']
+
+        # Store LP data only for ranked games
+        if is_ranked_mode(game_mode):
+            summoner_id = await resolve_summoner_id(player)
+            if summoner_id:
+                ranks = await call_limited(fetchRanks, summoner_id)
+                remember_ranks(player.get('puuid'), ranks)
+                leaderboards.record(player.get('puuid'), ranks, player['tracking_guilds'])
+                logger.debug("Storing LP for %s", player['name'])
+                for queue_type, rank_data in ranks.items():
+                    if queue_type in RANKED_QUEUES:
+                        data_manager.store_temp_lp(
+                            summoner_id, queue_type,
+                            rank_data['lp'], rank_data['tier'], rank_data['rank'])
+
+        lineup = None
+        if player.get('game', 'lol') == 'lol':
+            try:
+                with tracer.span('lobby-ranks'):
+                    lineup = await get_lineup(event['game_id'], game_mode, event.get('participants'))
+            except Exception as e:
+                logger.warning("Error fetching lobby ranks for game %s: %s", event['game_id'], e)
+
+        return self.delivery_items(
+            player['tracking_guilds'], event,
+            kind='start', game_id=event['game_id'], game_mode=game_mode,
+            player=player, lineup=lineup, label=player['name'])
+
+    async def enrich_game_end(self, event):
+        game = event['game']
+        if game.get('game') == 'tft':
+            return await self.enrich_tft_game_end(event)
+        game_result = event['game_result']
+        guild_id, summoner = event['trackers'][0]
+
+        summoner_id = game.get('summoner_id') or await resolve_summoner_id(summoner)
+        lp_changes = []
+        if summoner_id:
+            ranks = await call_limited(fetchRanks, summoner_id)
+            # Fresh ranks for the lineup if the player re-queues right away
+            remember_ranks(game['puuid'], ranks)
+            leaderboards.record(game['puuid'], ranks, {guild_id for guild_id, _ in event['trackers']})
+            lp_changes = compute_lp_changes(summoner_id, ranks)
+            data_manager.clear_temp_lp(summoner_id)
+        logger.debug("LP changes for %s: %s", summoner['name'], lp_changes)
+
+        embed = build_game_end_embed(summoner['name'], game_result, lp_changes)
+
+        row = row_from_result(game['game_id'], game_result)
+        if row:
+            try:
+                await asyncio.to_thread(archive.add, game['puuid'], [row])
+            except Exception as e:
+                logger.warning("Error archiving game %s for %s: %s", game['game_id'], summoner['name'], e)
+
+        items, runes = game_result[28], game_result[29]
+        image = None
+        # Unique per player so several builds can share one batched message
+        filename = f"build_{game['puuid'][:12]}.png"
+        if items or runes:
+            try:
+                with tracer.span('render-build-image'):
+                    image = await render_build_image(items, runes)
+                embed.add_field(name="Items", value="", inline=False)
+                embed.set_image(url=f"attachment://{filename}")
+            except Exception as e:
+                logger.warning("Error creating combined image: %s", e)
+
+        guild_ids = {guild_id for guild_id, _ in event['trackers']}
+        return self.delivery_items(
+            guild_ids, event,
+            kind='end', game_id=game['game_id'], embed=embed,
+            image=image, filename=filename, label=summoner['name'])
+
+    async def enrich_tft_game_end(self, event):
+        """The game result of a TFT end event is the parsed match of the whole lobby"""
+        game = event['game']
+        match = event['game_result']
+        guild_id, summoner = event['trackers'][0]
+        player = match['players'][game['puuid']]
+        embed = build_tft_game_end_embed(summoner['name'], match, player)
+
+        image = None
+        filename = f"board_{game['puuid'][:12]}.png"
+        try:
+            with tracer.span('render-tft-board'):
+                image = await render_tft_board(match, game['puuid'])
+            embed.set_image(url=f"attachment://{filename}")
+        except Exception as e:
+            logger.warning("Error rendering TFT board: %s", e)
+
+        guild_ids = {guild_id for guild_id, _ in event['trackers']}
+        return self.delivery_items(
+            guild_ids, event,
+            kind='end', game_id=game['game_id'], embed=embed,
+            image=image, filename=filename, label=summoner['name'])
+
+    # Delivery
+    async def deliver(self, item):
+        await self.delivery.submit(item)
+        return None
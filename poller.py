@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import time
+from data_manager import DataManager
+from live_state import live_state
+from metrics import POLL_CYCLE_SECONDS, POLL_UNIQUE_PUUIDS, POLL_TOTAL_TRACKED
+from riot_api import (fetchGameOngoing, fetchGameOngoingTFT, fetchGameResult, fetchGameResultTFT, call_limited,
+                      rate_limiter, tft_rate_limiter)
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+data_manager = DataManager()
+
+# Set at the end of every live-game sweep, so batch jobs can start in the gap between two sweeps
+sweep_finished = asyncio.Event()
+_lol_sweeps_running = 0
+
+# Each API key sees its own encrypted puuids: TFT polls use the one resolved with API_RIOT_TFT_KEY
+PUUID_FIELDS = {'lol': 'puuid', 'tft': 'tft_puuid'}
+
+
+def plays(summoner, game):
+    """True when the summoner is followed for 'lol' or 'tft' (LoL only by default)"""
+    return game in summoner.get('games', ['lol'])
+
+
+def group_by_puuid(summoners_data, game=None):
+    """Map every tracked puuid to the (guild_id, summoner) pairs tracking it.
+
+    With a game, only summoners followed for it are kept, keyed by that game's puuid.
+    """
+    field = PUUID_FIELDS.get(game, 'puuid')
+    tracking = {}
+    for guild_id, summoners in summoners_data.items():
+        for summoner in summoners:
+            if game and not plays(summoner, game):
+                continue
+            puuid = summoner.get(field)
+            if puuid:
+                tracking.setdefault(puuid, []).append((guild_id, summoner))
+    return tracking
+
+
+def is_valid_game(game_info):
+    """True when a fetchGameOngoing result describes a real ongoing game"""
+    return bool(
+        game_info and
+        all(game_info[:5]) and
+        game_info[1] != "None" and
+        game_info[2] != "None" and
+        game_info[3])
+
+
+def live_results(polled):
+    """{puuid: game_info or None} of a sweep, for the live-game state"""
+    return {puuid: game_info[:5] if is_valid_game(game_info) else None
+            for puuid, (game_info, _) in polled.items()}
+
+
+def build_player(game_info, trackers, game='lol'):
+    """Player entry handed to the notification pipeline for a game start.
+
+    For TFT, champion_name / champion_icon hold the tactician.
+    """
+    riot_id, champion_name, game_mode, game_id, champion_icon = game_info[:5]
+    guild_id, summoner = trackers[0]
+    return {
+        **summoner,
+        'game': game,
+        'champion_name': champion_name,
+        'champion_icon': champion_icon,
+        'tracking_guilds': {guild_id for guild_id, _ in trackers}
+    }
+
+
+# Résultat d'un poll en échec, distinct de None (hors partie)
+POLL_FAILED = object()
+
+# Spectator call and rate budget of each game
+SPECTATORS = {
+    'lol': (fetchGameOngoing, rate_limiter),
+    'tft': (fetchGameOngoingTFT, tft_rate_limiter),
+}
+
+
+async def sweep_live_games(summoners_data, fetch=None, limiter=None, game='lol'):
+    """Poll the spectator endpoint of `game` once per unique puuid, concurrently.
+
+    Returns ({puuid: (game_info, [(guild_id, summoner), ...])}, stats). Failed
+    polls (rate limit, 5xx, network) are left out: not knowing is not out of game.
+    """
+    fetch = fetch or SPECTATORS[game][0]
+    limiter = limiter or SPECTATORS[game][1]
+    started = time.monotonic()
+    tracking = group_by_puuid(summoners_data, game)
+    total_polls = sum(len(trackers) for trackers in tracking.values())
+    limiter.reset_peak()
+
+    async def poll(puuid):
+        try:
+            return puuid, await call_limited(fetch, puuid, limiter=limiter, name=game)
+        except Exception as e:
+            logger.warning("Error polling live game for puuid %s: %s", puuid, e)
+            return puuid, POLL_FAILED
+
+    global _lol_sweeps_running
+    # Only the LoL sweep competes with the batch jobs for API_RIOT_KEY
+    if game == 'lol':
+        sweep_finished.clear()
+        _lol_sweeps_running += 1
+    try:
+        results = await asyncio.gather(*(poll(puuid) for puuid in tracking))
+    finally:
+        if game == 'lol':
+            _lol_sweeps_running -= 1
+            sweep_finished.set()
+
+    live_games = {
+        puuid: (game_info, tracking[puuid])
+        for puuid, game_info in results
+        if game_info is not POLL_FAILED
+    }
+    stats = {
+        'game': game,
+        'duration': time.monotonic() - started,
+        'unique_polls': len(tracking),
+        'errors': len(results) - len(live_games),
+        'total_polls': total_polls,
+        'peak_concurrency': limiter.peak_in_flight,
+        'max_concurrency': limiter.concurrency,
+    }
+    record_sweep_stats(stats)
+    return live_games, stats
+
+
+async def detect_game_starts(summoners_data, pipeline):
+    """One live-game sweep: publish a start event for every game not notified yet.
+
+    LoL and TFT are polled concurrently, each under its own key's rate limiter.
+    Returns the LoL sweep stats, with the TFT ones under 'tft'.
+    """
+    notified_keys = {(game['puuid'], game['game_id']) for game in data_manager.get_notified_summoners()}
+
+    # First pass: poll each unique puuid once, then fan results out to the tracking guilds
+    with tracer.span('spectator-sweep'):
+        (live_games, sweep_stats), (tft_games, tft_stats) = await asyncio.gather(
+            sweep_live_games(summoners_data, game='lol'),
+            sweep_live_games(summoners_data, game='tft'))
+
+    active_games = {}  # {(game, game_id): {players: [], game_mode, participants}}
+    for game, polled in (('lol', live_games), ('tft', tft_games)):
+        live_state.record_sweep(game, live_results(polled))
+        for puuid, (game_info, trackers) in polled.items():
+            if not is_valid_game(game_info):
+                continue
+
+            game_mode, game_id = game_info[2], game_info[3]
+
+            # Check if already globally notified
+            if (puuid, game_id) in notified_keys:
+                continue
+
+            if (game, game_id) not in active_games:
+                active_games[(game, game_id)] = {
+                    'players': [],
+                    'game_mode': game_mode,
+                    'participants': game_info[5]
+                }
+            active_games[(game, game_id)]['players'].append(build_player(game_info, trackers, game))
+
+    # Second pass: mark players as notified and hand them to the enrichment workers
+    with tracer.span('publish-starts'):
+        for (game, game_id), game_data in active_games.items():
+            logger.debug("Processing game %s, players: %s", game_id, [p['name'] for p in game_data['players']])
+
+            for player in game_data['players']:
+                puuid = player[PUUID_FIELDS[game]]
+                data_manager.add_notified_summoner(puuid, game_id, player.get('summonerId'), game)
+                await pipeline.publish_game_start(
+                    game_id, game_data['game_mode'], player, game_data['participants'])
+
+    sweep_stats['new_games'] = len(active_games)
+    sweep_stats['tft'] = tft_stats
+    return sweep_stats
+
+
+async def detect_game_ends(summoners_data, pipeline):
+    """Fetch the result of every notified game and publish an end event for finished ones.
+
+    Returns {'pending': games checked, 'finished': end events published}.
+    """
+    notified_games = [game for game in data_manager.get_notified_summoners() if game.get('game', 'lol') == 'lol']
+    tft_games = [game for game in data_manager.get_notified_summoners() if game.get('game') == 'tft']
+    stats = {'pending': len(notified_games) + len(tft_games), 'finished': 0}
+    if tft_games:
+        stats['finished'] += await detect_tft_game_ends(tft_games, summoners_data, pipeline)
+    if not notified_games:
+        return stats
+
+    async def fetch_result(game):
+        return game, await call_limited(fetchGameResult, game['game_id'], game['puuid'])
+
+    with tracer.span('match-results'):
+        results = await asyncio.gather(
+            *(fetch_result(game) for game in notified_games), return_exceptions=True)
+    tracking = group_by_puuid(summoners_data, 'lol')
+
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("Error fetching game result: %s", result)
+            continue
+
+        game, game_result = result
+        puuid, game_id = game['puuid'], game['game_id']
+        if not game_result or not isinstance(game_result, tuple):
+            continue  # Game still in progress
+
+        # The game is over: take it out of the notified list before handing it off
+        data_manager.remove_specific_notified_summoner(puuid, game_id)
+        if game_result[0] is None:
+            logger.warning("Invalid game result returned for PUUID: %s, Game ID: %s", puuid, game_id)
+            continue
+
+        trackers = tracking.get(puuid)
+        if not trackers:
+            continue
+        logger.debug("Game result found for %s, mode: %s", game_id, game_result[16])
+        await pipeline.publish_game_end(game, game_result, trackers)
+        stats['finished'] += 1
+
+    return stats
+
+
+async def detect_tft_game_ends(tft_games, summoners_data, pipeline):
+    """Publish an end event for every notified TFT game that is over.
+
+    One match-v1 request and one parse per lobby serve every tracked player in it.
+    """
+    lobbies = {}
+    for game in tft_games:
+        lobbies.setdefault(game['game_id'], []).append(game)
+
+    async def fetch_result(game_id, games):
+        puuids = [game['puuid'] for game in games]
+        return game_id, await call_limited(fetchGameResultTFT, game_id, puuids, limiter=tft_rate_limiter, name='tft')
+
+    with tracer.span('tft-match-results'):
+        results = await asyncio.gather(
+            *(fetch_result(game_id, games) for game_id, games in lobbies.items()), return_exceptions=True)
+    tracking = group_by_puuid(summoners_data, 'tft')
+
+    finished = 0
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("Error fetching TFT game result: %s", result)
+            continue
+        game_id, match = result
+        if not match:
+            continue  # Game still in progress
+        for game in lobbies[game_id]:
+            data_manager.remove_specific_notified_summoner(game['puuid'], game_id)
+            trackers = tracking.get(game['puuid'])
+            if not trackers or game['puuid'] not in match['players']:
+                continue
+            await pipeline.publish_game_end(game, match, trackers)
+            finished += 1
+    return finished
+
+
+def record_sweep_stats(stats):
+    game = stats.get('game', 'lol')
+    POLL_CYCLE_SECONDS.observe(stats['duration'], game=game)
+    POLL_UNIQUE_PUUIDS.set(stats['unique_polls'], game=game)
+    POLL_TOTAL_TRACKED.set(stats['total_polls'], game=game)
+
+
+def sweep_running():
+    """True while a LoL live-game sweep of this process is using API_RIOT_KEY"""
+    return _lol_sweeps_running > 0
+
+
+async def wait_for_sweep_gap(timeout=90):
+    """Wait until the current live-game sweep is over (or the next one, if idle)"""
+    sweep_finished.clear()
+    try:
+        await asyncio.wait_for(sweep_finished.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from log_config import setup_logging
+from poller import sweep_live_games, is_valid_game, live_results, plays, PUUID_FIELDS
+from rate_limiter import RateLimiter
+from riot_api import fetchGameResult, fetchGameResultTFT, call_limited, rate_limiter, tft_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Nombre de tentatives match-v5 avant d'abandonner une partie terminée
+MAX_RESULT_ATTEMPTS = 30
+# Part du quota de chaque clé gardée par le processus gateway (commandes, rangs quotidiens, enrichissement,
+# historique) ; les workers se partagent le reste
+GATEWAY_SHARE = float(os.getenv('POLLER_GATEWAY_SHARE', 0.3))
+
+
+def partition(puuid, count):
+    """Stable shard index of a puuid (the builtin hash() is salted per process)"""
+    digest = hashlib.blake2b(puuid.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+
+def share_limiter(limiter, count, gateway_share=GATEWAY_SHARE):
+    """Limiter holding 1/count of the budget the gateway leaves to the workers"""
+    limits = tuple((max(1, int(n * (1 - gateway_share) / count)), seconds) for n, seconds in limiter.limits)
+    return RateLimiter(limits=limits, concurrency=max(1, limiter.concurrency // count))
+
+
+def worker_main(index, count, interval, assignments, events):
+    """Entry point of a poller worker process"""
+    setup_logging()
+    try:
+        asyncio.run(_worker_loop(index, count, interval, assignments, events))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(index, count, interval, assignments, events):
+    limiters = {'lol': share_limiter(rate_limiter, count), 'tft': share_limiter(tft_rate_limiter, count)}
+    summoners = []
+    current_games = {'lol': {}, 'tft': {}}  # game -> {puuid: game_id}
+    ended_games = {}  # (game, puuid, game_id) -> attempts
+    logger.info("Poller worker %s/%s started with limits %s", index, count,
+                {game: limiter.limits for game, limiter in limiters.items()})
+
+    while True:
+        started = time.monotonic()
+
+        # Keep only the most recent assignment sent by the gateway
+        try:
+            while True:
+                summoners = assignments.get_nowait()
+        except queue.Empty:
+            pass
+
+        (live_games, stats), (tft_games, tft_stats) = await asyncio.gather(
+            sweep_live_games({index: summoners}, limiter=limiters['lol'], game='lol'),
+            sweep_live_games({index: summoners}, limiter=limiters['tft'], game='tft'))
+        for game, polled in (('lol', live_games), ('tft', tft_games)):
+            events.put(('live', game, live_results(polled)))
+            games = current_games[game]
+            for puuid, (game_info, _) in polled.items():
+                if is_valid_game(game_info):
+                    game_id = game_info[3]
+                    if games.get(puuid) != game_id:
+                        games[puuid] = game_id
+                        events.put(('start', game, puuid, game_info))
+                elif puuid in games and not any(game_info or ()):
+                    # Only a 404 ends the game: failed polls are not in `polled`, and an
+                    # unreadable answer keeps the previous state
+                    ended_games[(game, puuid, games.pop(puuid))] = 0
+
+            # Forget players that were unassigned while in game
+            assigned = {summoner.get(PUUID_FIELDS[game]) for summoner in summoners if plays(summoner, game)}
+            for puuid in [p for p in games if p not in assigned]:
+                del games[puuid]
+
+        for (game, puuid, game_id), attempts in list(ended_games.items()):
+            try:
+                if game == 'tft':
+                    game_result = await call_limited(fetchGameResultTFT, game_id, [puuid], limiter=limiters['tft'], name='tft')
+                else:
+                    game_result = await call_limited(fetchGameResult, game_id, puuid, limiter=limiters['lol'])
+            except Exception as e:
+                logger.warning("Error fetching result of %s game %s: %s", game, game_id, e)
+                game_result = None
+            if game_result is None and attempts + 1 < MAX_RESULT_ATTEMPTS:
+                ended_games[(game, puuid, game_id)] = attempts + 1
+                continue
+            del ended_games[(game, puuid, game_id)]
+            events.put(('end', game, puuid, game_id, game_result))
+
+        events.put(('stats', index, stats))
+        events.put(('stats', index, tft_stats))
+        await asyncio.sleep(max(0, interval - (time.monotonic() - started)))
+
+
+class PollerPool:
+    """Live-game polling spread over worker processes by puuid hash.
+
+    The gateway process pushes each worker its share of the tracked summoners
+    and receives ('start', game, puuid, game_info), ('end', game, puuid,
+    game_id, game_result), ('live', game, {puuid: game_info}) and
+    ('stats', index, stats) events on a shared queue.
+    A worker polls LoL and TFT for the summoners it owns.
+    """
+
+    def __init__(self, workers, interval=30):
+        ctx = multiprocessing.get_context('spawn')
+        self.workers = workers
+        self.events_queue = ctx.Queue()
+        self.assignments = [ctx.Queue() for _ in range(workers)]
+        self.processes = [
+            ctx.Process(
+                target=worker_main,
+                args=(i, workers, interval, self.assignments[i], self.events_queue),
+                name=f"poller-{i}",
+                daemon=True)
+            for i in range(workers)
+        ]
+        self._last_assignment = None
+        self._reserved = False
+
+    def start(self):
+        # Workers and gateway share the keys' quotas: the gateway keeps GATEWAY_SHARE of them.
+        # Done here and not in __init__: spawned workers re-import main.py and build a pool too
+        if not self._reserved:
+            rate_limiter.reserve(GATEWAY_SHARE)
+            tft_rate_limiter.reserve(GATEWAY_SHARE)
+            self._reserved = True
+        for process in self.processes:
+            if not process.is_alive():
+                process.start()
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+
+    def assign(self, summoners_data):
+        """Send every worker the summoners it owns (only when the tracked set changed)"""
+        shards = [{} for _ in range(self.workers)]
+        for summoners in summoners_data.values():
+            for summoner in summoners:
+                puuid = summoner.get('puuid')
+                if not puuid:
+                    continue
+                shard = shards[partition(puuid, self.workers)]
+                merged = shard.get(puuid)
+                if merged is None:
+                    shard[puuid] = dict(summoner, games=list(summoner.get('games', ['lol'])))
+                    continue
+                # Several guilds may track the player for different games: poll the union
+                merged['games'] += [game for game in summoner.get('games', ['lol']) if game not in merged['games']]
+                if not merged.get('tft_puuid') and summoner.get('tft_puuid'):
+                    merged['tft_puuid'] = summoner['tft_puuid']
+
+        # Game choices are part of the assignment: /setgames must reach the workers
+        assignment = [sorted((puuid, tuple(sorted(summoner['games'])), summoner.get('tft_puuid'))
+                             for puuid, summoner in shard.items()) for shard in shards]
+        if assignment == self._last_assignment:
+            return
+        self._last_assignment = assignment
+        for shard, assignments in zip(shards, self.assignments):
+            assignments.put(list(shard.values()))
+
+    async def events(self):
+        """Yield worker events without blocking the event loop"""
+        while True:
+            try:
+                # Short timeout so the helper thread never outlives the bot
+                yield await asyncio.to_thread(self.events_queue.get, True, 1)
+            except queue.Empty:
+                continue
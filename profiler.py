@@ -0,0 +1,210 @@
+import asyncio
+import cProfile
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+# Le loop est considéré bloqué quand le heartbeat a plus de 50 ms de retard
+BLOCKED_THRESHOLD = 0.05
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def collapse_stack(frame):
+    """`outer;inner;leaf` as used by flamegraph.pl / speedscope"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class LoopSampler(threading.Thread):
+    """Sample the event loop thread's stack every `interval` seconds.
+
+    Each sample is tagged with the asyncio task running at that moment, and
+    samples taken while the loop heartbeat is late are tagged as blocked, so
+    synchronous code stalling the loop shows up with its stack.
+    """
+
+    def __init__(self, loop, loop_thread_id, interval=0.005):
+        super().__init__(name='loop-sampler', daemon=True)
+        self.loop = loop
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.task_samples = Counter()
+        self.blocked_samples = 0
+        self.samples = 0
+        self.heartbeat = time.monotonic()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            try:
+                task = asyncio.current_task(self.loop)
+            except RuntimeError:
+                task = None
+            task_name = task.get_name() if task else 'idle'
+            blocked = time.monotonic() - self.heartbeat > BLOCKED_THRESHOLD
+
+            prefix = f"task:{task_name}" + (';[blocked]' if blocked else '')
+            self.stacks[f"{prefix};{collapse_stack(frame)}"] += 1
+            self.task_samples[task_name] += 1
+            self.blocked_samples += blocked
+            self.samples += 1
+
+
+class Profiler:
+    """Profile the running bot for a fixed window, one run at a time.
+
+    ``sample`` mode writes collapsed stacks (flame graph input) with
+    per-task and blocked time. ``cprofile`` mode additionally records a
+    deterministic cProfile of the event loop thread into a .pstats file.
+    """
+
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        self.running = False
+
+    async def _heartbeat(self, sampler, lag):
+        interval = 0.01
+        while True:
+            expected = time.monotonic() + interval
+            sampler.heartbeat = time.monotonic()
+            await asyncio.sleep(interval)
+            late = time.monotonic() - expected
+            if late > BLOCKED_THRESHOLD:
+                lag['blocked_seconds'] += late
+                lag['max_lag'] = max(lag['max_lag'], late)
+
+    async def run(self, duration=30, mode='sample'):
+        """Profile for `duration` seconds; returns (summary text, [written files])"""
+        if self.running:
+            raise RuntimeError("Un profilage est déjà en cours")
+        self.running = True
+        try:
+            return await self._run(duration, mode)
+        finally:
+            self.running = False
+
+    async def _run(self, duration, mode):
+        base = os.path.join(self.directory, f"profile_{datetime.now():%Y%m%d_%H%M%S}")
+        loop = asyncio.get_running_loop()
+        sampler = LoopSampler(loop, threading.get_ident())
+        lag = {'blocked_seconds': 0.0, 'max_lag': 0.0}
+        window_start = time.time()
+
+        logger.info("Profiling started", extra={'fields': {'mode': mode, 'duration': duration}})
+        profile = cProfile.Profile() if mode == 'cprofile' else None
+        sampler.start()
+        heartbeat = asyncio.create_task(self._heartbeat(sampler, lag), name='profiler-heartbeat')
+        if profile:
+            profile.enable()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            if profile:
+                profile.disable()
+            heartbeat.cancel()
+            await asyncio.to_thread(sampler.stop)
+
+        # The tracer is read on the loop thread, the files are written off it
+        summary = self.summarize(sampler, lag, duration, window_start)
+        files = await asyncio.to_thread(self._write_files, base, profile, sampler, summary)
+
+        logger.info("Profiling done", extra={'fields': {
+            'samples': sampler.samples, 'blocked_seconds': round(lag['blocked_seconds'], 3), 'files': files}})
+        return summary, files
+
+    def _write_files(self, base, profile, sampler, summary):
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        if profile:
+            profile.dump_stats(f"{base}.pstats")
+            files.append(f"{base}.pstats")
+
+        with open(f"{base}.folded", 'w', encoding='utf-8') as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        files.append(f"{base}.folded")
+
+        with open(f"{base}_summary.txt", 'w', encoding='utf-8') as f:
+            f.write(summary)
+        files.append(f"{base}_summary.txt")
+        return files
+
+    def summarize(self, sampler, lag, duration, window_start):
+        lines = [f"Fenêtre: {duration}s, {sampler.samples} échantillons toutes les {sampler.interval * 1000:.0f} ms"]
+        lines.append(
+            f"Loop bloqué: {lag['blocked_seconds']:.2f}s (pire retard {lag['max_lag'] * 1000:.0f} ms), "
+            f"{sampler.blocked_samples} échantillons bloqués")
+
+        lines.append("\nTemps par tâche (échantillonné):")
+        for task_name, count in sampler.task_samples.most_common(10):
+            lines.append(f"  {task_name}: {count * sampler.interval:.2f}s")
+
+        # tasks.loop cycles that ran during the window, from the tracing ring buffer
+        cycles = {}
+        for trace in tracer.traces:
+            if trace.started_at >= window_start:
+                stats = cycles.setdefault(trace.name, [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += trace.duration
+                stats[2] = max(stats[2], trace.duration)
+        lines.append("\nCycles terminés pendant la fenêtre:")
+        for name, (count, total, longest) in sorted(cycles.items()):
+            lines.append(f"  {name}: ×{count}, total {total:.2f}s, max {longest:.2f}s")
+
+        lines.append("\nPiles les plus fréquentes:")
+        for stack, count in sampler.stacks.most_common(5):
+            frames = stack.split(';')
+            lines.append(f"  {count}× {frames[0]} … {' > '.join(frames[-3:])}")
+        return "\n".join(lines) + "\n"
+
+    def install_signal_handler(self, loop, duration=None, mode=None):
+        """SIGUSR2 starts a profile run; no-op where signals aren't supported (Windows)"""
+        if not hasattr(signal, 'SIGUSR2'):
+            return False
+        duration = duration or int(os.getenv('PROFILE_SECONDS', 30))
+        mode = mode or os.getenv('PROFILE_MODE', 'sample')
+
+        async def run_logged():
+            try:
+                await self.run(duration, mode)
+            except Exception as e:
+                logger.exception("Profiling failed: %s", e)
+
+        def on_signal():
+            if self.running:
+                logger.warning("SIGUSR2 ignored: profiling already running")
+                return
+            loop.create_task(run_logged(), name='profiler')
+
+        try:
+            loop.add_signal_handler(signal.SIGUSR2, on_signal)
+        except (NotImplementedError, RuntimeError):
+            return False
+        return True
+
+
+profiler = Profiler()
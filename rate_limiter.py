@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+
+def parse_limits(spec):
+    """Parse a Riot-style limit string such as "20:1,100:120" into (count, seconds) pairs"""
+    limits = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        count, seconds = part.split(':')
+        limits.append((int(count), float(seconds)))
+    return tuple(limits)
+
+
+class RateLimiter:
+    """Sliding-window limiter mirroring Riot's application rate limits.
+
+    Every limit is a (count, seconds) pair; a request may only start once all
+    windows have room. A semaphore additionally bounds how many requests are in
+    flight at the same time.
+    """
+
+    def __init__(self, limits=((20, 1), (100, 120)), concurrency=10):
+        self.limits = tuple(limits)
+        self.concurrency = concurrency
+        self._windows = [deque() for _ in self.limits]
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @classmethod
+    def from_env(cls, limits_var, concurrency_var, default_limits="20:1,100:120", default_concurrency=10):
+        """Build a limiter from environment variables, e.g. RIOT_RATE_LIMITS="500:10,30000:600" """
+        limits = parse_limits(os.getenv(limits_var, default_limits))
+        concurrency = int(os.getenv(concurrency_var, default_concurrency))
+        return cls(limits=limits, concurrency=concurrency)
+
+    def _purge(self, now):
+        for (_, seconds), window in zip(self.limits, self._windows):
+            while window and now - window[0] >= seconds:
+                window.popleft()
+
+    async def acquire(self):
+        """Wait until every window has room, then record the request"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._purge(now)
+                wait = 0
+                for (count, seconds), window in zip(self.limits, self._windows):
+                    if len(window) >= count:
+                        wait = max(wait, seconds - (now - window[0]))
+                if wait <= 0:
+                    for window in self._windows:
+                        window.append(now)
+                    return
+                await asyncio.sleep(wait)
+
+    def headroom(self):
+        """Fraction of the tightest window still available (1.0 = idle, 0.0 = saturated)"""
+        self._purge(time.monotonic())
+        return min(
+            (count - len(window)) / count
+            for (count, _), window in zip(self.limits, self._windows)
+        )
+
+    def reserve(self, fraction):
+        """Keep only `fraction` of every window, leaving the rest to other processes sharing the key"""
+        self.limits = tuple((max(1, int(count * fraction)), seconds) for count, seconds in self.limits)
+
+    def reset_peak(self):
+        self.peak_in_flight = self.in_flight
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            await self.acquire()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._semaphore.release()
+        return False
@@ -1,9 +1,19 @@
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import time
 import requests
 from dotenv import load_dotenv
 import os
 import json
 from data_manager import DataManager
+from rate_limiter import RateLimiter
+from metrics import RIOT_REQUEST_SECONDS, RIOT_RESPONSES, RATE_LIMIT_HEADROOM
+from riot_trace import TraceRecorder, process_trace_path
+from tracing import tracer
 
+logger = logging.getLogger(__name__)
 data_manager = DataManager()
 
 try:
@@ -11,17 +21,10 @@ try:
         items_list = json.load(f)
         # Convert list to dictionary with id as key
         items_data = {str(item['id']): item for item in items_list if 'id' in item}
-        print(f"Successfully loaded items.json and converted to dictionary with {len(items_data)} items")
-        
-        # Test with a specific item
-        test_item = "3057"
-        if test_item in items_data:
-            print(f"Test item {test_item} found: {items_data[test_item]['name']}")
-        else:
-            print(f"Test item {test_item} not found")
-            
+        logger.info("Loaded items.json with %d items", len(items_data))
+
 except Exception as e:
-    print(f"Error loading items.json: {e}")
+    logger.error("Error loading items.json: %s", e)
     items_data = {}
 
 # Charger les variables d'environnement depuis le fichier .env
@@ -35,40 +38,130 @@ if not key:
 if not key_tft:
     raise ValueError("API_RIOT_TFT_KEY n'est pas bien défini")
 
-# Fonction pour demander les informations de l'invocateur
-async def requestSummoner(name, tag, key):
-    account_url = f'https://europe.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{name}/{tag}?api_key={key}'
-    account_response = requests.get(account_url)
+# Routage Riot (europe / euw1), surchargeable pour pointer vers riot_mock.py
+REGIONAL_URL = os.getenv('RIOT_REGIONAL_URL', 'https://europe.api.riotgames.com').rstrip('/')
+PLATFORM_URL = os.getenv('RIOT_PLATFORM_URL', 'https://euw1.api.riotgames.com').rstrip('/')
+
+# Limiteur partagé par tous les appels concurrents faits avec API_RIOT_KEY
+rate_limiter = RateLimiter.from_env('RIOT_RATE_LIMITS', 'RIOT_MAX_CONCURRENCY')
+# API_RIOT_TFT_KEY a son propre quota chez Riot
+tft_rate_limiter = RateLimiter.from_env('RIOT_TFT_RATE_LIMITS', 'RIOT_TFT_MAX_CONCURRENCY')
+
+# Session partagée pour réutiliser les connexions HTTP (keep-alive)
+session = requests.Session()
+
+# RIOT_RECORD=trace.jsonl.gz enregistre le trafic (sans la clé) pour le rejouer avec riot_trace
+recorder = None
+if os.getenv('RIOT_RECORD'):
+    record_path = os.getenv('RIOT_RECORD')
+    if multiprocessing.parent_process() is not None:
+        record_path = process_trace_path(record_path, os.getpid())
+    recorder = TraceRecorder(record_path, {'summoners_data': data_manager.summoners_data})
+    atexit.register(recorder.close)
+    logger.info("Recording Riot API traffic to %s", recorder.path)
+
+
+def riot_get(url, endpoint):
+    """GET a Riot API url, recording latency and status code for the given endpoint"""
+    started = time.perf_counter()
+    try:
+        response = session.get(url)
+    except requests.exceptions.RequestException:
+        RIOT_RESPONSES.inc(endpoint=endpoint, status='error')
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        RIOT_REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+    RIOT_RESPONSES.inc(endpoint=endpoint, status=response.status_code)
+    if recorder:
+        recorder.record(endpoint, url, response, elapsed)
+    return response
+
+
+class RiotUnavailable(Exception):
+    """Transient Riot API failure (429, 5xx, network): the same call may succeed later"""
+
+
+def riot_get_checked(url, endpoint):
+    """riot_get raising RiotUnavailable on transient failures; other statuses are left to the caller"""
+    try:
+        response = riot_get(url, endpoint)
+    except requests.exceptions.RequestException as e:
+        raise RiotUnavailable(f"{endpoint}: {e}") from e
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RiotUnavailable(f"{endpoint}: HTTP {response.status_code}")
+    return response
+
+
+async def call_limited(func, *args, limiter=None, name='lol', **kwargs):
+    """Run a blocking Riot API call in a worker thread once the rate limiter allows it"""
+    limiter = limiter or rate_limiter
+    queued = time.perf_counter()
+    async with limiter:
+        tracer.record('rate-limit-wait', time.perf_counter() - queued)
+        RATE_LIMIT_HEADROOM.set(limiter.headroom(), limiter=name)
+        with tracer.span(func.__name__):
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def resolve_summoner_id(summoner):
+    """summonerId of a tracked summoner, resolved through the rate limiter when it was not stored"""
+    if summoner.get('summonerId'):
+        return summoner['summonerId']
+    puuid = summoner.get('puuid')
+    if not puuid:
+        puuid = (await call_limited(fetchAccount, summoner['name'], summoner['tag']))['puuid']
+    return (await call_limited(fetchSummoner, puuid)).get('id')
+
+def fetchAccount(name, tag, game='lol'):
+    """account-v1 data of a Riot ID, as seen by the API key of `game` (puuids differ per key)"""
+    api_key, suffix = (key_tft, " en TFT") if game == 'tft' else (key, "")
+    account_url = f'{REGIONAL_URL}/riot/account/v1/accounts/by-riot-id/{name}/{tag}?api_key={api_key}'
+    account_response = riot_get(account_url, 'account-v1')
 
     if account_response.status_code == 404:
-        print('Compte n\'existe pas')
+        logger.info("Compte n'existe pas: %s#%s", name, tag)
         raise ValueError("Invocateur n'existe pas")
     elif account_response.status_code != 200:
-        print('Erreur dans l\'obtention des données du compte')
-        raise ValueError("Erreur lors de l'obtention des données")
+        logger.warning("Erreur dans l'obtention des données du compte%s: %s", suffix, account_response.status_code)
+        raise ValueError(f"Erreur lors de l'obtention des données{suffix}")
+
+    return account_response.json()
 
-    account_data = account_response.json()
-    puuid = account_data['puuid']
 
-    summoner_url = f'https://euw1.api.riotgames.com/lol/summoner/v4/summoners/by-puuid/{puuid}?api_key={key}'
-    summoner_response = requests.get(summoner_url)
+def fetchSummoner(puuid):
+    """summoner-v4 data of a puuid"""
+    summoner_url = f'{PLATFORM_URL}/lol/summoner/v4/summoners/by-puuid/{puuid}?api_key={key}'
+    summoner_response = riot_get(summoner_url, 'summoner-v4')
 
     if summoner_response.status_code == 404:
-        print('Invocateur n\'existe pas')
+        logger.info("Invocateur n'existe pas: %s", puuid)
         raise ValueError("Invocateur n'existe pas")
     elif summoner_response.status_code != 200:
-        print('Erreur dans l\'obtention des données de l\'invocateur')
+        logger.warning("Erreur dans l'obtention des données de l'invocateur: %s", summoner_response.status_code)
         raise ValueError("Erreur lors de l'obtention des données")
 
-    summoner_data = summoner_response.json()
+    return summoner_response.json()
+
+
+def profileIconUrl(icon_id):
+    return f'https://cdn.communitydragon.org/14.10.1/profile-icon/{icon_id}'
+
+
+# Fonction pour demander les informations de l'invocateur
+async def requestSummoner(name, tag, key):
+    account_data = fetchAccount(name, tag)
+    puuid = account_data['puuid']
+
+    summoner_data = fetchSummoner(puuid)
     summonerId = summoner_data.get('id')
     summonerTagline = account_data.get('tagLine')
     summonerGamename = account_data.get('gameName')
     summonerLevel = "Lvl." + str(summoner_data['summonerLevel'])
-    profileIcon = f'https://cdn.communitydragon.org/14.10.1/profile-icon/{summoner_data["profileIconId"]}'
+    profileIcon = profileIconUrl(summoner_data["profileIconId"])
 
-    totalMastery_url = f'https://euw1.api.riotgames.com/lol/champion-mastery/v4/scores/by-puuid/{puuid}?api_key={key}'
-    totalMastery_response = requests.get(totalMastery_url)
+    totalMastery_url = f'{PLATFORM_URL}/lol/champion-mastery/v4/scores/by-puuid/{puuid}?api_key={key}'
+    totalMastery_response = riot_get(totalMastery_url, 'champion-mastery-v4')
     totalMastery_data = totalMastery_response.json()
 
     return summonerTagline, summonerGamename, summonerLevel, profileIcon, summonerId, totalMastery_data, puuid
@@ -77,45 +170,66 @@ async def requestSummoner(name, tag, key):
 def fetchRanks(summonerId):
     try:
         if not isinstance(summonerId, str) or len(summonerId) < 30:  # Riot IDs are typically longer
-            print(f"Warning: Possibly invalid summoner ID format: {summonerId}")
+            logger.warning("Possibly invalid summoner ID format: %s", summonerId)
             return {}
         # First try PUUID-based endpoint
-        ranks_url = f'https://euw1.api.riotgames.com/lol/league/v4/entries/by-summoner/{summonerId}?api_key={key}'
-        ranks_response = requests.get(ranks_url)
+        ranks_url = f'{PLATFORM_URL}/lol/league/v4/entries/by-summoner/{summonerId}?api_key={key}'
+        ranks_response = riot_get(ranks_url, 'league-v4')
 
         if ranks_response.status_code == 400:  # If bad request, summoner ID might be invalid
-            print(f"Warning: Invalid summoner ID format: {summonerId}")
+            logger.warning("Invalid summoner ID format: %s", summonerId)
             return {}
 
         if ranks_response.status_code != 200:
             error_message = ranks_response.json().get('status', {}).get('message', 'Unknown error')
-            print(f"Error fetching ranks: {ranks_response.status_code} - {error_message}")
+            logger.warning("Error fetching ranks: %s - %s", ranks_response.status_code, error_message)
             return {}
 
-        ranks_data = ranks_response.json()
-        ranks = {}
-        for entry in ranks_data:
-            queue_type = entry['queueType']
-            tier = entry.get('tier', 'Unranked')
-            rank = entry.get('rank', '')
-            lp = entry.get('leaguePoints', 0)
-            wins = entry.get('wins', 0)
-            losses = entry.get('losses', 0)
-            win_rate = round(wins / (wins + losses) * 100, 2) if (wins + losses) > 0 else 0
-            ranks[queue_type] = {
-                'display': f"{tier} {rank} ({lp} LP) - {wins}W/{losses}L ({win_rate}% WR)",
-                'tier': tier,
-                'rank': rank,
-                'lp': lp
-            }
-
-        return ranks
+        return parseRanks(ranks_response.json())
 
     except Exception as e:
-        print(f"Error in fetchRanks: {e}")
+        logger.exception("Error in fetchRanks: %s", e)
         return {}
 
 
+def fetchRanksByPuuid(puuid):
+    """Ranks of any player by puuid (spectator v5 participants have no summonerId).
+
+    Returns the parseRanks dict, {} when unranked, None when the call failed.
+    """
+    ranks_url = f'{PLATFORM_URL}/lol/league/v4/entries/by-puuid/{puuid}?api_key={key}'
+    try:
+        ranks_response = riot_get(ranks_url, 'league-v4')
+        if ranks_response.status_code != 200:
+            logger.debug("Error fetching ranks for puuid %s: %s", puuid, ranks_response.status_code)
+            return None
+        return parseRanks(ranks_response.json())
+    except Exception as e:
+        logger.warning("Error in fetchRanksByPuuid: %s", e)
+        return None
+
+
+def parseRanks(ranks_data):
+    """league-v4 entries -> {queueType: {'display', 'tier', 'rank', 'lp'}}"""
+    ranks = {}
+    for entry in ranks_data:
+        queue_type = entry['queueType']
+        tier = entry.get('tier', 'Unranked')
+        rank = entry.get('rank', '')
+        lp = entry.get('leaguePoints', 0)
+        wins = entry.get('wins', 0)
+        losses = entry.get('losses', 0)
+        win_rate = round(wins / (wins + losses) * 100, 2) if (wins + losses) > 0 else 0
+        ranks[queue_type] = {
+            'display': f"{tier} {rank} ({lp} LP) - {wins}W/{losses}L ({win_rate}% WR)",
+            'tier': tier,
+            'rank': rank,
+            'lp': lp
+        }
+
+    return ranks
+
+
 # Récupérer les meilleures maîtrises d'un invocateur
 def fetchMasteries(puuid, count=1):
     # Charger le fichier JSON local
@@ -130,8 +244,8 @@ def fetchMasteries(puuid, count=1):
         return champion_name_dict.get(champion_id, "Unknown Champion")
 
     # URL pour obtenir les meilleures maîtrises de champion
-    bestMasteries_url = f'https://euw1.api.riotgames.com/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/top?count={count}&api_key={key}'
-    bestMasteries_response = requests.get(bestMasteries_url)
+    bestMasteries_url = f'{PLATFORM_URL}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/top?count={count}&api_key={key}'
+    bestMasteries_response = riot_get(bestMasteries_url, 'champion-mastery-v4')
     bestMasteries_data = bestMasteries_response.json()
 
     masteries = []
@@ -147,16 +261,19 @@ def fetchMasteries(puuid, count=1):
 
 # Fonction pour récupérer les informations de la partie en cours
 def fetchGameOngoing(puuid):
-    spectatorGame_url = f'https://euw1.api.riotgames.com/lol/spectator/v5/active-games/by-summoner/{puuid}?api_key={key}'
+    """Ongoing LoL game of a puuid, all None when out of game (404).
+
+    Raises RiotUnavailable on any other failure: a rate-limited player is not out of game.
+    """
+    spectatorGame_url = f'{PLATFORM_URL}/lol/spectator/v5/active-games/by-summoner/{puuid}?api_key={key}'
+    spectatorGame_response = riot_get_checked(spectatorGame_url, 'spectator-v5')
+    if spectatorGame_response.status_code == 404:
+        return None, None, None, None, None, None
+    elif spectatorGame_response.status_code != 200:
+        logger.warning("Erreur lors de la récupération de la partie en cours pour puuid %s: %s", puuid, spectatorGame_response.status_code)
+        raise RiotUnavailable(f"spectator-v5: HTTP {spectatorGame_response.status_code}")
+
     try:
-        spectatorGame_response = requests.get(spectatorGame_url)
-        
-        if spectatorGame_response.status_code == 404 or spectatorGame_response.status_code == 429:
-            return None, None, None, None, None
-        elif spectatorGame_response.status_code != 200:
-            print(f"Erreur lors de la récupération des données de la partie pour l'invocateur avec puuid {puuid}: {spectatorGame_response.status_code}")
-            return None, None, None, None, None
-        
         spectatorGame_data = spectatorGame_response.json()
         
         queueId = spectatorGame_data['gameQueueConfigId']
@@ -180,38 +297,79 @@ def fetchGameOngoing(puuid):
         gameMode = game_modes.get(queueId, f'Mode non référencé: {queueId}')
 
         players = spectatorGame_data['participants']
+        # Tout le lobby, pour afficher les rangs des 10 joueurs au début de la partie
+        participants = tuple(
+            (p.get('puuid'), p.get('riotId', p.get('summonerName', '?')), p.get('championId'), p.get('teamId'))
+            for p in players)
 
         for player in players:
             if player['puuid'] == puuid:
                 championGameId = player['championId']
                 championName = data_manager.get_champion_name(champion_id=championGameId)
                 championIcon = f'https://cdn.communitydragon.org/latest/champion/{championGameId}/tile'
-                riotId = player.get('summonerName', 'UnknownSummoner')
-                return riotId, championName, gameMode, gameId, championIcon
+                riotId = player.get('riotId', player.get('summonerName', 'UnknownSummoner'))
+                return riotId, championName, gameMode, gameId, championIcon, participants
                 
     except Exception as e:
-        print(f"Une erreur s'est produite lors de la récupération des informations de jeu en cours pour puuid {puuid}: {e}")
-        return None, None, None, None, None
+        logger.warning("Erreur lors de la lecture de la partie en cours pour puuid %s: %s", puuid, e)
+        raise
 
-    return None, None, None, None, None
+    return None, None, None, None, None, None
 
-def fetchGameResult(gameId, puuid):
-    match_url = f"https://europe.api.riotgames.com/lol/match/v5/matches/EUW1_{gameId}?api_key={key}"
-    match_response = requests.get(match_url)
+def fetchMatch(gameId):
+    """match-v5 payload of a LoL game, or None when it does not exist (yet).
+
+    Raises RiotUnavailable on transient failures.
+    """
+    match_url = f"{REGIONAL_URL}/lol/match/v5/matches/EUW1_{gameId}?api_key={key}"
+    match_response = riot_get_checked(match_url, 'match-v5')
     if match_response.status_code != 200:
-        print(f"Failed to fetch match data, status code: {match_response.status_code}, response: {match_response.text}")
+        # 404 tant que la partie n'est pas terminée
+        logger.debug("Match %s not available: %s", gameId, match_response.status_code)
         return None
 
     match_data = match_response.json()
     if 'info' not in match_data:
-        print(f"Error fetching game results: {match_data.get('status', {}).get('message', 'Unknown error')}")
+        logger.warning("Error fetching game results: %s", match_data.get('status', {}).get('message', 'Unknown error'))
         return None
+    return match_data
 
+
+def fetchGameResult(gameId, puuid):
+    try:
+        match_data = fetchMatch(gameId)
+    except RiotUnavailable as e:
+        logger.debug("Match %s not available: %s", gameId, e)
+        return None
+    if match_data is None:
+        return None
+    return parseGameResult(match_data, gameId, puuid)
+
+
+def fetchMatchIds(puuid, start=0, count=100):
+    """match-v5 ids of a player's LoL games, newest first (at most 100 per page).
+
+    Returns None when Riot rejects the request (e.g. a puuid from another key),
+    raises RiotUnavailable on transient failures.
+    """
+    ids_url = (f"{REGIONAL_URL}/lol/match/v5/matches/by-puuid/{puuid}/ids"
+               f"?start={start}&count={count}&api_key={key}")
+    ids_response = riot_get_checked(ids_url, 'match-v5-ids')
+    if ids_response.status_code != 200:
+        logger.warning("Error fetching match ids for puuid %s: %s", puuid, ids_response.status_code)
+        return None
+    return ids_response.json()
+
+
+def parseGameResult(match_data, gameId, puuid):
+    """Summarize the match-v5 payload of a finished game from `puuid`'s point of view"""
     globalInfo = match_data['info']
     players = globalInfo['participants']
     teams = globalInfo['teams']
     gameDuration = globalInfo['gameDuration']
     gameMode = globalInfo['gameMode']
+    queueId = globalInfo.get('queueId', 0)
+    gameEnd = globalInfo.get('gameEndTimestamp', globalInfo.get('gameCreation', 0)) // 1000
 
     if gameDuration > 3600:
         gameDuration = gameDuration // 1000
@@ -256,23 +414,15 @@ def fetchGameResult(gameId, puuid):
 
             # Get items information
             items = []
-            print("\n=== Processing items for player ===")
-            
             for i in range(0, 7):  # Items slots 0-6 (including trinket)
                 item_id = player[f'item{i}']
                 if item_id and item_id > 0:
-                    item_id_str = str(item_id)
-                    print(f"Debug - Processing item ID: {item_id_str}")  # Debug print
-                    
-                    if item_id_str in items_data:
+                    if str(item_id) in items_data:
                         # Use ddragon URL directly
-                        item_url = f'https://ddragon.leagueoflegends.com/cdn/14.3.1/img/item/{item_id}.png'
-                        print(f"Debug - Created URL: {item_url}")  # Debug print
-                        items.append(item_url)
+                        items.append(f'https://ddragon.leagueoflegends.com/cdn/14.3.1/img/item/{item_id}.png')
                     else:
-                        print(f"Debug - Item {item_id} not found in items_data")
-
-            print("Debug - Final items list:", items)
+                        logger.debug("Item %s not found in items_data", item_id)
+            logger.debug("Items for %s in game %s: %s", puuid, gameId, items)
 
             # Get perks (runes) information
             perks = player.get('perks', {})
@@ -310,7 +460,7 @@ def fetchGameResult(gameId, puuid):
             }
             arenaTeam = arena_teams.get(playerSubteamId, '?')
 
-            print(f"Game result for player {puuid} in game {gameId}: {gameResult}, {score}, {cs}, {champion}")
+            logger.debug("Game result for player %s in game %s: %s, %s, %s, %s", puuid, gameId, gameResult, score, cs, champion)
 
             if poste == "TOP":
                 poste = "Top"
@@ -328,10 +478,12 @@ def fetchGameResult(gameId, puuid):
                     tripleKills, doubleKills, firstBloodKill, firstTowerKill,
                     formattedGameDuration, gameMode, killParticipationPercent, arenaTeam,
                     placement, damageSelfMitigated, damageContributionPercent, damageContributionPercentArena, team_dragons, team_heralds, 
-                    team_barons, team_voidgrubs, team_atakanhs, items, runes)
+                    team_barons, team_voidgrubs, team_atakanhs, items, runes,
+                    # Pour l'archive des parties (match_archive.py)
+                    queueId, gameEnd, gameDuration)
     
-    print(f"Player {puuid} not found in game {gameId}.")
-    return (None, ) * 30
+    logger.warning("Player %s not found in game %s", puuid, gameId)
+    return (None, ) * 33
 
 
 
@@ -339,27 +491,17 @@ def fetchGameResult(gameId, puuid):
 #### PARTIE TFT ####
 # Fonction pour demander les informations de l'invocateur TFT
 async def requestSummonerTFT(name, tag):
-    account_url = f'https://europe.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{name}/{tag}?api_key={key_tft}'
-    account_response = requests.get(account_url)
-
-    if account_response.status_code == 404:
-        print('Compte n\'existe pas')
-        raise ValueError("Invocateur n'existe pas")
-    elif account_response.status_code != 200:
-        print('Erreur dans l\'obtention des données du compte en TFT')
-        raise ValueError("Erreur lors de l'obtention des données en TFT")
-
-    account_data = account_response.json()
+    account_data = fetchAccount(name, tag, 'tft')
     puuid = account_data['puuid']
 
-    summoner_tft_url = f'https://euw1.api.riotgames.com/tft/summoner/v1/summoners/by-puuid/{puuid}?api_key={key_tft}'
-    summoner_tft_response = requests.get(summoner_tft_url)
+    summoner_tft_url = f'{PLATFORM_URL}/tft/summoner/v1/summoners/by-puuid/{puuid}?api_key={key_tft}'
+    summoner_tft_response = riot_get(summoner_tft_url, 'tft-summoner-v1')
 
     if summoner_tft_response.status_code == 404:
-        print('Invocateur n\'existe pas')
+        logger.info("Invocateur TFT n'existe pas: %s", puuid)
         raise ValueError("Invocateur n'existe pas")
     elif summoner_tft_response.status_code != 200:
-        print('Erreur dans l\'obtention des données de l\'invocateur en TFT')
+        logger.warning("Erreur dans l'obtention des données de l'invocateur en TFT: %s", summoner_tft_response.status_code)
         raise ValueError("Erreur lors de l'obtention des données en TFT")
 
     summoner_tft_data = summoner_tft_response.json()
@@ -367,20 +509,35 @@ async def requestSummonerTFT(name, tag):
     summonerTFTTagline = account_data.get('tagLine')
     summonerTFTGamename = account_data.get('gameName')
     summonerTFTLevel = "Lvl." + str(summoner_tft_data['summonerLevel'])
-    profileIcon = f'https://cdn.communitydragon.org/14.10.1/profile-icon/{summoner_tft_data["profileIconId"]}'
+    profileIcon = profileIconUrl(summoner_tft_data["profileIconId"])
 
 
     return summonerTFTTagline, summonerTFTGamename, summonerTFTLevel, profileIcon, summonerTFTId, puuid
 
 # Récupérer les rangs des invocateurs
 def fetchRanksTFT(summonerTFTId):
-    rankstft_url = f'https://euw1.api.riotgames.com/tft/league/v1/entries/by-summoner/{summonerTFTId}?api_key={key_tft}'
-    rankstft_response = requests.get(rankstft_url)
+    rankstft_url = f'{PLATFORM_URL}/tft/league/v1/entries/by-summoner/{summonerTFTId}?api_key={key_tft}'
+    rankstft_response = riot_get(rankstft_url, 'tft-league-v1')
 
     if rankstft_response.status_code != 200:
         raise ValueError(f"Erreur lors de la récupération des rangs: {rankstft_response.status_code} - {rankstft_response.json().get('status', {}).get('message', '')}")
 
-    rankstft_data = rankstft_response.json()
+    return parseRanksTFT(rankstft_response.json())
+
+
+def fetchRanksTFTByPuuid(puuid):
+    """TFT ranks of a puuid for API_RIOT_TFT_KEY, no tft-summoner lookup needed"""
+    rankstft_url = f'{PLATFORM_URL}/tft/league/v1/by-puuid/{puuid}?api_key={key_tft}'
+    rankstft_response = riot_get(rankstft_url, 'tft-league-v1')
+
+    if rankstft_response.status_code != 200:
+        raise ValueError(f"Erreur lors de la récupération des rangs: {rankstft_response.status_code}")
+
+    return parseRanksTFT(rankstft_response.json())
+
+
+def parseRanksTFT(rankstft_data):
+    """tft-league-v1 entries -> {queueType: display string}"""
     rankstft = {}
     for entry in rankstft_data:
         queue_type_tft = entry['queueType']
@@ -398,57 +555,134 @@ def fetchRanksTFT(summonerTFTId):
     return rankstft
 
 
+TFT_GAME_MODES = {
+    1090: 'TFT Normal',
+    1100: 'TFT Classée',
+    1130: 'TFT Hyper Roll',
+    1160: 'TFT Double Up',
+}
+
+
+def fetchMatchTFT(gameId):
+    """tft-match-v1 payload of a finished game, None while it is in progress"""
+    match_url = f"{REGIONAL_URL}/tft/match/v1/matches/EUW1_{gameId}?api_key={key_tft}"
+    match_response = riot_get(match_url, 'tft-match-v1')
+    if match_response.status_code != 200:
+        # 404 tant que la partie n'est pas terminée
+        logger.debug("TFT match %s not available: %s", gameId, match_response.status_code)
+        return None
+
+    match_data = match_response.json()
+    if 'info' not in match_data:
+        logger.warning("Error fetching TFT game results: %s", match_data.get('status', {}).get('message', 'Unknown error'))
+        return None
+    return match_data
+
+
+def fetchGameResultTFT(gameId, puuids):
+    """Parsed result of a finished TFT game for the given players, None while it is in progress"""
+    match_data = fetchMatchTFT(gameId)
+    if match_data is None:
+        return None
+    return parseMatchTFT(match_data, puuids)
+
+
+def parseMatchTFT(match_data, puuids=None):
+    """Summarize a tft-match-v1 payload in one pass over the lobby.
+
+    Returns the game fields plus 'players': {puuid: player} for the requested
+    puuids (all 8 when None). Units are (character_id, stars, rarity, items)
+    and only active traits are kept, as (name, style, num_units), best first.
+    """
+    info = match_data['info']
+    wanted = set(puuids) if puuids is not None else None
+    players = {}
+    for participant in info['participants']:
+        puuid = participant['puuid']
+        if wanted is not None and puuid not in wanted:
+            continue
+        players[puuid] = {
+            'name': participant.get('riotIdGameName', ''),
+            'tag': participant.get('riotIdTagline', ''),
+            'placement': participant['placement'],
+            'level': participant.get('level', 0),
+            'last_round': participant.get('last_round', 0),
+            'gold_left': participant.get('gold_left', 0),
+            'players_eliminated': participant.get('players_eliminated', 0),
+            'damage': participant.get('total_damage_to_players', 0),
+            'time_eliminated': int(participant.get('time_eliminated', 0)),
+            'companion': participant.get('companion', {}).get('item_ID'),
+            'units': tuple(
+                (unit['character_id'], unit.get('tier', 1), unit.get('rarity', 0),
+                 tuple(unit.get('itemNames', ())))
+                for unit in participant.get('units', ())),
+            'traits': tuple(sorted(
+                ((trait['name'], trait['style'], trait['num_units'])
+                 for trait in participant.get('traits', ()) if trait.get('style', 0) > 0),
+                key=lambda trait: (-trait[1], -trait[2]))),
+        }
+
+    queue_id = info.get('queueId', info.get('queue_id'))
+    game_length = int(info.get('game_length', 0))
+    return {
+        'game_id': info.get('gameId'),
+        'queue_id': queue_id,
+        'game_mode': TFT_GAME_MODES.get(queue_id, f'TFT ({queue_id})'),
+        'set_number': info.get('tft_set_number'),
+        'duration': f"{game_length // 60}:{game_length % 60:02d}",
+        'players': players,
+    }
+
 
 # Fonction pour récupérer les informations de la partie de TFT en cours
 def fetchGameOngoingTFT(puuid):
     """
     Fetch ongoing TFT game information for a given player
     Args:
-        puuid (str): Player's PUUID
+        puuid (str): Player's PUUID for API_RIOT_TFT_KEY
     Returns:
-        tuple: (summoner_name, tactician_name, game_mode, game_id, tactician_icon) or None if not in game
+        tuple: (riot_id, tactician_name, game_mode, game_id, tactician_icon, participants) or None if not in game
+    Raises:
+        RiotUnavailable: when Riot did not answer (429, 5xx, network); a rate-limited player is not out of game
     """
-    try:
-        spectator_url = f'https://euw1.api.riotgames.com/tft/spectator/v1/active-games/by-puuid/{puuid}?api_key={key_tft}'
-        spectator_response = requests.get(spectator_url)
-        print(spectator_url)
-        
-        if spectator_response.status_code == 404:
-            print(f"No active TFT game found for PUUID: {puuid}")
-            return None
-        
-        if spectator_response.status_code != 200:
-            error_msg = spectator_response.json().get('status', {}).get('message', 'Unknown error')
-            print(f"Error fetching TFT game data: {spectator_response.status_code} - {error_msg}")
-            return None
+    spectator_url = f'{PLATFORM_URL}/lol/spectator/tft/v5/active-games/by-puuid/{puuid}?api_key={key_tft}'
+    spectator_response = riot_get_checked(spectator_url, 'spectator-tft-v5')
 
-        spectator_data = spectator_response.json()
-        
-        # Extract relevant data from the spectator response
-        try:
-            # Find the participant data for our puuid
-            participant = next((p for p in spectator_data.get('participants', []) 
-                             if p.get('puuid') == puuid), None)
-            
-            if not participant:
-                print(f"Player data not found in game for PUUID: {puuid}")
-                return None
-
-            return (
-                participant.get('name', 'Unknown'),  # summoner name
-                spectator_data.get('game_type', 'Unknown'),  # game type/mode
-                spectator_data.get('queue_id'),  # queue ID
-                str(spectator_data.get('game_id')),  # game ID
-                participant.get('companion', {}).get('skin_ID', 0)  # tactician/companion skin ID
-            )
-
-        except Exception as e:
-            print(f"Error processing TFT game data: {e}")
-            return None
+    if spectator_response.status_code == 404:
+        logger.debug("No active TFT game found for PUUID: %s", puuid)
+        return None
 
-    except requests.exceptions.RequestException as e:
-        print(f"Network error while fetching TFT game data: {e}")
+    if spectator_response.status_code != 200:
+        logger.warning("Error fetching TFT game data for puuid %s: %s", puuid, spectator_response.status_code)
+        raise RiotUnavailable(f"spectator-tft-v5: HTTP {spectator_response.status_code}")
+
+    spectator_data = spectator_response.json()
+
+    # Find the participant data for our puuid
+    participant = next((p for p in spectator_data.get('participants', [])
+                        if p.get('puuid') == puuid), None)
+
+    if not participant:
+        logger.warning("Player data not found in TFT game for PUUID: %s", puuid)
         return None
-    except Exception as e:
-        print(f"Unexpected error in fetchGameOngoingTFT: {e}")
-        return None
\ No newline at end of file
+
+    # Spectator payloads are camelCase, older ones were snake_case
+    queue_id = spectator_data.get('gameQueueConfigId', spectator_data.get('queue_id'))
+    game_id = spectator_data.get('gameId', spectator_data.get('game_id'))
+    game_mode = TFT_GAME_MODES.get(queue_id, f'TFT ({queue_id})')
+    companion = participant.get('companion', {})
+    tactician_name, tactician_icon = data_manager.get_tactician(
+        companion.get('item_ID', companion.get('itemId')))
+
+    participants = tuple(
+        (p.get('puuid'), p.get('riotId', p.get('name', 'Unknown')), None, None)
+        for p in spectator_data.get('participants', []))
+
+    return (
+        participant.get('riotId', participant.get('name', 'Unknown')),
+        tactician_name,
+        game_mode,
+        game_id,
+        tactician_icon,
+        participants
+    )
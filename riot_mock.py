@@ -0,0 +1,541 @@
+"""Local stand-in for the Riot API endpoints used by the bot.
+
+Synthetic players go through a deterministic cycle of games and idle time,
+grouped in lobbies so several tracked players share a game. Payloads are
+built from the shapes of exemplegamedata, tftgamedataexemple and ranksexemple.
+Latency, random 404s, random 429s and the application rate limit can be
+injected.
+
+    python riot_mock.py --players 500 --port 8089 --latency 0.05 --rate-limit-rate 0.01
+    RIOT_REGIONAL_URL=http://127.0.0.1:8089 RIOT_PLATFORM_URL=http://127.0.0.1:8089 python main.py
+"""
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import random
+import time
+from collections import Counter, deque
+from aiohttp import web
+from rate_limiter import parse_limits
+
+logger = logging.getLogger(__name__)
+
+GAME_ID_BASE = 7_000_000_000
+# Parties par lobby encodables dans un game id
+GAMES_PER_LOBBY = 10_000
+LOL_QUEUES = (420, 440, 450, 400, 1700)
+QUEUE_MODES = {420: 'CLASSIC', 440: 'CLASSIC', 400: 'CLASSIC', 450: 'ARAM', 1700: 'CHERRY'}
+TFT_QUEUE = 1100
+TIERS = ('IRON', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'EMERALD', 'DIAMOND')
+DIVISIONS = ('IV', 'III', 'II', 'I')
+
+
+def _hash(*parts):
+    return hashlib.blake2b('|'.join(map(str, parts)).encode(), digest_size=8).digest()
+
+
+def _fraction(*parts):
+    """Deterministic float in [0, 1) for the given parts"""
+    return int.from_bytes(_hash(*parts), 'big') / 2 ** 64
+
+
+def _token(*parts, length=78):
+    """Riot-looking opaque id (puuids are 78 chars, summoner ids ~47)"""
+    return hashlib.sha512('|'.join(map(str, parts)).encode()).hexdigest()[:length]
+
+
+def _load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class MockWorld:
+    """Deterministic synthetic players, games and ranks, driven by wall-clock time"""
+
+    def __init__(self, players=100, lobby_size=2, game_length=1500, idle_length=900,
+                 tft_share=0.2, seed=0, start=None):
+        self.lobby_size = max(1, min(lobby_size, 5))
+        self.game_length = game_length
+        self.idle_length = idle_length
+        self.cycle = game_length + idle_length
+        self.tft_share = tft_share
+        self.seed = seed
+        self.start = start if start is not None else time.time()
+
+        self.match_template = _load_json('exemplegamedata')
+        self.tft_match_template = _load_json('tftgamedataexemple')
+
+        self.players = []
+        for index in range(players):
+            self.players.append({
+                'index': index,
+                'gameName': f"Mock{index:05d}",
+                'tagLine': 'EUW',
+                'puuid': _token(seed, 'puuid', index),
+                'summonerId': _token(seed, 'summoner', index, length=47),
+                'lobby': index // self.lobby_size,
+            })
+        self.by_puuid = {p['puuid']: p for p in self.players}
+        self.by_summoner_id = {p['summonerId']: p for p in self.players}
+        self.by_riot_id = {(p['gameName'].lower(), p['tagLine'].lower()): p for p in self.players}
+
+    # Games
+    def lobby_members(self, lobby):
+        first = lobby * self.lobby_size
+        return self.players[first:first + self.lobby_size]
+
+    def is_tft_lobby(self, lobby):
+        return _fraction(self.seed, 'tft', lobby) < self.tft_share
+
+    def lobby_queue(self, lobby, k):
+        if self.is_tft_lobby(lobby):
+            return TFT_QUEUE
+        return LOL_QUEUES[int(_fraction(self.seed, 'queue', lobby, k) * len(LOL_QUEUES))]
+
+    def _offset(self, lobby):
+        return _fraction(self.seed, 'offset', lobby) * self.cycle
+
+    def current_game(self, lobby, now=None):
+        """(game index, in game?) of a lobby at `now`"""
+        elapsed = (now or time.time()) - self.start + self._offset(lobby)
+        k = int(elapsed // self.cycle) % GAMES_PER_LOBBY
+        return k, elapsed % self.cycle < self.game_length
+
+    def game_id(self, lobby, k):
+        return GAME_ID_BASE + lobby * GAMES_PER_LOBBY + k
+
+    def decode_game_id(self, game_id):
+        """(lobby, game index), or (None, None) for ids this world never produced"""
+        if not str(game_id).isdigit() or int(game_id) < GAME_ID_BASE:
+            return None, None
+        return divmod(int(game_id) - GAME_ID_BASE, GAMES_PER_LOBBY)
+
+    def game_ended(self, lobby, k, now=None):
+        current, in_game = self.current_game(lobby, now)
+        return k < current or (k == current and not in_game)
+
+    def games_played(self, lobby, now=None):
+        k, in_game = self.current_game(lobby, now)
+        return k if in_game else k + 1
+
+    def match_ids(self, player, start=0, count=20):
+        """Ids of the finished LoL games of a player, newest first, like match-v5 by-puuid"""
+        lobby = player['lobby']
+        if self.is_tft_lobby(lobby):
+            return []
+        newest = self.games_played(lobby) - 1 - start
+        return [f"EUW1_{self.game_id(lobby, k)}" for k in range(newest, max(newest - count, -1), -1)]
+
+    def reported_duration(self, template_duration):
+        """Durée annoncée dans les matchs: celle du modèle quand les parties sont accélérées"""
+        return self.game_length if self.game_length >= 300 else template_duration
+
+    # Payloads
+    def account(self, player):
+        return {'puuid': player['puuid'], 'gameName': player['gameName'], 'tagLine': player['tagLine']}
+
+    def summoner(self, player):
+        return {
+            'id': player['summonerId'],
+            'accountId': _token(self.seed, 'account', player['index'], length=56),
+            'puuid': player['puuid'],
+            'profileIconId': 5000 + player['index'] % 700,
+            'revisionDate': int(time.time() * 1000),
+            'summonerLevel': 30 + player['index'] % 700,
+        }
+
+    def _champion_ids(self):
+        return [p['championId'] for p in self.match_template['info']['participants']]
+
+    def masteries(self, player, count):
+        champions = self._champion_ids()
+        return [
+            {
+                'puuid': player['puuid'],
+                'championId': champions[(player['index'] + i) % len(champions)],
+                'championLevel': 20 - i,
+                'championPoints': 400_000 // (i + 1) + player['index'],
+            }
+            for i in range(min(count, len(champions)))
+        ]
+
+    def mastery_score(self, player):
+        return 200 + player['index'] % 800
+
+    def _league_entry(self, player, queue_type, now=None):
+        played = self.games_played(player['lobby'], now)
+        # Chaque partie rapporte ou coûte ~20 LP, de façon déterministe
+        delta = sum(20 if _fraction(self.seed, 'win', player['lobby'], k) < 0.5 else -18 for k in range(played))
+        base = int(_fraction(self.seed, 'rank', queue_type, player['index']) * len(TIERS) * 400)
+        total = max(0, min(base + delta, len(TIERS) * 400 - 1))
+        wins = sum(1 for k in range(played) if _fraction(self.seed, 'win', player['lobby'], k) < 0.5)
+        return {
+            'leagueId': _token(self.seed, 'league', queue_type, length=36),
+            'queueType': queue_type,
+            'tier': TIERS[total // 400],
+            'rank': DIVISIONS[total % 400 // 100],
+            'summonerId': player['summonerId'],
+            'leaguePoints': total % 100,
+            'wins': 50 + wins,
+            'losses': 50 + played - wins,
+            'veteran': False,
+            'inactive': False,
+            'freshBlood': False,
+            'hotStreak': False,
+        }
+
+    def league_entries(self, player):
+        return [self._league_entry(player, 'RANKED_SOLO_5x5'), self._league_entry(player, 'RANKED_FLEX_SR')]
+
+    def tft_league_entries(self, player):
+        entry = self._league_entry(player, 'RANKED_TFT')
+        entry.update({'ratedTier': 'NONE', 'ratedRating': 0})
+        return [entry]
+
+    def _filler(self, lobby, k, slot):
+        return {'puuid': _token(self.seed, 'filler', lobby, k, slot), 'riotId': f"Filler{slot}#EUW"}
+
+    def active_game(self, player, now=None):
+        lobby = player['lobby']
+        k, in_game = self.current_game(lobby, now)
+        if not in_game or self.is_tft_lobby(lobby):
+            return None
+        queue_id = self.lobby_queue(lobby, k)
+        champions = self._champion_ids()
+        participants = []
+        for slot in range(10):
+            members = self.lobby_members(lobby)
+            if slot < len(members):
+                member = members[slot]
+                entry = {'puuid': member['puuid'], 'riotId': f"{member['gameName']}#{member['tagLine']}"}
+            else:
+                entry = self._filler(lobby, k, slot)
+            entry.update({'teamId': 100 if slot < 5 else 200,
+                          'championId': champions[(slot + k) % len(champions)]})
+            participants.append(entry)
+        now = now or time.time()
+        started = now - (now - self.start + self._offset(lobby)) % self.cycle
+        return {
+            'gameId': self.game_id(lobby, k),
+            'mapId': 11,
+            'gameMode': QUEUE_MODES[queue_id],
+            'gameType': 'MATCHED',
+            'gameQueueConfigId': queue_id,
+            'gameStartTime': int(started * 1000),
+            'gameLength': int(now - started),
+            'platformId': 'EUW1',
+            'participants': participants,
+        }
+
+    def active_tft_game(self, player, now=None):
+        lobby = player['lobby']
+        k, in_game = self.current_game(lobby, now)
+        if not in_game or not self.is_tft_lobby(lobby):
+            return None
+        members = self.lobby_members(lobby)
+        participants = []
+        for slot in range(8):
+            if slot < len(members):
+                member = members[slot]
+                entry = {'puuid': member['puuid'], 'riotId': f"{member['gameName']}#{member['tagLine']}"}
+            else:
+                entry = self._filler(lobby, k, slot)
+            entry['companion'] = {'skin_ID': (lobby + slot) % 40, 'species': 'PetMiner', 'item_ID': 4009}
+            participants.append(entry)
+        return {
+            'gameId': self.game_id(lobby, k),
+            'mapId': 22,
+            'gameMode': 'TFT',
+            'gameType': 'MATCHED',
+            'gameQueueConfigId': TFT_QUEUE,
+            'platformId': 'EUW1',
+            'participants': participants,
+        }
+
+    def match(self, game_id, now=None):
+        lobby, k = self.decode_game_id(game_id)
+        members = self.lobby_members(lobby) if lobby is not None else []
+        if not members or self.is_tft_lobby(lobby) or not self.game_ended(lobby, k, now):
+            return None
+
+        match = copy.deepcopy(self.match_template)
+        info = match['info']
+        queue_id = self.lobby_queue(lobby, k)
+        blue_wins = _fraction(self.seed, 'win', lobby, k) < 0.5
+        game_id = int(game_id)
+        info.update({
+            'gameId': game_id,
+            'queueId': queue_id,
+            'gameMode': QUEUE_MODES[queue_id],
+            'gameDuration': self.reported_duration(info['gameDuration']),
+        })
+        match['metadata']['matchId'] = f"EUW1_{game_id}"
+        for slot, participant in enumerate(info['participants']):
+            if slot < len(members):
+                member = members[slot]
+                participant.update({
+                    'puuid': member['puuid'],
+                    'summonerId': member['summonerId'],
+                    'riotIdGameName': member['gameName'],
+                    'riotIdTagline': member['tagLine'],
+                })
+            else:
+                participant['puuid'] = self._filler(lobby, k, slot)['puuid']
+            participant['win'] = (participant['teamId'] == 100) == blue_wins
+            if queue_id == 1700:
+                participant['playerSubteamId'] = slot // 2 + 1
+                participant['placement'] = slot // 2 + 1
+        for team in info['teams']:
+            team['win'] = (team['teamId'] == 100) == blue_wins
+        match['metadata']['participants'] = [p['puuid'] for p in info['participants']]
+        return match
+
+    def tft_match(self, game_id, now=None):
+        lobby, k = self.decode_game_id(game_id)
+        members = self.lobby_members(lobby) if lobby is not None else []
+        if not members or not self.is_tft_lobby(lobby) or not self.game_ended(lobby, k, now):
+            return None
+
+        match = copy.deepcopy(self.tft_match_template)
+        info = match['info']
+        game_id = int(game_id)
+        info.update({'gameId': game_id, 'game_length': float(self.reported_duration(info['game_length']))})
+        match['metadata']['match_id'] = f"EUW1_{game_id}"
+        placements = list(range(1, len(info['participants']) + 1))
+        random.Random(_fraction(self.seed, 'placements', lobby, k)).shuffle(placements)
+        for slot, participant in enumerate(info['participants']):
+            if slot < len(members):
+                member = members[slot]
+                participant.update({
+                    'puuid': member['puuid'],
+                    'riotIdGameName': member['gameName'],
+                    'riotIdTagline': member['tagLine'],
+                })
+            else:
+                participant['puuid'] = self._filler(lobby, k, slot)['puuid']
+            participant['placement'] = placements[slot]
+        match['metadata']['participants'] = [p['puuid'] for p in info['participants']]
+        return match
+
+
+class FaultInjector:
+    """Latency, random 404/429 and an optional enforced rate limit per API key"""
+
+    def __init__(self, latency=0.0, jitter=0.0, not_found_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1, limits=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.not_found_rate = not_found_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.limits = parse_limits(limits) if isinstance(limits, str) else (limits or ())
+        self.rng = random.Random(seed)
+        self._windows = {}  # api key -> [deque of timestamps per limit]
+
+    def _over_limit(self, api_key):
+        if not self.limits:
+            return None
+        windows = self._windows.setdefault(api_key, [deque() for _ in self.limits])
+        now = time.monotonic()
+        for (count, period), stamps in zip(self.limits, windows):
+            while stamps and now - stamps[0] >= period:
+                stamps.popleft()
+            if len(stamps) >= count:
+                return max(1, int(period - (now - stamps[0])) + 1)
+        for stamps in windows:
+            stamps.append(now)
+        return None
+
+    async def apply(self, request):
+        """None to serve the request normally, or the error response to send instead"""
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+
+        retry_after = self._over_limit(request.query.get('api_key', ''))
+        if retry_after is None and self.rng.random() < self.rate_limit_rate:
+            retry_after = self.retry_after
+        if retry_after is not None:
+            return error_response(429, 'Rate limit exceeded', headers={'Retry-After': str(retry_after)})
+        if self.rng.random() < self.not_found_rate:
+            return error_response(404, 'Data not found')
+        return None
+
+
+def error_response(status, message, headers=None):
+    return web.json_response({'status': {'message': message, 'status_code': status}},
+                             status=status, headers=headers)
+
+
+def create_app(world, faults=None):
+    """aiohttp app serving the mock; regional and platform routes live on the same host"""
+    faults = faults or FaultInjector()
+    stats = Counter()
+    routes = web.RouteTableDef()
+
+    def endpoint(name):
+        def decorator(handler):
+            async def wrapper(request):
+                response = await faults.apply(request)
+                if response is None:
+                    response = await handler(request)
+                stats[(name, response.status)] += 1
+                return response
+            return wrapper
+        return decorator
+
+    def player_or_404(player, payload):
+        if player is None:
+            return error_response(404, 'Data not found')
+        return web.json_response(payload(player))
+
+    @routes.get('/riot/account/v1/accounts/by-riot-id/{name}/{tag}')
+    @endpoint('account-v1')
+    async def account_by_riot_id(request):
+        player = world.by_riot_id.get((request.match_info['name'].lower(), request.match_info['tag'].lower()))
+        return player_or_404(player, world.account)
+
+    @routes.get('/riot/account/v1/accounts/by-puuid/{puuid}')
+    @endpoint('account-v1')
+    async def account_by_puuid(request):
+        return player_or_404(world.by_puuid.get(request.match_info['puuid']), world.account)
+
+    @routes.get('/lol/summoner/v4/summoners/by-puuid/{puuid}')
+    @endpoint('summoner-v4')
+    async def summoner(request):
+        return player_or_404(world.by_puuid.get(request.match_info['puuid']), world.summoner)
+
+    @routes.get('/tft/summoner/v1/summoners/by-puuid/{puuid}')
+    @endpoint('tft-summoner-v1')
+    async def tft_summoner(request):
+        return player_or_404(world.by_puuid.get(request.match_info['puuid']), world.summoner)
+
+    @routes.get('/lol/champion-mastery/v4/scores/by-puuid/{puuid}')
+    @endpoint('champion-mastery-v4')
+    async def mastery_score(request):
+        return player_or_404(world.by_puuid.get(request.match_info['puuid']), world.mastery_score)
+
+    @routes.get('/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/top')
+    @endpoint('champion-mastery-v4')
+    async def top_masteries(request):
+        count = int(request.query.get('count', 3))
+        return player_or_404(world.by_puuid.get(request.match_info['puuid']),
+                             lambda player: world.masteries(player, count))
+
+    @routes.get('/lol/league/v4/entries/by-summoner/{summoner_id}')
+    @endpoint('league-v4')
+    async def league_entries(request):
+        player = world.by_summoner_id.get(request.match_info['summoner_id'])
+        return web.json_response(world.league_entries(player) if player else [])
+
+    @routes.get('/lol/league/v4/entries/by-puuid/{puuid}')
+    @endpoint('league-v4')
+    async def league_entries_by_puuid(request):
+        # Les joueurs de remplissage des lobbies ne sont pas classés
+        player = world.by_puuid.get(request.match_info['puuid'])
+        return web.json_response(world.league_entries(player) if player else [])
+
+    @routes.get('/tft/league/v1/entries/by-summoner/{summoner_id}')
+    @endpoint('tft-league-v1')
+    async def tft_league_entries(request):
+        player = world.by_summoner_id.get(request.match_info['summoner_id'])
+        return web.json_response(world.tft_league_entries(player) if player else [])
+
+    @routes.get('/tft/league/v1/by-puuid/{puuid}')
+    @endpoint('tft-league-v1')
+    async def tft_league_entries_by_puuid(request):
+        player = world.by_puuid.get(request.match_info['puuid'])
+        return web.json_response(world.tft_league_entries(player) if player else [])
+
+    @routes.get('/lol/spectator/v5/active-games/by-summoner/{puuid}')
+    @endpoint('spectator-v5')
+    async def active_game(request):
+        player = world.by_puuid.get(request.match_info['puuid'])
+        game = world.active_game(player) if player else None
+        return web.json_response(game) if game else error_response(404, 'Data not found')
+
+    @routes.get('/lol/spectator/tft/v5/active-games/by-puuid/{puuid}')
+    @endpoint('spectator-tft-v5')
+    async def active_tft_game(request):
+        player = world.by_puuid.get(request.match_info['puuid'])
+        game = world.active_tft_game(player) if player else None
+        return web.json_response(game) if game else error_response(404, 'Data not found')
+
+    @routes.get('/lol/match/v5/matches/by-puuid/{puuid}/ids')
+    @endpoint('match-v5-ids')
+    async def match_ids(request):
+        player = world.by_puuid.get(request.match_info['puuid'])
+        start, count = int(request.query.get('start', 0)), int(request.query.get('count', 20))
+        return web.json_response(world.match_ids(player, start, count) if player else [])
+
+    @routes.get('/lol/match/v5/matches/{match_id}')
+    @endpoint('match-v5')
+    async def match(request):
+        match = world.match(request.match_info['match_id'].split('_')[-1])
+        return web.json_response(match) if match else error_response(404, 'Data not found')
+
+    @routes.get('/tft/match/v1/matches/{match_id}')
+    @endpoint('tft-match-v1')
+    async def tft_match(request):
+        match = world.tft_match(request.match_info['match_id'].split('_')[-1])
+        return web.json_response(match) if match else error_response(404, 'Data not found')
+
+    # Introspection, for benchmarks
+    @routes.get('/_mock/players')
+    async def players(request):
+        limit = int(request.query.get('limit', len(world.players)))
+        return web.json_response([world.account(p) | {'summonerId': p['summonerId']} for p in world.players[:limit]])
+
+    @routes.get('/_mock/stats')
+    async def get_stats(request):
+        return web.json_response({f"{name} {status}": count for (name, status), count in sorted(stats.items())})
+
+    @routes.post('/_mock/reset')
+    async def reset_stats(request):
+        stats.clear()
+        return web.json_response({})
+
+    app = web.Application()
+    app.add_routes(routes)
+    app['stats'] = stats
+    return app
+
+
+async def start_mock_server(world, faults=None, host='127.0.0.1', port=8089):
+    runner = web.AppRunner(create_app(world, faults))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Riot mock listening on http://%s:%s (%d players)", host, port, len(world.players))
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local imitant l'API Riot")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--players', type=int, default=100)
+    parser.add_argument('--lobby-size', type=int, default=2, help='joueurs suivis par partie (1-5)')
+    parser.add_argument('--game-length', type=int, default=1500, help='durée des parties en secondes')
+    parser.add_argument('--idle-length', type=int, default=900, help='pause entre deux parties en secondes')
+    parser.add_argument('--tft-share', type=float, default=0.2)
+    parser.add_argument('--latency', type=float, default=0.0, help='latence moyenne en secondes')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--not-found-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='part de 429 aléatoires')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--limits', default=None, help='rate limit appliqué par clé, ex. "20:1,100:120"')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    world = MockWorld(args.players, args.lobby_size, args.game_length, args.idle_length,
+                      args.tft_share, args.seed)
+    faults = FaultInjector(args.latency, args.jitter, args.not_found_rate, args.rate_limit_rate,
+                           args.retry_after, args.limits, args.seed)
+    web.run_app(create_app(world, faults), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
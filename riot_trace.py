@@ -0,0 +1,157 @@
+"""Record Riot API traffic to a trace file and serve it back.
+
+Recording is enabled with RIOT_RECORD=<path> (gzip-compressed when the path ends in
+.gz): every response seen by riot_api.riot_get is appended as one JSON line, with the
+API key removed from the URL. The first line of a recording holds the tracked summoners.
+
+``create_replay_app`` serves a trace as a Riot API stand-in whose clock runs
+``speed`` times faster than the recording: a URL answers with the last response
+recorded for it at that point of the trace, so games start, end and get their
+match data in the same order as in production.
+"""
+import asyncio
+import bisect
+import gzip
+import json
+import logging
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl, unquote, urlencode
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+def scrub_url(url):
+    """Path and query of a Riot URL, without host and api_key.
+
+    The path is decoded: riot_get records raw f-string URLs ('Jean Mi') while the
+    replay server sees them percent-encoded ('Jean%20Mi'), both must give one key.
+    """
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query) if name != 'api_key']
+    return unquote(parts.path) + ('?' + urlencode(sorted(query)) if query else '')
+
+
+def process_trace_path(path, pid):
+    """trace.jsonl.gz -> trace-<pid>.jsonl.gz, so each poller worker records its own file"""
+    directory, _, name = path.rpartition('/')
+    stem, dot, extension = name.partition('.')
+    return f"{directory}{'/' if directory else ''}{stem}-{pid}{dot}{extension}"
+
+
+def open_trace(path, mode='r'):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class TraceRecorder:
+    """Append Riot responses to a JSONL trace; safe to call from worker threads"""
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self._file = open_trace(path, 'a')
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._pending = 0
+        self._write({'type': 'meta', 'recorded_at': time.time(), **(meta or {})})
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._pending += 1
+            if self._pending >= 100:
+                self._file.flush()
+                self._pending = 0
+
+    def record(self, endpoint, url, response, elapsed):
+        self._write({
+            't': round(time.monotonic() - self._started, 3),
+            'endpoint': endpoint,
+            'url': scrub_url(url),
+            'status': response.status_code,
+            'elapsed': round(elapsed, 4),
+            'retry_after': response.headers.get('Retry-After'),
+            'body': response.text,
+        })
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load_trace(paths):
+    """(meta, {url: ([t, ...], [record, ...])}, duration) over one or several trace files.
+
+    Files recorded by different processes are aligned on their start time.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    sessions = []
+    for path in paths:
+        with open_trace(path) as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('type') == 'meta':
+                    # Each recording session starts with its own meta line
+                    sessions.append((record, []))
+                elif sessions:
+                    sessions[-1][1].append(record)
+
+    meta, by_url, duration = {}, {}, 0.0
+    if not sessions:
+        return meta, by_url, duration
+    origin = min(session_meta['recorded_at'] for session_meta, _ in sessions)
+    for session_meta, records in sessions:
+        if not meta and session_meta.get('summoners_data'):
+            meta = session_meta
+        offset = session_meta['recorded_at'] - origin
+        for record in records:
+            record['t'] = round(record['t'] + offset, 3)
+            # Re-scrubbed: traces recorded before the path was decoded keep replaying
+            by_url.setdefault(scrub_url(record['url']), []).append(record)
+            duration = max(duration, record['t'])
+
+    indexed = {}
+    for url, records in by_url.items():
+        records.sort(key=lambda record: record['t'])
+        indexed[url] = ([record['t'] for record in records], records)
+    return meta, indexed, duration
+
+
+def create_replay_app(paths, speed=10.0, latency_scale=1.0):
+    """aiohttp app answering every URL of the trace according to the accelerated clock"""
+    meta, by_url, duration = load_trace(paths)
+    started = time.monotonic()
+    stats = {'hits': 0, 'misses': 0}
+
+    async def handle(request):
+        key = scrub_url(str(request.rel_url))
+        entry = by_url.get(key)
+        if entry is None:
+            stats['misses'] += 1
+            return web.json_response({'status': {'message': 'Not in trace', 'status_code': 404}}, status=404)
+
+        times, records = entry
+        now = (time.monotonic() - started) * speed
+        # Last response recorded at this point of the trace (or the first one, before it)
+        record = records[max(0, bisect.bisect_right(times, now) - 1)]
+        stats['hits'] += 1
+        if latency_scale:
+            await asyncio.sleep(record.get('elapsed', 0) * latency_scale)
+        headers = {'Retry-After': record['retry_after']} if record.get('retry_after') else None
+        return web.Response(text=record['body'], status=record['status'],
+                            content_type='application/json', headers=headers)
+
+    async def get_stats(request):
+        return web.json_response({**stats, 'trace_seconds': duration,
+                                  'position': (time.monotonic() - started) * speed})
+
+    app = web.Application()
+    app.router.add_get('/_replay/stats', get_stats)
+    app.router.add_get('/{tail:.*}', handle)
+    app['meta'] = meta
+    app['duration'] = duration
+    return app
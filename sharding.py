@@ -0,0 +1,79 @@
+import os
+from poller import group_by_puuid
+
+
+def parse_shard_ids(spec):
+    """Parse SHARD_IDS such as "0,1,2" (None when unset: run every shard)"""
+    if not spec:
+        return None
+    return [int(part) for part in spec.split(',') if part.strip()]
+
+
+def client_options():
+    """AutoShardedClient kwargs from SHARD_COUNT / SHARD_IDS (both optional)"""
+    options = {}
+    shard_count = os.getenv('SHARD_COUNT')
+    shard_ids = parse_shard_ids(os.getenv('SHARD_IDS'))
+    if shard_count:
+        options['shard_count'] = int(shard_count)
+    if shard_ids is not None:
+        if 'shard_count' not in options:
+            raise ValueError("SHARD_IDS nécessite SHARD_COUNT")
+        options['shard_ids'] = shard_ids
+    return options
+
+
+def shard_for_guild(guild_id, shard_count):
+    """Discord's shard formula: (guild_id >> 22) % shard_count"""
+    return (int(guild_id) >> 22) % shard_count
+
+
+class ShardScope:
+    """Which guilds and which polls belong to the shards run by this process.
+
+    Guild-scoped work (digests, guild setup) only covers local guilds. Each
+    tracked puuid is polled by exactly one process: the one running the
+    lowest shard among the guilds tracking it, so players followed in guilds
+    on different shards are never polled twice.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @property
+    def shard_count(self):
+        return self.client.shard_count or 1
+
+    @property
+    def local_shards(self):
+        shard_ids = getattr(self.client, 'shard_ids', None)
+        return set(shard_ids) if shard_ids is not None else set(range(self.shard_count))
+
+    def is_local(self, guild_id):
+        return shard_for_guild(guild_id, self.shard_count) in self.local_shards
+
+    def poll_owner(self, trackers):
+        return min(shard_for_guild(guild_id, self.shard_count) for guild_id, _ in trackers)
+
+    def local_summoners(self, summoners_data):
+        """Summoners of the guilds handled by this process"""
+        return {guild_id: summoners for guild_id, summoners in summoners_data.items() if self.is_local(guild_id)}
+
+    def owned_summoners(self, summoners_data):
+        """Summoners this process must poll, with every guild tracking them (local or not)"""
+        local_shards = self.local_shards
+        owned = {
+            puuid for puuid, trackers in group_by_puuid(summoners_data).items()
+            if self.poll_owner(trackers) in local_shards
+        }
+        return {
+            guild_id: [summoner for summoner in summoners if summoner.get('puuid') in owned]
+            for guild_id, summoners in summoners_data.items()
+        }
+
+    def summary(self):
+        guilds_per_shard = {}
+        for guild in self.client.guilds:
+            shard_id = guild.shard_id
+            guilds_per_shard[shard_id] = guilds_per_shard.get(shard_id, 0) + 1
+        return f"shards {sorted(self.local_shards)}/{self.shard_count}, guilds per shard {guilds_per_shard}"
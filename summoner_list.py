@@ -0,0 +1,75 @@
+"""Pages of /listsummoners.
+
+The ordered rows of a guild (ID, Riot ID, games) are built once per version of
+its summoner list and reused until the list changes. The live columns, rank and
+ongoing game, are added when a page is rendered, from state the bot already
+holds: the poller's live state, the league cache and the daily rank snapshots.
+"""
+import discord
+from data_manager import DataManager
+from live_state import live_state
+from lobby import league_cache
+from notifications import short_rank
+from poller import PUUID_FIELDS, plays
+
+data_manager = DataManager()
+
+PER_PAGE = 15
+GAME_NAMES = {'lol': 'LoL', 'tft': 'TFT'}
+
+
+class SummonerListCache:
+    """guild_id -> (list version, [(summoner, static row text)]) ordered by ID"""
+
+    def __init__(self):
+        self._rows = {}
+
+    def rows(self, guild_id):
+        guild_id = str(guild_id)
+        version = data_manager.get_summoners_version(guild_id)
+        cached = self._rows.get(guild_id)
+        if cached is None or cached[0] != version:
+            summoners = sorted(data_manager.get_summoners_for_guild(guild_id), key=lambda s: s['id'])
+            rows = [(summoner, f"**{summoner['id']}** · {summoner['name']}#{summoner['tag']} · "
+                               + "+".join(GAME_NAMES[game] for game in summoner.get('games', ['lol'])))
+                    for summoner in summoners]
+            cached = self._rows[guild_id] = (version, rows)
+        return cached[1]
+
+    def page_count(self, guild_id):
+        return max(1, -(-len(self.rows(guild_id)) // PER_PAGE))
+
+
+def known_ranks(summoner):
+    """Latest ranks the bot already has for a summoner, without any API call"""
+    ranks = league_cache.peek(summoner.get('puuid'))
+    if ranks is None and summoner.get('summonerId'):
+        ranks = data_manager.get_latest_daily_ranks(summoner['summonerId'])
+    return ranks
+
+
+def live_columns(summoner):
+    columns = []
+    ranks = known_ranks(summoner)
+    if ranks is not None:
+        columns.append(short_rank(ranks, 'RANKED_SOLO_5x5'))
+    for game in ('lol', 'tft'):
+        if not plays(summoner, game):
+            continue
+        entry = live_state.get(summoner.get(PUUID_FIELDS[game]))
+        if entry and entry['game_id']:
+            columns.append(f"🎮 {entry['champion_name']} ({entry['game_mode']})")
+            break
+    return columns
+
+
+def render_page(guild_id, index):
+    rows = list_cache.rows(guild_id)[index * PER_PAGE:(index + 1) * PER_PAGE]
+    lines = [" · ".join([text] + live_columns(summoner)) for summoner, text in rows]
+    return discord.Embed(
+        title="Invocateurs suivis",
+        description="\n".join(lines),
+        color=discord.Colour.blue())
+
+
+list_cache = SummonerListCache()
@@ -0,0 +1,60 @@
+from autocomplete import MAX_RECENT, GuildIndex, PrefixIndex
+
+
+def test_prefix_index_search_is_sorted_and_case_insensitive():
+    index = PrefixIndex()
+    for key in ('Zed#EUW', 'alpha#EUW', 'Alpine#FR', 'beta#EUW'):
+        index.add(key, key)
+    assert index.search('AL') == ['alpha#EUW', 'Alpine#FR']
+    assert index.search('') == ['alpha#EUW', 'Alpine#FR', 'beta#EUW', 'Zed#EUW']
+    assert index.search('x') == []
+
+
+def test_prefix_index_search_limit():
+    index = PrefixIndex()
+    for i in range(10):
+        index.add(f"player{i}", i)
+    assert index.search('player', limit=3) == [0, 1, 2]
+
+
+def test_prefix_index_add_existing_key_replaces_value():
+    index = PrefixIndex()
+    index.add('Faker#KR1', 1)
+    index.add('faker#kr1', 2)
+    assert len(index) == 1
+    assert index.search('faker') == [2]
+
+
+def test_prefix_index_remove():
+    index = PrefixIndex()
+    index.add('a#1', 'a')
+    index.add('b#1', 'b')
+    index.remove('A#1')
+    index.remove('missing')
+    assert len(index) == 1
+    assert index.search('') == ['b']
+
+
+def test_guild_index_add_remove():
+    summoner = {'id': 12, 'name': 'Jean Mi', 'tag': 'Élo'}
+    index = GuildIndex([summoner])
+    assert index.riot_ids.search('jean') == [('Jean Mi', 'Élo', 12)]
+    assert index.ids.search('1') == [(12, 'Jean Mi', 'Élo')]
+    index.remove(summoner)
+    assert len(index.riot_ids) == 0 and len(index.ids) == 0
+
+
+def test_guild_index_recent_lookups_are_bounded():
+    index = GuildIndex()
+    for i in range(MAX_RECENT + 5):
+        index.remember(f"p{i}", 'EUW')
+    assert len(index.recent) == MAX_RECENT
+    assert index.recent.search('p0#') == []
+    assert index.recent.search(f"p{MAX_RECENT + 4}#") == [(f"p{MAX_RECENT + 4}", 'EUW')]
+
+
+def test_riot_id_matches_lists_tracked_before_recent_without_duplicates():
+    index = GuildIndex([{'id': 1, 'name': 'Bob', 'tag': 'EUW'}])
+    index.remember('Bobby', 'EUW')
+    index.remember('Bob', 'EUW')
+    assert index.riot_id_matches('bo') == [('Bob', 'EUW'), ('Bobby', 'EUW')]
@@ -0,0 +1,58 @@
+import asyncio
+
+import discord
+
+import delivery
+from delivery import MAX_EMBEDS_PER_MESSAGE, ChannelState, DeliveryManager, build_message
+
+
+def end_item(game_id=1, image=None):
+    item = {'kind': 'end', 'game_id': game_id, 'guild_id': '1', 'embed': discord.Embed(title=str(game_id))}
+    if image:
+        item.update(image=image, filename=f"{game_id}.png")
+    return item
+
+
+def start_item(name):
+    player = {'name': name, 'tag': 'EUW', 'champion_name': 'Ahri', 'champion_icon': 'https://example.invalid/ahri.png'}
+    return {'kind': 'start', 'game_id': 1, 'guild_id': '1', 'game_mode': 'Solo/Duo', 'player': player}
+
+
+def test_build_message_single_end_embed():
+    item = end_item()
+    assert build_message([item]) == {'embed': item['embed']}
+
+
+def test_build_message_merges_end_embeds_and_files():
+    items = [end_item(1, image=b'png'), end_item(2), end_item(3, image=b'png')]
+    kwargs = build_message(items)
+    assert kwargs['embeds'] == [item['embed'] for item in items]
+    assert [file.filename for file in kwargs['files']] == ['1.png', '3.png']
+
+
+def test_build_message_merges_game_starts_in_one_embed():
+    embed = build_message([start_item('Alice'), start_item('Bob')])['embed']
+    assert embed.description.startswith('2 joueurs suivis')
+    assert 'Alice' in embed.description and 'Bob' in embed.description
+
+
+def test_batches_are_split_into_messages_of_max_embeds(monkeypatch):
+    monkeypatch.setattr(delivery.data_manager, 'get_notification_channel', lambda guild_id: 10)
+
+    async def run():
+        manager = DeliveryManager(client=None)
+        manager.batch_window = 0
+        state = ChannelState(10, manager.channel_limits)
+        manager._channel = lambda channel_id: state
+        for game_id in range(MAX_EMBEDS_PER_MESSAGE * 2 + 3):
+            await manager.submit({**end_item(game_id), 'game_id': 1})
+        await asyncio.gather(*manager._flush_tasks)
+        messages = []
+        while not state.queue.empty():
+            messages.append(state.queue.get_nowait())
+        return manager, messages
+
+    manager, messages = asyncio.run(run())
+    assert [len(items) for items in messages] == [MAX_EMBEDS_PER_MESSAGE, MAX_EMBEDS_PER_MESSAGE, 3]
+    assert manager.metrics['notifications'] == MAX_EMBEDS_PER_MESSAGE * 2 + 3
+    assert not manager.batches
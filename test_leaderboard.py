@@ -0,0 +1,81 @@
+import leaderboard
+from leaderboard import Board, Leaderboards, rank_score
+
+
+def test_rank_score_orders_tiers_divisions_and_lp():
+    iron = rank_score({'tier': 'IRON', 'rank': 'IV', 'lp': 0})
+    gold_low = rank_score({'tier': 'GOLD', 'rank': 'IV', 'lp': 99})
+    gold_high = rank_score({'tier': 'GOLD', 'rank': 'I', 'lp': 0})
+    diamond = rank_score({'tier': 'DIAMOND', 'rank': 'I', 'lp': 99})
+    master = rank_score({'tier': 'MASTER', 'rank': 'I', 'lp': 0})
+    assert iron == 0
+    assert iron < gold_low < gold_high < diamond < master
+
+
+def test_rank_score_apex_tiers_share_one_ladder():
+    assert rank_score({'tier': 'CHALLENGER', 'lp': 500}) == rank_score({'tier': 'MASTER', 'lp': 500})
+    assert rank_score({'tier': 'GRANDMASTER', 'lp': 300}) < rank_score({'tier': 'MASTER', 'lp': 301})
+
+
+def test_rank_score_unknown_tier():
+    assert rank_score({'tier': 'UNRANKED'}) is None
+    assert rank_score({}) is None
+
+
+def test_board_update_and_position():
+    board = Board()
+    board.update('a', 100)
+    board.update('b', 300)
+    board.update('c', 200)
+    assert board.puuids() == ['b', 'c', 'a']
+    assert [board.position(p) for p in 'bca'] == [1, 2, 3]
+    assert board.position('missing') is None
+
+    board.update('a', 400)
+    assert board.puuids() == ['a', 'b', 'c']
+    assert len(board) == 3
+
+
+def test_board_none_score_removes_player():
+    board = Board()
+    board.update('a', 100)
+    board.update('b', 200)
+    board.update('a', None)
+    board.remove('missing')
+    assert 'a' not in board
+    assert board.puuids() == ['b']
+    assert board.position('b') == 1
+
+
+def test_board_equal_scores_keep_a_stable_order():
+    board = Board()
+    board.update('b', 100)
+    board.update('a', 100)
+    assert board.puuids() == ['a', 'b']
+    board.update('b', 100)
+    assert board.puuids() == ['a', 'b']
+
+
+def test_leaderboards_follow_snapshots_and_members(monkeypatch):
+    summoners_data = {'1': [{'puuid': 'p1'}, {'puuid': 'p2'}]}
+    versions = {'1': 1}
+    monkeypatch.setattr(leaderboard.data_manager, 'summoners_data', summoners_data)
+    monkeypatch.setattr(leaderboard.data_manager, 'summoners_version', versions)
+    boards = Leaderboards()
+    boards.record('p1', {'RANKED_SOLO_5x5': {'tier': 'GOLD', 'rank': 'II', 'lp': 10}}, ['1'])
+    boards.record('p2', {'RANKED_SOLO_5x5': {'tier': 'SILVER', 'rank': 'I', 'lp': 90}}, ['1'])
+    assert boards.board(1, 'RANKED_SOLO_5x5').puuids() == ['p1', 'p2']
+    assert len(boards.board(1, 'RANKED_FLEX_SR')) == 0
+
+    # Boards already shown are updated in place
+    boards.record('p2', {'RANKED_SOLO_5x5': {'tier': 'PLATINUM', 'rank': 'IV', 'lp': 0}}, ['1'])
+    assert boards.board(1, 'RANKED_SOLO_5x5').puuids() == ['p2', 'p1']
+
+    # Empty snapshots (failed fetch) keep the last known ranks
+    boards.record('p2', {}, ['1'])
+    assert boards.board(1, 'RANKED_SOLO_5x5').position('p2') == 1
+
+    # Removed members leave the board on the next list version
+    summoners_data['1'] = [{'puuid': 'p1'}]
+    versions['1'] = 2
+    assert boards.board(1, 'RANKED_SOLO_5x5').puuids() == ['p1']
@@ -0,0 +1,86 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from match_archive import MatchArchive, PlayerTable, player_stats, row_from_result  # noqa: E402
+
+
+def game_result(result='Victoire', kda='10/2/5', champion='Ahri', queue_id=420, game_end=1000, duration=1800,
+                damage=30000, cs=200, pentas=0, first_blood=True):
+    """parseGameResult tuple with the fields the archive reads"""
+    values = [0] * 33
+    values[0], values[1], values[2], values[3] = result, kda, cs, champion
+    values[5], values[7] = 30, damage
+    values[9], values[10], values[11], values[12] = pentas, 0, 1, 2
+    values[13], values[17], values[21] = first_blood, 0.5, 0.25
+    values[23], values[25], values[26] = 2, 1, 3
+    values[30], values[31], values[32] = queue_id, game_end, duration
+    return tuple(values)
+
+
+def test_row_from_result():
+    row = row_from_result('42', game_result())
+    assert row['game_id'] == 42
+    assert (row['kills'], row['deaths'], row['assists']) == (10, 2, 5)
+    assert row['win'] is True and row['first_blood'] is True
+    assert (row['double_kills'], row['triple_kills'], row['penta_kills']) == (2, 1, 0)
+    assert (row['queue_id'], row['game_end'], row['duration']) == (420, 1000, 1800)
+    assert row['champion'] == 'Ahri'
+
+
+def test_row_from_result_rejects_unusable_results():
+    assert row_from_result(1, None) is None
+    assert row_from_result(1, (None,) * 33) is None
+    assert row_from_result(1, game_result()[:20]) is None
+
+
+def test_player_table_extend_sorts_and_skips_known_games():
+    table = PlayerTable()
+    added = table.extend([
+        row_from_result(2, game_result(game_end=200, champion='Zed')),
+        row_from_result(1, game_result(game_end=100)),
+        row_from_result(1, game_result(game_end=100)),
+    ])
+    assert added == 2
+    assert table.columns['game_id'].tolist() == [1, 2]
+    assert table.extend([row_from_result(2, game_result(game_end=200))]) == 0
+
+    table.extend([row_from_result(3, game_result(game_end=150, champion='Zed'))])
+    assert table.columns['game_id'].tolist() == [1, 3, 2]
+    assert table.champions == ['Zed', 'Ahri']
+    assert [table.champions[i] for i in table.columns['champion']] == ['Ahri', 'Zed', 'Zed']
+
+
+def test_player_stats():
+    table = PlayerTable()
+    table.extend([
+        row_from_result(1, game_result(kda='10/2/5', champion='Ahri', game_end=1, pentas=1)),
+        row_from_result(2, game_result('Défaite', kda='2/8/4', champion='Ahri', game_end=2, first_blood=False)),
+        row_from_result(3, game_result(kda='6/0/6', champion='Zed', game_end=3, queue_id=450)),
+    ])
+    stats = player_stats(table)
+    assert stats['games'] == 3 and stats['wins'] == 2
+    assert stats['win_rate'] == pytest.approx(200 / 3)
+    assert stats['kda'] == pytest.approx((18 + 15) / 10)
+    assert stats['dpm'] == pytest.approx(1000)
+    assert stats['multikills']['penta'] == 1
+    assert stats['first_blood_rate'] == pytest.approx(200 / 3)
+    assert [(c['champion'], c['games']) for c in stats['champions']] == [('Ahri', 2), ('Zed', 1)]
+
+
+def test_player_stats_mode_and_game_window():
+    table = PlayerTable()
+    table.extend([row_from_result(i, game_result(game_end=i, queue_id=450 if i % 2 else 420)) for i in range(1, 11)])
+    assert player_stats(table, mode='aram')['games'] == 5
+    assert player_stats(table, games=3)['games'] == 3
+    assert player_stats(table, mode='flex') is None
+    assert player_stats(PlayerTable()) is None
+
+
+def test_match_archive_round_trip(tmp_path):
+    archive = MatchArchive(str(tmp_path))
+    archive.add('puuid-1', [row_from_result(1, game_result()), row_from_result(2, game_result(game_end=2000))])
+    reloaded = MatchArchive(str(tmp_path))
+    assert reloaded.game_ids('puuid-1') == {1, 2}
+    assert reloaded.table('puuid-1').champions == ['Ahri']
+    assert reloaded.game_ids('unknown') == set()
@@ -0,0 +1,25 @@
+import pytest
+
+from notifications import format_tft_round, short_rank
+
+
+@pytest.mark.parametrize('last_round, stage', [
+    (1, '1-1'), (4, '1-4'), (5, '2-1'), (11, '2-7'), (12, '3-1'), (30, '5-5'),
+])
+def test_format_tft_round(last_round, stage):
+    assert format_tft_round(last_round) == stage
+
+
+def test_short_rank():
+    ranks = {
+        'RANKED_SOLO_5x5': {'tier': 'DIAMOND', 'rank': 'II', 'lp': 45},
+        'RANKED_FLEX_SR': {'tier': 'GRANDMASTER', 'rank': 'I', 'lp': 312},
+    }
+    assert short_rank(ranks, 'RANKED_SOLO_5x5') == 'D2 45 LP'
+    assert short_rank(ranks, 'RANKED_FLEX_SR') == 'GM 312 LP'
+
+
+def test_short_rank_unranked_or_unknown():
+    assert short_rank({}, 'RANKED_SOLO_5x5') == 'Unranked'
+    assert short_rank({'RANKED_SOLO_5x5': {'tier': 'NONE', 'rank': '', 'lp': 0}}, 'RANKED_SOLO_5x5') == 'Unranked'
+    assert short_rank(None, 'RANKED_SOLO_5x5') == '?'
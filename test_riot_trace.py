@@ -0,0 +1,53 @@
+import json
+
+from riot_trace import load_trace, process_trace_path, scrub_url
+
+
+def test_scrub_url_drops_host_and_api_key_and_sorts_query():
+    url = 'https://europe.api.riotgames.com/lol/match/v5/matches/by-puuid/abc/ids?start=0&api_key=RGAPI-x&count=20'
+    assert scrub_url(url) == '/lol/match/v5/matches/by-puuid/abc/ids?count=20&start=0'
+    assert scrub_url('http://127.0.0.1:8080/lol/status?api_key=k') == '/lol/status'
+
+
+def test_scrub_url_decodes_the_path():
+    raw = 'https://europe.api.riotgames.com/riot/account/v1/accounts/by-riot-id/Jean Mi/Élo'
+    encoded = 'http://127.0.0.1:8080/riot/account/v1/accounts/by-riot-id/Jean%20Mi/%C3%89lo'
+    assert scrub_url(raw) == scrub_url(encoded) == '/riot/account/v1/accounts/by-riot-id/Jean Mi/Élo'
+
+
+def test_process_trace_path():
+    assert process_trace_path('traces/trace.jsonl.gz', 42) == 'traces/trace-42.jsonl.gz'
+    assert process_trace_path('trace.jsonl', 7) == 'trace-7.jsonl'
+
+
+def write_trace(path, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(json.dumps(line) + '\n')
+
+
+def test_load_trace_aligns_files_and_indexes_by_url(tmp_path):
+    first, second = tmp_path / 'trace-1.jsonl', tmp_path / 'trace-2.jsonl'
+    write_trace(first, [
+        {'type': 'meta', 'recorded_at': 100.0, 'summoners_data': {'1': []}},
+        {'t': 2.0, 'url': '/lol/a', 'status': 200},
+        {'t': 1.0, 'url': '/lol/a', 'status': 404},
+    ])
+    write_trace(second, [
+        {'type': 'meta', 'recorded_at': 103.0},
+        # Recorded before paths were decoded
+        {'t': 0.5, 'url': '/riot/by-riot-id/Jean%20Mi/EUW', 'status': 200},
+    ])
+    meta, by_url, duration = load_trace([str(first), str(second)])
+    assert meta['summoners_data'] == {'1': []}
+    times, records = by_url['/lol/a']
+    assert times == [1.0, 2.0]
+    assert [record['status'] for record in records] == [404, 200]
+    assert by_url['/riot/by-riot-id/Jean Mi/EUW'][0] == [3.5]
+    assert duration == 3.5
+
+
+def test_load_trace_without_session(tmp_path):
+    path = tmp_path / 'empty.jsonl'
+    path.write_text('', encoding='utf-8')
+    assert load_trace(str(path)) == ({}, {}, 0.0)
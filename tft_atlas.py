@@ -0,0 +1,227 @@
+"""Per-set TFT icon atlases: unit, item and trait icons packed into one sheet per set.
+
+A sheet (tft_atlas/set13.png + set13.json) is built once, either ahead of time:
+
+    python tft_atlas.py 13
+
+or lazily, when a board needs an icon the sheet does not have yet. Board rendering
+then crops icons from the sheet in memory instead of downloading them per notification.
+Icon paths come from the CommunityDragon TFT data file, cached in tft_atlas/icons_<set>.json.
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import threading
+import time
+import aiohttp
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+CDRAGON_DATA_URL = 'https://raw.communitydragon.org/latest/cdragon/tft/fr_fr.json'
+CDRAGON_GAME_URL = 'https://raw.communitydragon.org/latest/game/'
+ATLAS_DIR = os.getenv('TFT_ATLAS_DIR', 'tft_atlas')
+TILE = 64
+COLUMNS = 32
+RETRY_DELAY = 600
+
+
+def icon_key(kind, name):
+    """'unit' / 'item' / 'trait' + api name; match-v1 ids are not consistently cased"""
+    return f"{kind}:{name.lower()}"
+
+
+def asset_url(path):
+    return CDRAGON_GAME_URL + path.lower().replace('.tex', '.png')
+
+
+def extract_icon_paths(data, set_number):
+    """{icon key: url} for the units and traits of one set, and every item"""
+    paths = {}
+    for item in data.get('items', []):
+        if item.get('apiName') and item.get('icon'):
+            paths[icon_key('item', item['apiName'])] = asset_url(item['icon'])
+
+    set_data = data.get('sets', {}).get(str(set_number))
+    if set_data is None:
+        set_data = next((s for s in data.get('setData', []) if s.get('number') == set_number), {})
+    for champion in set_data.get('champions', []):
+        icon = champion.get('tileIcon') or champion.get('squareIcon') or champion.get('icon')
+        if champion.get('apiName') and icon:
+            paths[icon_key('unit', champion['apiName'])] = asset_url(icon)
+    for trait in set_data.get('traits', []):
+        if trait.get('apiName') and trait.get('icon'):
+            paths[icon_key('trait', trait['apiName'])] = asset_url(trait['icon'])
+    return paths
+
+
+class IconAtlas:
+    """One sheet of TILE x TILE icons for a TFT set, persisted in ATLAS_DIR"""
+
+    def __init__(self, set_number, directory=ATLAS_DIR):
+        self.set_number = set_number
+        self.directory = directory
+        self.sheet_path = os.path.join(directory, f"set{set_number}.png")
+        self.index_path = os.path.join(directory, f"set{set_number}.json")
+        self.paths_path = os.path.join(directory, f"icons_{set_number}.json")
+        self.slots = {}  # icon key -> slot in the sheet
+        self.sheet = None
+        self.paths = None
+        self.missing = set()  # keys with no known icon, not retried until restart
+        self._crops = {}
+        self._lock = threading.Lock()
+        self._ensure_lock = asyncio.Lock()
+        self._retry_at = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.slots = json.load(f)
+            with Image.open(self.sheet_path) as sheet:
+                self.sheet = sheet.convert('RGBA')
+            logger.info("Loaded TFT atlas for set %s (%d icons)", self.set_number, len(self.slots))
+        except FileNotFoundError:
+            self.slots, self.sheet = {}, None
+        except Exception as e:
+            logger.warning("Unreadable TFT atlas for set %s, rebuilding: %s", self.set_number, e)
+            self.slots, self.sheet = {}, None
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def icon(self, key):
+        """TILE x TILE RGBA icon, or None when the atlas does not have it"""
+        slot = self.slots.get(key)
+        if slot is None or self.sheet is None:
+            return None
+        crop = self._crops.get(key)
+        if crop is None:
+            x, y = slot % COLUMNS * TILE, slot // COLUMNS * TILE
+            crop = self._crops[key] = self.sheet.crop((x, y, x + TILE, y + TILE))
+        return crop
+
+    def add(self, icons):
+        """Pack {key: PIL image} into the sheet and save it (blocking: run in a thread)"""
+        with self._lock:
+            icons = {key: image for key, image in icons.items() if key not in self.slots}
+            if not icons:
+                return
+            count = len(self.slots) + len(icons)
+            rows = (count + COLUMNS - 1) // COLUMNS
+            sheet = Image.new('RGBA', (COLUMNS * TILE, rows * TILE), (0, 0, 0, 0))
+            if self.sheet is not None:
+                sheet.paste(self.sheet, (0, 0))
+            slots = dict(self.slots)
+            for key, image in icons.items():
+                slot = len(slots)
+                sheet.paste(image.convert('RGBA').resize((TILE, TILE)), (slot % COLUMNS * TILE, slot // COLUMNS * TILE))
+                slots[key] = slot
+
+            os.makedirs(self.directory, exist_ok=True)
+            sheet.save(self.sheet_path, format='PNG')
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump(slots, f)
+            # Sheet first: a board composed concurrently never sees a slot missing from its sheet
+            self.sheet = sheet
+            self.slots = slots
+            logger.info("TFT atlas for set %s now has %d icons", self.set_number, len(self.slots))
+
+    async def load_paths(self, session):
+        """Icon urls of the set, from the local copy or CommunityDragon"""
+        if self.paths is not None:
+            return self.paths
+        try:
+            with open(self.paths_path, 'r', encoding='utf-8') as f:
+                self.paths = json.load(f)
+            return self.paths
+        except FileNotFoundError:
+            pass
+
+        async with session.get(CDRAGON_DATA_URL) as resp:
+            resp.raise_for_status()
+            data = json.loads(await resp.read())
+        self.paths = await asyncio.to_thread(extract_icon_paths, data, self.set_number)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.paths_path, 'w', encoding='utf-8') as f:
+            json.dump(self.paths, f)
+        return self.paths
+
+    async def ensure(self, keys, concurrency=8):
+        """Download the icons of `keys` the sheet does not have yet, once"""
+        if time.monotonic() < self._retry_at:
+            return
+        if all(key in self.slots or key in self.missing for key in keys):
+            return
+        # One download at a time: boards of the same lobby need the same icons
+        async with self._ensure_lock:
+            await self._download(keys, concurrency)
+
+    async def _download(self, keys, concurrency):
+        if time.monotonic() < self._retry_at:
+            return
+        wanted = [key for key in dict.fromkeys(keys) if key not in self.slots and key not in self.missing]
+        if not wanted:
+            return
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def download(session, key, url):
+            async with semaphore:
+                try:
+                    async with session.get(url) as resp:
+                        if resp.status == 200:
+                            return key, Image.open(io.BytesIO(await resp.read()))
+                except aiohttp.ClientError as e:
+                    logger.debug("TFT icon %s not downloaded: %s", key, e)
+            return key, None
+
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+                paths = await self.load_paths(session)
+                downloads = [download(session, key, paths[key]) for key in wanted if key in paths]
+                results = await asyncio.gather(*downloads)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Boards fall back to placeholders rather than retrying on every notification
+            logger.warning("TFT icons for set %s unavailable for %ds: %s", self.set_number, RETRY_DELAY, e)
+            self._retry_at = time.monotonic() + RETRY_DELAY
+            return
+
+        icons = {key: image for key, image in results if image is not None}
+        self.missing.update(key for key in wanted if key not in icons)
+        if icons:
+            await asyncio.to_thread(self.add, icons)
+
+
+_atlases = {}
+
+
+def get_atlas(set_number):
+    """Shared atlas of a set, loaded from disk on first use"""
+    if set_number not in _atlases:
+        _atlases[set_number] = IconAtlas(set_number)
+    return _atlases[set_number]
+
+
+async def prebuild(set_number):
+    atlas = get_atlas(set_number)
+    async with aiohttp.ClientSession() as session:
+        paths = await atlas.load_paths(session)
+    await atlas.ensure(paths)
+    return atlas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construit l\'atlas d\'icônes TFT d\'un set')
+    parser.add_argument('set_number', type=int, help='numéro du set, ex. 13')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    atlas = asyncio.run(prebuild(args.set_number))
+    print(f"{len(atlas.slots)} icônes dans {atlas.sheet_path}, {len(atlas.missing)} introuvables")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import contextvars
+import functools
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Trace:
+    """One cycle (or pipeline event): its duration, per-span aggregates and slowest spans"""
+
+    def __init__(self, name, keep_slowest=5):
+        self.name = name
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.spans = {}  # span name -> {'count', 'total', 'max'}
+        self.slowest = []  # [(duration, span name)], longest first
+        self.keep_slowest = keep_slowest
+
+    def add_span(self, name, duration):
+        stats = self.spans.get(name)
+        if stats is None:
+            stats = self.spans[name] = {'count': 0, 'total': 0.0, 'max': 0.0}
+        stats['count'] += 1
+        stats['total'] += duration
+        stats['max'] = max(stats['max'], duration)
+
+        if len(self.slowest) < self.keep_slowest or duration > self.slowest[-1][0]:
+            self.slowest.append((duration, name))
+            self.slowest.sort(reverse=True)
+            del self.slowest[self.keep_slowest:]
+
+
+class Tracer:
+    """Lightweight spans kept in in-memory ring buffers of recent traces.
+
+    ``trace()`` opens a root (a loop cycle, a pipeline event); ``span()``
+    records a timed stage into the trace of the current context, including
+    tasks spawned from it, since contextvars follow asyncio tasks.
+
+    Each trace name has its own buffer of ``max_traces``: per-event traces
+    (pipeline stages, deliveries) never push out the loop cycles, even the
+    daily one.
+    """
+
+    def __init__(self, max_traces=500):
+        self.max_traces = max_traces
+        self._buffers = {}  # trace name -> deque of its recent traces
+
+    @property
+    def traces(self):
+        """Every buffered trace, oldest first"""
+        return sorted((trace for buffer in self._buffers.values() for trace in buffer),
+                      key=lambda trace: trace.started_at)
+
+    @contextmanager
+    def trace(self, name):
+        trace = Trace(name)
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            trace.duration = time.perf_counter() - started
+            _current_trace.reset(token)
+            buffer = self._buffers.get(name)
+            if buffer is None:
+                buffer = self._buffers[name] = deque(maxlen=self.max_traces)
+            buffer.append(trace)
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def traced(self, name):
+        """Decorator: run each call of a coroutine function as one trace"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.trace(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, duration):
+        """Add an already measured span to the current trace (no-op outside one)"""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, duration)
+
+    def cycle_stats(self):
+        """{trace name: {'count', 'p50', 'p95', 'max', 'last'}} over the buffer"""
+        durations = {name: [trace.duration for trace in buffer] for name, buffer in self._buffers.items() if buffer}
+        return {
+            name: {
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'max': max(values),
+                'last': values[-1],
+            }
+            for name, values in durations.items()
+        }
+
+    def span_stats(self):
+        """{(trace name, span name): {'count', 'total', 'max'}} over the buffer"""
+        totals = {}
+        for trace in self.traces:
+            for span_name, stats in trace.spans.items():
+                agg = totals.setdefault((trace.name, span_name), {'count': 0, 'total': 0.0, 'max': 0.0})
+                agg['count'] += stats['count']
+                agg['total'] += stats['total']
+                agg['max'] = max(agg['max'], stats['max'])
+        return totals
+
+    def slowest_spans(self, limit=10):
+        spans = [
+            (duration, trace.name, span_name, trace.started_at)
+            for trace in self.traces
+            for duration, span_name in trace.slowest
+        ]
+        spans.sort(reverse=True)
+        return spans[:limit]
+
+
+tracer = Tracer(int(os.getenv('TRACE_BUFFER_SIZE', 500)))